@@ -13,6 +13,7 @@ import requests
 
 from src.graph.agent_config import AGENT_LLM_MAP
 from src.graph.types import MappingState
+from src.ontology.client import HPO_RELEASE_PATH, get_ontology_hierarchy
 from src.prompts.template import apply_prompt_template
 
 # UMLS API Base URL for ontology queries
@@ -24,19 +25,19 @@ logger = logging.getLogger(__name__)
 # --- UMLS Tools (only used by gather_ancestor_candidates_node) ---
 def get_cui_info(cui):
     """Get details for a given CUI."""
-    response = requests.get(f"{API_BASE_URL}/cuis/{cui}")
+    response = requests.get(f"{API_BASE_URL}/cuis/{cui}", timeout=10)
     return response.json()
 
 
 def get_ancestors(cui):
     """Get ancestors of a CUI."""
-    response = requests.get(f"{API_BASE_URL}/cuis/{cui}/ancestors")
+    response = requests.get(f"{API_BASE_URL}/cuis/{cui}/ancestors", timeout=10)
     return response.json()
 
 
 def get_cui_from_ontology(hpo_code):
     """Get CUI from a specific ontology term."""
-    response = requests.get(f"{API_BASE_URL}/hpo_to_cui/{hpo_code}")
+    response = requests.get(f"{API_BASE_URL}/hpo_to_cui/{hpo_code}", timeout=10)
     return response.json()["cui"]
 
 
@@ -55,6 +56,45 @@ def _parse_confidence(value) -> float:
     return float(value)
 
 
+def _gather_ancestor_details(matched_code: str) -> list:
+    """
+    Collect id/name records for every ancestor of an HPO code.
+
+    With HPO_RELEASE_PATH configured, ancestors come from the precomputed
+    in-memory hierarchy (HPO codes). Otherwise the UMLS API is queried for the
+    CUI, its ancestors, and each ancestor's details (UMLS CUIs).
+    """
+    if HPO_RELEASE_PATH:
+        return [
+            {"id": d["code"], "name": d["term"]}
+            for d in get_ontology_hierarchy().ancestor_details(matched_code)
+        ]
+
+    # Step 1: Get CUI (Concept Unique Identifier) from ontology code
+    cui = get_cui_from_ontology(matched_code)
+    if not cui:
+        return []
+    logger.debug(f"CUI: {cui}")
+
+    # Step 2: Get ancestor CUIs from the ontology hierarchy
+    ancestors_data = get_ancestors(cui)
+    logger.debug(f"Ancestors data: {ancestors_data}")
+    ancestor_cuis = ancestors_data.get("ancestors", [])
+    logger.debug(f"Ancestor CUIs: {ancestor_cuis}")
+
+    # Step 3: Get detailed information for each ancestor CUI
+    candidate_details = []
+    for ancestor_cui in ancestor_cuis:
+        try:
+            info = get_cui_info(ancestor_cui)
+            if info.get("cui") and info.get("name"):
+                candidate_details.append({"id": info["cui"], "name": info["name"]})
+        except Exception as e:
+            logger.error(f"Error retrieving CUI info for {ancestor_cui}: {e}")
+            continue
+    return candidate_details
+
+
 # --- Ablation Node ---
 def gather_ancestor_candidates_node(state: MappingState) -> MappingState:
     """
@@ -82,30 +122,8 @@ def gather_ancestor_candidates_node(state: MappingState) -> MappingState:
     if not matched_code:
         return {**state, "refine_mapping": {}}
 
-    # Step 1: Get CUI (Concept Unique Identifier) from ontology code
-    cui = get_cui_from_ontology(matched_code)
-    if not cui:
-        return {**state, "refine_mapping": {}}
-    logger.debug(f"CUI: {cui}")
-
-    # Step 2: Get ancestor CUIs from the ontology hierarchy
-    ancestors_data = get_ancestors(cui)
-    logger.debug(f"Ancestors data: {ancestors_data}")
-    ancestor_cuis = ancestors_data.get("ancestors", [])
-    if not ancestor_cuis:
-        return {**state, "refine_mapping": {}}
-    logger.debug(f"Ancestor CUIs: {ancestor_cuis}")
-
-    # Step 3: Get detailed information for each ancestor CUI
-    candidate_details = []
-    for ancestor_cui in ancestor_cuis:
-        try:
-            info = get_cui_info(ancestor_cui)
-            if info.get("cui") and info.get("name"):
-                candidate_details.append(info)
-        except Exception as e:
-            logger.error(f"Error retrieving CUI info for {ancestor_cui}: {e}")
-            continue
+    # Steps 1-3: Collect ancestor concepts of the matched code
+    candidate_details = _gather_ancestor_details(matched_code)
     logger.debug(f"Candidate details: {candidate_details}")
     if not candidate_details:
         return {**state, "refine_mapping": {}}
@@ -113,7 +131,7 @@ def gather_ancestor_candidates_node(state: MappingState) -> MappingState:
     # Step 4: Build prompt context with ancestor candidates
     survey_text = state.get("text", "")
     candidate_list = "\n".join(
-        [f"- {c['cui']} ({c['name']})" for c in candidate_details]
+        [f"- {c['id']} ({c['name']})" for c in candidate_details]
     )
 
     prompt_context = {
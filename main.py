@@ -8,6 +8,7 @@ Usage (local development):
     uvicorn main:app --reload
 """
 
+import time
 from typing import Any, Dict, List, Optional, cast
 
 from dotenv import load_dotenv
@@ -16,6 +17,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
 
 from src.graph.builder import build_umls_mapper_graph
+from src.graph.deadline import request_deadline
 from src.graph.types import MappingState
 
 # Load environment variables from .env file
@@ -54,6 +56,7 @@ class MappingCandidate(BaseModel):
 class MapResponse(BaseModel):
     input: Dict[str, Any]
     validated_mappings: List[MappingCandidate] = []
+    partial: bool = False
     raw_state: Dict[str, Any] = {}
 
 
@@ -64,12 +67,14 @@ def health_check():
 
 
 @app.post("/map", response_model=MapResponse)
-def map_text(req: MapRequest):
+async def map_text(req: MapRequest):
     """Invoke the UMLS/HPO mapping LangGraph workflow.
 
     The graph expects a MappingState-like dict. We provide the minimal required
-    inputs: `text` and `field_type`. The compiled graph is invoked and the
-    final state is returned (we surface `validated_mappings` when present).
+    inputs: `text` and `field_type`. The compiled graph is awaited on the event
+    loop (async nodes, non-blocking LLM and search calls), so a single worker
+    can hold many mappings in flight, and the final state is returned (we
+    surface `validated_mappings` when present).
     """
     try:
         graph = build_umls_mapper_graph()
@@ -84,11 +89,12 @@ def map_text(req: MapRequest):
             "text": req.text,
             "field_type": req.field_type,
             "ontology": req.ontology,
+            "deadline": request_deadline(time.time()),
         },
     )
 
     try:
-        result_state = graph.invoke(initial_state)
+        result_state = await graph.ainvoke(initial_state)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Graph invocation failed: {e}")
 
@@ -124,5 +130,6 @@ def map_text(req: MapRequest):
     return MapResponse(
         input=dict(initial_state),
         validated_mappings=normalized,
+        partial=bool(result_state.get("partial", False)),
         raw_state=dict(result_state),
     )
@@ -11,19 +11,71 @@ The module supports two LLM providers:
 Set the LLM_PROVIDER environment variable to "bedrock" to use AWS Bedrock models.
 """
 
+import json
 import os
-from typing import Dict
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
 
-from langchain_aws import ChatBedrock
-from langchain_core.language_models.chat_models import BaseChatModel
-from langchain_openai import ChatOpenAI
+from src.graph.cascade import (
+    ModelCascade,
+    check_extraction,
+    check_ranking,
+    check_validation,
+)
+from src.graph.llm_cache import CachedChatModel, LLMResponseCache, cache_fingerprint
+from src.graph.llm_clients import LLMClientRegistry
+from src.graph.llm_router import RoutedChatModel, get_route_stats
+from src.graph.rate_limit import ModelRateLimiter, RateLimitedChatModel
+
+if TYPE_CHECKING:
+    from langchain_aws import ChatBedrock
+    from langchain_openai import ChatOpenAI
 
 # Environment variable to determine which LLM provider to use
 # Options: "openai" (default for local dev) or "bedrock" (for AWS deployment)
 LLM_PROVIDER = os.environ.get("LLM_PROVIDER", "openai").lower()
 
+# Response cache for the deterministic (temperature 0.0) agent calls.
+# LLM_CACHE_PATH adds an SQLite tier shared across processes/warm invocations
+LLM_CACHE = os.environ.get("LLM_CACHE", "true").lower() == "true"
+LLM_CACHE_SIZE = int(os.environ.get("LLM_CACHE_SIZE", "1024"))
+LLM_CACHE_TTL = float(os.environ.get("LLM_CACHE_TTL", str(7 * 86400)))
+LLM_CACHE_PATH = os.environ.get("LLM_CACHE_PATH", "")
+
+# Model cascade: answer cascaded tasks with the small model first and escalate
+# to the task's configured model when the output is malformed or its
+# confidence is below the task's CASCADE_THRESHOLDS entry
+# (CASCADE_CONFIDENCE_THRESHOLDS overrides them per task as a JSON object,
+# e.g. {"rank_mappings": 0.6})
+MODEL_CASCADE = os.environ.get("MODEL_CASCADE", "false").lower() == "true"
+CASCADE_CONFIDENCE_THRESHOLDS: Dict[str, float] = json.loads(
+    os.environ.get("CASCADE_CONFIDENCE_THRESHOLDS", "{}") or "{}"
+)
+
+# Provider quota limiting: every model call waits for its model's
+# requests-per-minute and tokens-per-minute budget (LLM_RATE_LIMITS overrides
+# them per model id, e.g. {"gpt-5.2": {"rpm": 500, "tpm": 500000}}) and is
+# retried with jittered exponential backoff when throttled
+LLM_RATE_LIMIT = os.environ.get("LLM_RATE_LIMIT", "false").lower() == "true"
+LLM_RPM = int(os.environ.get("LLM_RPM", "500"))
+LLM_TPM = int(os.environ.get("LLM_TPM", "200000"))
+LLM_RATE_LIMITS: Dict[str, Dict[str, int]] = json.loads(
+    os.environ.get("LLM_RATE_LIMITS", "{}") or "{}"
+)
+LLM_THROTTLE_RETRIES = int(os.environ.get("LLM_THROTTLE_RETRIES", "5"))
 
-def _create_openai_model(model: str, temperature: float = 0.0) -> ChatOpenAI:
+# Provider failover: route each task to the healthier of LLM_PROVIDER and the
+# other provider (both need credentials). With LLM_HEDGE_PERCENTILE set (e.g.
+# 95), a call slower than that percentile of its route's recent latency is
+# duplicated on the other provider and the first answer wins
+LLM_FAILOVER = os.environ.get("LLM_FAILOVER", "false").lower() == "true"
+LLM_HEDGE_PERCENTILE: Optional[float] = (
+    float(os.environ["LLM_HEDGE_PERCENTILE"])
+    if os.environ.get("LLM_HEDGE_PERCENTILE")
+    else None
+)
+
+
+def _create_openai_model(model: str, temperature: float = 0.0) -> "ChatOpenAI":
     """
     Create an OpenAI chat model instance.
 
@@ -34,10 +86,13 @@ def _create_openai_model(model: str, temperature: float = 0.0) -> ChatOpenAI:
     Returns:
         ChatOpenAI: Configured OpenAI chat model instance.
     """
+    # Imported here so the SDK is only loaded when a client is first needed
+    from langchain_openai import ChatOpenAI
+
     return ChatOpenAI(model=model, temperature=temperature)
 
 
-def _create_bedrock_model(model_id: str, temperature: float = 0.0) -> ChatBedrock:
+def _create_bedrock_model(model_id: str, temperature: float = 0.0) -> "ChatBedrock":
     """
     Create an AWS Bedrock chat model instance.
 
@@ -49,6 +104,8 @@ def _create_bedrock_model(model_id: str, temperature: float = 0.0) -> ChatBedroc
     Returns:
         ChatBedrock: Configured Bedrock chat model instance.
     """
+    from langchain_aws import ChatBedrock
+
     return ChatBedrock(model=model_id, temperature=temperature, service_tier="default")
 
 
@@ -57,9 +114,11 @@ def _create_bedrock_model(model_id: str, temperature: float = 0.0) -> ChatBedroc
 OPENAI_MODEL_CONFIG = {
     "is_question_mappable_to_hpo": ("gpt-5-mini", 0.0),
     "extract_medical_term_from_survey": ("gpt-5.2", 0.0),
+    "is_mappable_and_extract": ("gpt-5.2", 0.0),
     "rank_mappings": ("gpt-5.2", 0.0),
     "retry_with_llm_rewrite": ("gpt-5.2", 0.0),
     "validate_mapping": ("gpt-5.2", 0.0),
+    "rank_and_validate": ("gpt-5.2", 0.0),
     "refine_mapping": ("gpt-5.2", 0.0),
     "rank_evaluate_with_llm": ("gpt-5.2", 0.0),
     "evaluate_specificity_with_llm": ("gpt-5.2", 0.0),
@@ -76,9 +135,14 @@ BEDROCK_MODEL_CONFIG = {
         "global.anthropic.claude-sonnet-4-5-20250929-v1:0",
         0.0,
     ),
+    "is_mappable_and_extract": (
+        "global.anthropic.claude-sonnet-4-5-20250929-v1:0",
+        0.0,
+    ),
     "rank_mappings": ("global.anthropic.claude-sonnet-4-5-20250929-v1:0", 0.0),
     "retry_with_llm_rewrite": ("global.anthropic.claude-sonnet-4-5-20250929-v1:0", 0.0),
     "validate_mapping": ("global.anthropic.claude-sonnet-4-5-20250929-v1:0", 0.0),
+    "rank_and_validate": ("global.anthropic.claude-sonnet-4-5-20250929-v1:0", 0.0),
     "refine_mapping": ("global.anthropic.claude-sonnet-4-5-20250929-v1:0", 0.0),
     "rank_evaluate_with_llm": ("global.anthropic.claude-sonnet-4-5-20250929-v1:0", 0.0),
     "evaluate_specificity_with_llm": (
@@ -88,37 +152,321 @@ BEDROCK_MODEL_CONFIG = {
 }
 
 
-def _build_agent_llm_map() -> Dict[str, BaseChatModel]:
+# Small model tried first for each cascaded task (see MODEL_CASCADE)
+OPENAI_CASCADE_CONFIG = {
+    "extract_medical_term_from_survey": "gpt-5-mini",
+    "rank_mappings": "gpt-5-mini",
+    "validate_mapping": "gpt-5-mini",
+    "rank_and_validate": "gpt-5-mini",
+}
+
+BEDROCK_CASCADE_CONFIG = {
+    "extract_medical_term_from_survey": "global.anthropic.claude-haiku-4-5-20251001-v1:0",
+    "rank_mappings": "global.anthropic.claude-haiku-4-5-20251001-v1:0",
+    "validate_mapping": "global.anthropic.claude-haiku-4-5-20251001-v1:0",
+    "rank_and_validate": "global.anthropic.claude-haiku-4-5-20251001-v1:0",
+}
+
+# How a cascaded task's small-model output is judged before accepting it
+CASCADE_CHECKS = {
+    "extract_medical_term_from_survey": check_extraction,
+    "rank_mappings": check_ranking,
+    "validate_mapping": check_validation,
+    "rank_and_validate": check_validation,
+}
+
+# Escalation threshold per cascaded task. A ranking's best confidence is
+# spread over several candidates and runs lower than a validation verdict,
+# which is retried anyway below 0.9; extraction only escalates when malformed
+CASCADE_THRESHOLDS = {
+    "extract_medical_term_from_survey": 0.0,
+    "rank_mappings": 0.7,
+    "validate_mapping": 0.9,
+    "rank_and_validate": 0.9,
+    **CASCADE_CONFIDENCE_THRESHOLDS,
+}
+
+
+# Tasks called by the mapping graph (the rest are only used by experiments)
+GRAPH_TASKS = (
+    "is_question_mappable_to_hpo",
+    "extract_medical_term_from_survey",
+    "is_mappable_and_extract",
+    "rank_mappings",
+    "validate_mapping",
+    "retry_with_llm_rewrite",
+    "rank_and_validate",
+)
+
+# Shared chat model clients, one per (provider, model id, temperature),
+# constructed on first use
+LLM_CLIENTS = LLMClientRegistry(
+    {"openai": _create_openai_model, "bedrock": _create_bedrock_model}
+)
+
+
+# Rate limiter queue priority per task (lower is served first): later
+# pipeline stages go first so requests already in flight finish sooner
+TASK_PRIORITY = {
+    "validate_mapping": 0,
+    "rank_and_validate": 0,
+    "retry_with_llm_rewrite": 0,
+    "rank_mappings": 1,
+    "extract_medical_term_from_survey": 2,
+    "is_mappable_and_extract": 2,
+    "is_question_mappable_to_hpo": 3,
+}
+
+# One rate limiter per (provider, model id), shared by every task using it
+_rate_limiters: Dict[Tuple[str, str], ModelRateLimiter] = {}
+
+
+def _rate_limiter(provider: str, model_id: str) -> ModelRateLimiter:
+    """Return the rate limiter of a provider's model."""
+    key = (provider, model_id)
+    if key not in _rate_limiters:
+        limits = LLM_RATE_LIMITS.get(model_id, {})
+        _rate_limiters[key] = ModelRateLimiter(
+            model_id,
+            rpm=limits.get("rpm", LLM_RPM),
+            tpm=limits.get("tpm", LLM_TPM),
+        )
+    return _rate_limiters[key]
+
+
+def _task_client(task: str, provider: str, model_id: str, temperature: float) -> Any:
+    """
+    Return a task's lazy client, queued on its model's rate limiter if enabled.
+
+    Parameters:
+        task (str): Agent task name (sets the queue priority).
+        provider (str): "openai" or "bedrock".
+        model_id (str): Model identifier of the provider.
+        temperature (float): Sampling temperature.
+
+    Returns:
+        Any: Lazy (and possibly rate-limited) chat model.
+    """
+    llm: Any = LLM_CLIENTS.lazy(provider, model_id, temperature)
+    if LLM_RATE_LIMIT:
+        llm = RateLimitedChatModel(
+            task,
+            llm,
+            _rate_limiter(provider, model_id),
+            priority=TASK_PRIORITY.get(task, max(TASK_PRIORITY.values()) + 1),
+            max_retries=LLM_THROTTLE_RETRIES,
+        )
+    return llm
+
+
+def _route_providers() -> List[str]:
+    """Providers serving each task: LLM_PROVIDER, then the failover provider."""
+    if not LLM_FAILOVER:
+        return [LLM_PROVIDER]
+    return [LLM_PROVIDER] + [p for p in ("openai", "bedrock") if p != LLM_PROVIDER]
+
+
+def _task_llm(task: str, models: Dict[str, Tuple[str, float]]) -> Any:
+    """
+    Return a task's client, routed across providers when LLM_FAILOVER is on.
+
+    Parameters:
+        task (str): Agent task name.
+        models (Dict[str, Tuple[str, float]]): (model id, temperature) per
+            provider, in order of preference.
+
+    Returns:
+        Any: The task's chat model.
+    """
+    routes = [
+        (f"{provider}:{model_id}", _task_client(task, provider, model_id, temp))
+        for provider, (model_id, temp) in models.items()
+    ]
+    if len(routes) == 1:
+        return routes[0][1]
+    return RoutedChatModel(task, routes, hedge_percentile=LLM_HEDGE_PERCENTILE)
+
+
+def _build_agent_llm_map() -> Dict[str, Any]:
     """
     Build the agent LLM mapping based on the configured provider.
 
     Selects the appropriate model configuration (OpenAI or Bedrock) based on
-    the LLM_PROVIDER environment variable and instantiates the corresponding
-    chat models for each agent task.
+    the LLM_PROVIDER environment variable. Each task gets a lazy proxy to the
+    client shared by all tasks using the same model; no SDK client is
+    constructed until a task first calls its model. With LLM_RATE_LIMIT
+    each proxy also waits for its model's provider quota, and with
+    LLM_FAILOVER each task is routed between both providers' models.
 
     Returns:
-        Dict[str, BaseChatModel]: Mapping of agent task names to LLM instances.
+        Dict[str, Any]: Mapping of agent task names to LLM proxies.
 
     Raises:
         ValueError: If an unsupported LLM_PROVIDER value is specified.
     """
-    if LLM_PROVIDER == "bedrock":
-        return {
-            task: _create_bedrock_model(model_id, temp)
-            for task, (model_id, temp) in BEDROCK_MODEL_CONFIG.items()
-        }
-    elif LLM_PROVIDER == "openai":
-        return {
-            task: _create_openai_model(model, temp)
-            for task, (model, temp) in OPENAI_MODEL_CONFIG.items()
-        }
-    else:
+    if LLM_PROVIDER not in ("openai", "bedrock"):
         raise ValueError(
             f"Unsupported LLM_PROVIDER: {LLM_PROVIDER}. Use 'openai' or 'bedrock'."
         )
+    return {
+        task: _task_llm(
+            task, {p: _provider_model_config(p)[task] for p in _route_providers()}
+        )
+        for task in _active_model_config()
+    }
+
+
+def _provider_model_config(provider: str) -> Dict[str, Tuple[str, float]]:
+    """Return the task model configuration of a provider."""
+    if provider == "bedrock":
+        return BEDROCK_MODEL_CONFIG
+    return OPENAI_MODEL_CONFIG
+
+
+def _active_model_config() -> Dict[str, Tuple[str, float]]:
+    """Return the task model configuration of the active provider."""
+    return _provider_model_config(LLM_PROVIDER)
+
+
+def _with_response_cache(llm_map: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Wrap every agent LLM in a CachedChatModel sharing one response cache.
+
+    The cache namespace fingerprints the prompt templates and the active model
+    configuration, so changing either invalidates all cached responses.
+
+    Parameters:
+        llm_map (Dict[str, Any]): Mapping of agent task names to LLMs.
+
+    Returns:
+        Dict[str, Any]: Mapping of agent task names to cached LLM wrappers.
+    """
+    model_config = _active_model_config()
+    cache = LLMResponseCache(
+        namespace=cache_fingerprint(model_config, LLM_PROVIDER),
+        max_size=LLM_CACHE_SIZE,
+        ttl=LLM_CACHE_TTL,
+        path=LLM_CACHE_PATH,
+    )
+    return {
+        task: CachedChatModel(task, llm, model_config[task][0], cache)
+        for task, llm in llm_map.items()
+    }
+
+
+def _provider_cascade_config(provider: str) -> Dict[str, str]:
+    """Return the cascade small-model configuration of a provider."""
+    if provider == "bedrock":
+        return BEDROCK_CASCADE_CONFIG
+    return OPENAI_CASCADE_CONFIG
+
+
+def _with_model_cascade(llm_map: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Put a small model in front of every task listed in the cascade config.
+
+    Small models share the response cache (under their own model id) when
+    caching is enabled.
+
+    Parameters:
+        llm_map (Dict[str, Any]): Mapping of agent task names to (large) LLMs.
+
+    Returns:
+        Dict[str, Any]: Mapping with cascaded tasks wrapped in ModelCascade.
+    """
+    cache = _find_llm_cache(llm_map)
+
+    cascaded = dict(llm_map)
+    for task, small_model in _provider_cascade_config(LLM_PROVIDER).items():
+        small: Any = _task_llm(
+            task,
+            {
+                p: (_provider_cascade_config(p)[task], _provider_model_config(p)[task][1])
+                for p in _route_providers()
+            },
+        )
+        if cache is not None:
+            small = CachedChatModel(task, small, small_model, cache)
+        cascaded[task] = ModelCascade(
+            task,
+            small,
+            llm_map[task],
+            CASCADE_CHECKS[task],
+            CASCADE_THRESHOLDS[task],
+        )
+    return cascaded
+
+
+def _find_llm_cache(llm_map: Dict[str, Any]) -> Optional[LLMResponseCache]:
+    """Return the response cache shared by the (possibly cascaded) LLMs."""
+    for llm in llm_map.values():
+        llm = llm.large if isinstance(llm, ModelCascade) else llm
+        if isinstance(llm, CachedChatModel):
+            return llm.cache
+    return None
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """Return the shared LLM response cache, or None when caching is disabled."""
+    return _find_llm_cache(AGENT_LLM_MAP)
+
+
+def prewarm_llm_clients(tasks: Iterable[str] = GRAPH_TASKS) -> int:
+    """
+    Construct the clients used by ``tasks`` now instead of on first call.
+
+    Meant for process or Lambda init, so the first request does not pay for
+    SDK client construction. Cascade small models are included when
+    MODEL_CASCADE is enabled, and the failover provider's clients when
+    LLM_FAILOVER is.
+
+    Parameters:
+        tasks (Iterable[str]): Agent task names whose clients to create.
+
+    Returns:
+        int: Number of clients created.
+    """
+    tasks = list(tasks)
+    keys = []
+    for provider in _route_providers():
+        model_config = _provider_model_config(provider)
+        keys += [(provider, *model_config[task]) for task in tasks]
+        if MODEL_CASCADE:
+            keys += [
+                (provider, model_id, model_config[task][1])
+                for task, model_id in _provider_cascade_config(provider).items()
+                if task in tasks
+            ]
+    return LLM_CLIENTS.prewarm(keys)
+
+
+def get_rate_limit_stats() -> Dict[str, Dict[str, Any]]:
+    """Return queue depth, wait time and throttling stats per model ({} when disabled)."""
+    return {
+        f"{provider}:{model_id}": limiter.stats()
+        for (provider, model_id), limiter in _rate_limiters.items()
+    }
+
+
+def get_failover_stats() -> Dict[str, Dict[str, Any]]:
+    """Return health per provider route ({} when failover is disabled)."""
+    return get_route_stats() if LLM_FAILOVER else {}
+
+
+def get_cascade_stats() -> Dict[str, Dict[str, Any]]:
+    """Return escalation statistics per cascaded task ({} when disabled)."""
+    return {
+        task: llm.stats()
+        for task, llm in AGENT_LLM_MAP.items()
+        if isinstance(llm, ModelCascade)
+    }
 
 
 # Configuration mapping for different agent tasks to their corresponding LLM models
 # Each task uses a specific model with optimized parameters for its purpose
 # The provider is determined by the LLM_PROVIDER environment variable
 AGENT_LLM_MAP = _build_agent_llm_map()
+if LLM_CACHE:
+    AGENT_LLM_MAP = _with_response_cache(AGENT_LLM_MAP)
+if MODEL_CASCADE:
+    AGENT_LLM_MAP = _with_model_cascade(AGENT_LLM_MAP)
@@ -4,28 +4,96 @@ This module defines the complete workflow graph that orchestrates the medical te
 mapping process from survey questions to standardized ontology terms.
 """
 
+import logging
+import os
+from typing import Any, Dict, Optional, Tuple
+
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import StateGraph
+from langgraph.types import Send
 
+from src.graph.deadline import (
+    RETRY_MIN_SECONDS,
+    WIDEN_MIN_SECONDS,
+    awithin_deadline,
+    has_time_for,
+    within_deadline,
+)
 from src.graph.nodes import (
+    RANK_BATCH,
+    aextract_medical_terms_checkbox_node,
+    aextract_medical_terms_radio_node,
+    aextract_medical_terms_short_node,
+    afetch_umls_terms_node,
+    ais_mappable_and_extract_node,
+    ais_question_mappable_node,
+    amatch_exact_terms_node,
+    amerge_term_results_node,
+    arank_and_validate_node,
+    arank_mappings_node,
+    aretry_with_llm_rewrite_node,
+    aspeculative_prefetch_node,
+    avalidate_mapping_node,
+    awiden_candidates_node,
     extract_medical_terms_checkbox_node,
     extract_medical_terms_radio_node,
     extract_medical_terms_short_node,
     fetch_umls_terms_node,
+    is_mappable_and_extract_node,
     is_question_mappable_node,
+    match_exact_terms_node,
+    merge_term_results_node,
+    needs_candidate_widening,
+    per_term_states,
+    rank_and_validate_node,
     rank_mappings_node,
     retry_with_llm_rewrite_node,
+    speculative_prefetch_node,
+    term_result,
     validate_mapping_node,
+    widen_candidates_node,
 )
+from src.graph.structured_output import arecording_parse_stats, recording_parse_stats
 from src.graph.types import MappingState
 
+logger = logging.getLogger(__name__)
+
+# Map exact label/synonym matches deterministically, skipping rank/validate
+EXACT_MATCH_FAST_PATH = os.getenv("EXACT_MATCH_FAST_PATH", "true").lower() == "true"
+
+# Warm the search cache from the raw text while the first LLM calls run
+SPECULATIVE_PREFETCH = os.getenv("SPECULATIVE_PREFETCH", "false").lower() == "true"
+
+# Default pipeline mode: select and score each term's best candidate with one
+# fused rank_and_validate call instead of separate rank and validate calls
+FUSED_RANK_VALIDATE = os.getenv("FUSED_RANK_VALIDATE", "false").lower() == "true"
+
+# Run fetch → rank → validate → rewrite retry as its own subgraph per extracted
+# term, concurrently, instead of as whole-list stages with a whole-state retry.
+# Each term state holds one term, so RANK_BATCH cannot batch terms and the
+# per-node LLM_REQUEST_CONCURRENCY cap does not apply across terms
+PER_TERM_FANOUT = os.getenv("PER_TERM_FANOUT", "true").lower() == "true"
+
+# Entry mode: decide mappability and extract the terms with one LLM call
+# instead of the mappability vote followed by a separate extraction call
+FUSED_MAPPABILITY_EXTRACTION = (
+    os.getenv("FUSED_MAPPABILITY_EXTRACTION", "false").lower() == "true"
+)
+
+# Steps allowed in one term's pipeline run: up to 5 retry cycles of fetch,
+# exact match, rank, widen pages, validate and rewrite
+TERM_RECURSION_LIMIT = 100
+
 
 def should_retry_with_llm_rewrite(state: MappingState) -> bool:
     """
     Decide whether to retry with LLM rewrite AFTER validation.
     Trigger if any validated mapping has confidence < 0.9 and we haven't exceeded 5 retries.
+    Stop early once a retry round found no new candidates (see ``converged``),
+    or when the request's latency budget has no room for another round.
     """
     retry_count = state.get("retry_count", 0)
-    if retry_count >= 5:
+    if retry_count >= 5 or state.get("converged", False):
         return False
 
     validated_list = state.get("validated_mappings", [])
@@ -36,11 +104,60 @@ def should_retry_with_llm_rewrite(state: MappingState) -> bool:
     for mapping in validated_list:
         confidence = mapping.get("confidence", 1.0)
         if confidence < 0.9:
-            return True
+            return has_time_for(state, RETRY_MIN_SECONDS, "retry_with_llm_rewrite")
     
     return False
 
 
+def should_widen_candidates(state: MappingState) -> str:
+    """
+    Fetch more candidates for low-confidence terms before validating.
+    Widening stops once every term is confident or out of result pages, in
+    a retry round that found no new candidates (``converged``), or when the
+    request's latency budget runs low.
+    """
+    if state.get("converged", False):
+        return "validate_mapping"
+    pages = state.get("candidate_pages", {})
+    for entry in state.get("ranked_mappings", []):
+        if needs_candidate_widening(entry, pages):
+            if has_time_for(state, WIDEN_MIN_SECONDS, "widen_candidates"):
+                return "widen_candidates"
+            break
+    return "validate_mapping"
+
+
+def route_after_exact_match(state: MappingState) -> str:
+    """
+    Send ambiguous terms on to ranking, or finish when every term matched exactly.
+    """
+    if state.get("umls_mappings"):
+        return "rank_mappings"
+    return "__end__"
+
+
+def fan_out_terms(state: MappingState):
+    """
+    Send each extracted term to its own pipeline run, or merge when there are none.
+    Finish right away when the question is not mappable.
+    """
+    if not state.get("is_mappable", False):
+        return "__end__"
+    term_states = per_term_states(state)
+    if not term_states:
+        return "merge_term_results"
+    return [Send("map_term", term_state) for term_state in term_states]
+
+
+def route_to_term_pipeline(state: MappingState) -> str:
+    """
+    Start the whole-list term pipeline, or finish when the question is not mappable.
+    """
+    if state.get("is_mappable", False):
+        return "fetch_umls_terms"
+    return "__end__"
+
+
 def choose_extraction_node(state: MappingState) -> str:
     """
     Route to the appropriate medical term extraction node based on field type.
@@ -54,53 +171,269 @@ def choose_extraction_node(state: MappingState) -> str:
         return "extract_medical_terms_radio"
 
 
-# Create the main LangGraph state machine
-graph = StateGraph(MappingState)
-
-# Add all workflow nodes to the graph
-graph.add_node("is_question_mappable", is_question_mappable_node)
-graph.add_node("extract_medical_terms_checkbox", extract_medical_terms_checkbox_node)
-graph.add_node("extract_medical_terms_short", extract_medical_terms_short_node)
-graph.add_node("extract_medical_terms_radio", extract_medical_terms_radio_node)
-graph.add_node("fetch_umls_terms", fetch_umls_terms_node)
-graph.add_node("rank_mappings", rank_mappings_node)
-graph.add_node("validate_mapping", validate_mapping_node)
-graph.add_node("retry_with_llm_rewrite", retry_with_llm_rewrite_node)
-graph.add_node("choose_extraction", lambda state: state)  # Routing node
-
-# Entry
-graph.set_entry_point("is_question_mappable")
-graph.add_conditional_edges(
-    "is_question_mappable",
-    lambda state: state.get("is_mappable", False),
-    {True: "choose_extraction", False: "__end__"},
-)
-graph.add_conditional_edges(
-    "choose_extraction",
-    choose_extraction_node,
-    {
-        "extract_medical_terms_checkbox": "extract_medical_terms_checkbox",
-        "extract_medical_terms_short": "extract_medical_terms_short",
-        "extract_medical_terms_radio": "extract_medical_terms_radio",
-    },
-)
-graph.add_edge("extract_medical_terms_checkbox", "fetch_umls_terms")
-graph.add_edge("extract_medical_terms_short", "fetch_umls_terms")
-graph.add_edge("extract_medical_terms_radio", "fetch_umls_terms")
-graph.add_edge("fetch_umls_terms", "rank_mappings")
-graph.add_edge("rank_mappings", "validate_mapping")
-graph.add_conditional_edges(
-    "validate_mapping",
-    should_retry_with_llm_rewrite,
-    {True: "retry_with_llm_rewrite", False: "__end__"},
-)
-graph.add_edge("retry_with_llm_rewrite", "fetch_umls_terms")
+def _node(func, afunc):
+    """
+    Pair a sync node with its async variant.
+
+    The graph runs ``func`` under ``invoke`` and awaits ``afunc`` under
+    ``ainvoke``, so one compiled graph serves both entry points. Both record
+    their structured output parse counters in the state's ``parse_stats`` and
+    expose the request deadline to the LLM wrappers they call.
+    """
+    name = func.__name__.removesuffix("_node")
+    return RunnableLambda(
+        recording_parse_stats(within_deadline(func), name),
+        afunc=arecording_parse_stats(awithin_deadline(afunc), name),
+        name=func.__name__,
+    )
+
+
+def _term_node(term_graph):
+    """
+    Wrap the compiled per-term graph as the ``map_term`` node.
+
+    The node runs one term state through the term pipeline and returns only
+    its ``term_results`` entry, which the state's reducer merges with the
+    other terms' entries.
+    """
+    config = {"recursion_limit": TERM_RECURSION_LIMIT}
 
-# Compile
+    def map_term(state: MappingState) -> MappingState:
+        return {"term_results": term_result(term_graph.invoke(state, config))}
+
+    async def amap_term(state: MappingState) -> MappingState:
+        return {"term_results": term_result(await term_graph.ainvoke(state, config))}
+
+    return RunnableLambda(map_term, afunc=amap_term, name="map_term")
+
+
+def _add_term_pipeline(graph: StateGraph, fused_rank_validate: bool) -> None:
+    """
+    Add the fetch → rank → validate → rewrite retry nodes and edges to a graph.
+
+    The pipeline starts at ``fetch_umls_terms`` and ends at ``__end__``.
+
+    Args:
+        graph: Graph to add the pipeline to
+        fused_rank_validate: Use the single-call rank_and_validate node instead
+            of rank_mappings → widen_candidates → validate_mapping
+    """
+    graph.add_node(
+        "fetch_umls_terms", _node(fetch_umls_terms_node, afetch_umls_terms_node)
+    )
+    if fused_rank_validate:
+        graph.add_node(
+            "rank_and_validate", _node(rank_and_validate_node, arank_and_validate_node)
+        )
+    else:
+        graph.add_node("rank_mappings", _node(rank_mappings_node, arank_mappings_node))
+        graph.add_node(
+            "widen_candidates", _node(widen_candidates_node, awiden_candidates_node)
+        )
+        graph.add_node(
+            "validate_mapping", _node(validate_mapping_node, avalidate_mapping_node)
+        )
+    if EXACT_MATCH_FAST_PATH:
+        graph.add_node(
+            "match_exact_terms", _node(match_exact_terms_node, amatch_exact_terms_node)
+        )
+    graph.add_node(
+        "retry_with_llm_rewrite",
+        _node(retry_with_llm_rewrite_node, aretry_with_llm_rewrite_node),
+    )
+
+    # Candidate selection: fused single call, or rank (+ widen) then validate
+    select_node = "rank_and_validate" if fused_rank_validate else "rank_mappings"
+    validated_node = "rank_and_validate" if fused_rank_validate else "validate_mapping"
+    if EXACT_MATCH_FAST_PATH:
+        graph.add_edge("fetch_umls_terms", "match_exact_terms")
+        graph.add_conditional_edges(
+            "match_exact_terms",
+            route_after_exact_match,
+            {"rank_mappings": select_node, "__end__": "__end__"},
+        )
+    else:
+        graph.add_edge("fetch_umls_terms", select_node)
+    if not fused_rank_validate:
+        for ranked_node in ("rank_mappings", "widen_candidates"):
+            graph.add_conditional_edges(
+                ranked_node,
+                should_widen_candidates,
+                {
+                    "widen_candidates": "widen_candidates",
+                    "validate_mapping": "validate_mapping",
+                },
+            )
+    graph.add_conditional_edges(
+        validated_node,
+        should_retry_with_llm_rewrite,
+        {True: "retry_with_llm_rewrite", False: "__end__"},
+    )
+    graph.add_edge("retry_with_llm_rewrite", "fetch_umls_terms")
+
+
+def create_term_graph(fused_rank_validate: bool = FUSED_RANK_VALIDATE) -> StateGraph:
+    """
+    Create the (uncompiled) pipeline graph run once per extracted term.
+
+    Args:
+        fused_rank_validate: Use the single-call rank_and_validate node
+
+    Returns:
+        StateGraph: The term pipeline graph, ready to compile
+    """
+    graph = StateGraph(MappingState)
+    _add_term_pipeline(graph, fused_rank_validate)
+    graph.set_entry_point("fetch_umls_terms")
+    return graph
+
+
+def create_mapping_graph(
+    fused_rank_validate: bool = FUSED_RANK_VALIDATE,
+    per_term_fanout: bool = PER_TERM_FANOUT,
+    fused_mappability_extraction: bool = FUSED_MAPPABILITY_EXTRACTION,
+) -> StateGraph:
+    """
+    Create the (uncompiled) mapping workflow graph.
+
+    Args:
+        fused_rank_validate: Use the single-call rank_and_validate node instead
+            of rank_mappings → widen_candidates → validate_mapping
+        per_term_fanout: Run the term pipeline once per extracted term (in
+            parallel, merged by merge_term_results) instead of on the whole
+            term list
+        fused_mappability_extraction: Start with the single-call
+            is_mappable_and_extract node instead of is_question_mappable →
+            choose_extraction → extract_medical_terms_*
+
+    Returns:
+        StateGraph: The workflow graph, ready to compile
+    """
+    if per_term_fanout and RANK_BATCH:
+        logger.warning(
+            "RANK_BATCH has no effect with PER_TERM_FANOUT: each term is ranked "
+            "on its own; set PER_TERM_FANOUT=false to batch terms"
+        )
+    graph = StateGraph(MappingState)
+
+    # Add all workflow nodes to the graph
+    if fused_mappability_extraction:
+        graph.add_node(
+            "is_mappable_and_extract",
+            _node(is_mappable_and_extract_node, ais_mappable_and_extract_node),
+        )
+        entry_node = "is_mappable_and_extract"
+        extraction_nodes: Tuple[str, ...] = ("is_mappable_and_extract",)
+    else:
+        graph.add_node(
+            "is_question_mappable",
+            _node(is_question_mappable_node, ais_question_mappable_node),
+        )
+        graph.add_node(
+            "extract_medical_terms_checkbox",
+            _node(
+                extract_medical_terms_checkbox_node,
+                aextract_medical_terms_checkbox_node,
+            ),
+        )
+        graph.add_node(
+            "extract_medical_terms_short",
+            _node(extract_medical_terms_short_node, aextract_medical_terms_short_node),
+        )
+        graph.add_node(
+            "extract_medical_terms_radio",
+            _node(extract_medical_terms_radio_node, aextract_medical_terms_radio_node),
+        )
+        graph.add_node("choose_extraction", lambda state: state)  # Routing node
+        entry_node = "is_question_mappable"
+        extraction_nodes = (
+            "extract_medical_terms_checkbox",
+            "extract_medical_terms_short",
+            "extract_medical_terms_radio",
+        )
+    if per_term_fanout:
+        term_graph = create_term_graph(fused_rank_validate).compile()
+        graph.add_node("map_term", _term_node(term_graph))
+        graph.add_node(
+            "merge_term_results",
+            _node(merge_term_results_node, amerge_term_results_node),
+        )
+    else:
+        _add_term_pipeline(graph, fused_rank_validate)
+    if SPECULATIVE_PREFETCH:
+        graph.add_node(
+            "speculative_prefetch",
+            _node(speculative_prefetch_node, aspeculative_prefetch_node),
+        )
+
+    # Entry
+    if SPECULATIVE_PREFETCH:
+        graph.set_entry_point("speculative_prefetch")
+        graph.add_edge("speculative_prefetch", entry_node)
+    else:
+        graph.set_entry_point(entry_node)
+    if not fused_mappability_extraction:
+        graph.add_conditional_edges(
+            "is_question_mappable",
+            lambda state: state.get("is_mappable", False),
+            {True: "choose_extraction", False: "__end__"},
+        )
+        graph.add_conditional_edges(
+            "choose_extraction",
+            choose_extraction_node,
+            {
+                "extract_medical_terms_checkbox": "extract_medical_terms_checkbox",
+                "extract_medical_terms_short": "extract_medical_terms_short",
+                "extract_medical_terms_radio": "extract_medical_terms_radio",
+            },
+        )
+
+    if not per_term_fanout:
+        for extraction_node in extraction_nodes:
+            graph.add_conditional_edges(
+                extraction_node,
+                route_to_term_pipeline,
+                {"fetch_umls_terms": "fetch_umls_terms", "__end__": "__end__"},
+            )
+        return graph
+
+    # Fan out: one map_term run per term, merged once every term is done
+    for extraction_node in extraction_nodes:
+        graph.add_conditional_edges(
+            extraction_node,
+            fan_out_terms,
+            ["map_term", "merge_term_results", "__end__"],
+        )
+    graph.add_edge("map_term", "merge_term_results")
+    graph.add_edge("merge_term_results", "__end__")
+    return graph
+
+
+# Create and compile the main LangGraph state machine
+graph = create_mapping_graph()
 umls_mapping_graph = graph.compile()
 raw_graph = umls_mapping_graph.get_graph()
 
+# Compiled graphs for non-default pipeline modes, built on first request
+_mode_graphs: Dict[bool, Any] = {}
+
 
-def build_umls_mapper_graph():
-    """Return the compiled LangGraph workflow."""
-    return umls_mapping_graph
+def build_umls_mapper_graph(fused_rank_validate: Optional[bool] = None):
+    """
+    Return the compiled LangGraph workflow.
+
+    Args:
+        fused_rank_validate: Select the fused rank-and-validate pipeline (True)
+            or the separate rank/validate nodes (False); None returns the
+            default graph configured by FUSED_RANK_VALIDATE
+
+    Returns:
+        The compiled graph (supports ``invoke`` and ``ainvoke``)
+    """
+    if fused_rank_validate is None or fused_rank_validate == FUSED_RANK_VALIDATE:
+        return umls_mapping_graph
+    if fused_rank_validate not in _mode_graphs:
+        _mode_graphs[fused_rank_validate] = create_mapping_graph(
+            fused_rank_validate
+        ).compile()
+    return _mode_graphs[fused_rank_validate]
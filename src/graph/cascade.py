@@ -0,0 +1,147 @@
+"""
+Model cascade for the UMLS Mapping LangGraph-based Agent.
+This module lets a task be answered by a small, fast model first and re-issues
+the call to the large model only when the small model's output is malformed or
+not confident enough, tracking how often each task escalates.
+"""
+
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from src.graph.structured_output import decode_structured, response_text
+
+logger = logging.getLogger(__name__)
+
+# A check inspects a raw response text and returns why it must be escalated
+# ("malformed" / "low_confidence"), or None to accept it
+CascadeCheck = Callable[[str, float], Optional[str]]
+
+
+def _confidence(value: Any) -> float:
+    """Parse "85%" or 0.85 style confidences into [0, 1]."""
+    if isinstance(value, str):
+        return float(value.replace("%", "").strip()) / 100.0
+    return float(value)
+
+
+def check_extraction(raw: str, threshold: float) -> Optional[str]:
+    """Extraction must yield a non-empty list of terms."""
+    try:
+        parsed = decode_structured(raw, "extracted_terms")
+    except ValueError:
+        return "malformed"
+    return None if parsed else "malformed"
+
+
+def _check_ranked_list(items: Any, threshold: float) -> Optional[str]:
+    """A ranking is a non-empty list whose best confidence meets the threshold."""
+    if not isinstance(items, list) or not items:
+        return "malformed"
+    try:
+        best = max(_confidence(item["confidence"]) for item in items)
+        if not all(item["matched_code"] for item in items):
+            return "malformed"
+    except Exception:
+        return "malformed"
+    return "low_confidence" if best < threshold else None
+
+
+def check_ranking(raw: str, threshold: float) -> Optional[str]:
+    """Check a batched ranking's every term, or a per-term ranking list."""
+    try:
+        batch = decode_structured(raw, "batch_ranking")
+    except ValueError:
+        try:
+            return _check_ranked_list(decode_structured(raw, "ranking"), threshold)
+        except ValueError:
+            return "malformed"
+    if not batch:
+        return "malformed"
+    reasons = [_check_ranked_list(items, threshold) for items in batch.values()]
+    if "malformed" in reasons:
+        return "malformed"
+    return "low_confidence" if "low_confidence" in reasons else None
+
+
+def check_validation(raw: str, threshold: float) -> Optional[str]:
+    """Validation must name a best match with a confidence above the threshold."""
+    try:
+        parsed = decode_structured(raw, "validation")
+        code = parsed.get("best_match_code")
+        confidence = _confidence(parsed["confidence"])
+    except Exception:
+        return "malformed"
+    if not code:
+        return "malformed"
+    return "low_confidence" if confidence < threshold else None
+
+
+class ModelCascade:
+    """
+    Small-then-large chat model wrapper for one task.
+
+    ``invoke``/``ainvoke`` call the small model and return its response when
+    ``check`` accepts it; otherwise the same prompt is re-issued to the large
+    model, whose response is returned as-is. Every other attribute is
+    delegated to the large model.
+    """
+
+    def __init__(
+        self,
+        task: str,
+        small: Any,
+        large: Any,
+        check: CascadeCheck,
+        threshold: float,
+    ):
+        self.task = task
+        self.small = small
+        self.large = large
+        self.check = check
+        self.threshold = threshold
+        self.calls = 0
+        self.escalations: Dict[str, int] = {"malformed": 0, "low_confidence": 0}
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.large, name)
+
+    def _escalation_reason(self, response: Any) -> Optional[str]:
+        """Record the call and return why it must escalate (None to accept)."""
+        reason = self.check(response_text(response), self.threshold)
+        with self._lock:
+            self.calls += 1
+            if reason is not None:
+                self.escalations[reason] += 1
+        if reason is not None:
+            logger.info(f"Model cascade escalation - task: {self.task}, reason: {reason}")
+        return reason
+
+    def invoke(self, prompt: Any, *args: Any, **kwargs: Any) -> Any:
+        """Answer with the small model, escalating to the large one if needed."""
+        response = self.small.invoke(prompt, *args, **kwargs)
+        if self._escalation_reason(response) is None:
+            return response
+        return self.large.invoke(prompt, *args, **kwargs)
+
+    async def ainvoke(self, prompt: Any, *args: Any, **kwargs: Any) -> Any:
+        """Async variant of ``invoke``."""
+        response = await self.small.ainvoke(prompt, *args, **kwargs)
+        if self._escalation_reason(response) is None:
+            return response
+        return await self.large.ainvoke(prompt, *args, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return call and escalation counters and the escalation rate."""
+        with self._lock:
+            escalated = sum(self.escalations.values())
+            return {
+                "calls": self.calls,
+                "escalations": escalated,
+                "malformed": self.escalations["malformed"],
+                "low_confidence": self.escalations["low_confidence"],
+                "escalation_rate": round(escalated / self.calls, 3)
+                if self.calls
+                else 0.0,
+            }
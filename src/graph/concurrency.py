@@ -0,0 +1,251 @@
+"""
+Bounded-concurrency execution of LLM calls for the UMLS Mapping LangGraph-based Agent.
+This module runs a node's independent per-term LLM calls in parallel on a
+shared thread pool (or as asyncio tasks on the async path), capped per call
+site (one request's node) and per process, so a node's wall time approaches
+its slowest call instead of the sum of all.
+"""
+
+import asyncio
+import contextvars
+import logging
+import os
+import threading
+import weakref
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Set, TypeVar
+
+# Maximum LLM calls in flight for one node of one request
+LLM_REQUEST_CONCURRENCY = int(os.getenv("LLM_REQUEST_CONCURRENCY", "4"))
+
+# Maximum LLM calls in flight across all requests in this process
+LLM_PROCESS_CONCURRENCY = int(os.getenv("LLM_PROCESS_CONCURRENCY", "16"))
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+_executor: Optional[ThreadPoolExecutor] = None
+_lock = threading.Lock()
+
+# Process-wide slots for async calls, one semaphore per event loop (dropped
+# with its loop)
+_async_slots: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Return the process-wide executor that bounds concurrent LLM calls."""
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=LLM_PROCESS_CONCURRENCY, thread_name_prefix="llm-call"
+                )
+    return _executor
+
+
+def map_concurrently(
+    fn: Callable[[T], R],
+    items: Sequence[T],
+    max_concurrency: int = LLM_REQUEST_CONCURRENCY,
+) -> List[R]:
+    """
+    Apply ``fn`` to every item concurrently, returning results in input order.
+
+    At most ``max_concurrency`` calls from this invocation are in flight at a
+    time, and all invocations share a pool of LLM_PROCESS_CONCURRENCY workers.
+    ``fn`` should handle its own per-item failures; an exception it raises is
+    re-raised here after the remaining calls finish. With one item, or a cap
+    of 1, calls run inline on the calling thread. ``fn`` must not call
+    ``map_concurrently`` itself, as nested calls could exhaust the pool.
+    Each call runs in a copy of the caller's context (context variables).
+
+    Args:
+        fn: Function performing one (blocking) LLM call
+        items: Inputs, one per call
+        max_concurrency: Per-invocation cap on calls in flight
+
+    Returns:
+        List of ``fn(item)`` results, in the order of ``items``
+    """
+    if len(items) <= 1 or max_concurrency <= 1:
+        return [fn(item) for item in items]
+
+    executor = _get_executor()
+    results: Dict[int, R] = {}
+    errors: List[BaseException] = []
+    in_flight: Dict[Future, int] = {}
+    next_index = 0
+
+    while next_index < len(items) or in_flight:
+        while next_index < len(items) and len(in_flight) < max_concurrency:
+            ctx = contextvars.copy_context()
+            in_flight[executor.submit(ctx.run, fn, items[next_index])] = next_index
+            next_index += 1
+        done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+        for future in done:
+            index = in_flight.pop(future)
+            exc = future.exception()
+            if exc is None:
+                results[index] = future.result()
+            else:
+                errors.append(exc)
+
+    if errors:
+        raise errors[0]
+    return [results[i] for i in range(len(items))]
+
+
+def map_until(
+    fn: Callable[[T], R],
+    items: Sequence[T],
+    done: Callable[[List[R]], bool],
+    max_concurrency: int = LLM_REQUEST_CONCURRENCY,
+) -> List[R]:
+    """
+    Apply ``fn`` to items concurrently until ``done`` accepts the results.
+
+    Like ``map_concurrently``, but ``done`` is checked after every completed
+    call and, once it returns True, no further items are started and calls
+    still in flight are abandoned (their results are discarded). An exception
+    raised by ``fn`` is re-raised only if ``done`` never accepted the results.
+
+    Args:
+        fn: Function performing one (blocking) LLM call
+        items: Inputs, one per call
+        done: Predicate over the results received so far
+        max_concurrency: Per-invocation cap on calls in flight
+
+    Returns:
+        List of the results received, in completion order
+    """
+    results: List[R] = []
+    if len(items) <= 1 or max_concurrency <= 1:
+        for item in items:
+            results.append(fn(item))
+            if done(results):
+                break
+        return results
+
+    executor = _get_executor()
+    errors: List[BaseException] = []
+    in_flight: Set[Future] = set()
+    next_index = 0
+
+    while next_index < len(items) or in_flight:
+        while next_index < len(items) and len(in_flight) < max_concurrency:
+            ctx = contextvars.copy_context()
+            in_flight.add(executor.submit(ctx.run, fn, items[next_index]))
+            next_index += 1
+        finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+        for future in finished:
+            exc = future.exception()
+            if exc is None:
+                results.append(future.result())
+            else:
+                errors.append(exc)
+        if done(results):
+            for future in in_flight:
+                future.cancel()
+            return results
+
+    if errors:
+        raise errors[0]
+    return results
+
+
+def _get_async_slots() -> asyncio.Semaphore:
+    """Return the process-wide LLM call semaphore of the running event loop."""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        slots = _async_slots.get(loop)
+        if slots is None:
+            slots = asyncio.Semaphore(LLM_PROCESS_CONCURRENCY)
+            _async_slots[loop] = slots
+    return slots
+
+
+async def amap_concurrently(
+    afn: Callable[[T], Awaitable[R]],
+    items: Sequence[T],
+    max_concurrency: int = LLM_REQUEST_CONCURRENCY,
+) -> List[R]:
+    """
+    Async variant of ``map_concurrently``: await ``afn`` for every item.
+
+    Calls run as tasks on the running event loop, at most ``max_concurrency``
+    of them from this invocation and LLM_PROCESS_CONCURRENCY across the
+    process at a time. Results are returned in input order; the first
+    exception raised by ``afn`` is re-raised after all calls finish.
+
+    Args:
+        afn: Coroutine function performing one LLM call
+        items: Inputs, one per call
+        max_concurrency: Per-invocation cap on calls in flight
+
+    Returns:
+        List of ``await afn(item)`` results, in the order of ``items``
+    """
+    request_slots = asyncio.Semaphore(max(max_concurrency, 1))
+    process_slots = _get_async_slots()
+
+    async def run(item: T) -> R:
+        async with request_slots, process_slots:
+            return await afn(item)
+
+    results = await asyncio.gather(
+        *(run(item) for item in items), return_exceptions=True
+    )
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return list(results)  # type: ignore[arg-type]
+
+
+async def amap_until(
+    afn: Callable[[T], Awaitable[R]],
+    items: Sequence[T],
+    done: Callable[[List[R]], bool],
+    max_concurrency: int = LLM_REQUEST_CONCURRENCY,
+) -> List[R]:
+    """
+    Async variant of ``map_until``: calls still running once ``done`` accepts
+    the results are cancelled.
+
+    Args:
+        afn: Coroutine function performing one LLM call
+        items: Inputs, one per call
+        done: Predicate over the results received so far
+        max_concurrency: Per-invocation cap on calls in flight
+
+    Returns:
+        List of the results received, in completion order
+    """
+    request_slots = asyncio.Semaphore(max(max_concurrency, 1))
+    process_slots = _get_async_slots()
+
+    async def run(item: T) -> R:
+        async with request_slots, process_slots:
+            return await afn(item)
+
+    tasks = [asyncio.ensure_future(run(item)) for item in items]
+    results: List[R] = []
+    errors: List[BaseException] = []
+    try:
+        for next_result in asyncio.as_completed(tasks):
+            try:
+                results.append(await next_result)
+            except Exception as e:
+                errors.append(e)
+            if done(results):
+                return results
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+    if errors:
+        raise errors[0]
+    return results
@@ -0,0 +1,117 @@
+"""
+Request latency budget for the UMLS Mapping LangGraph-based Agent.
+This module turns a request's time budget into a deadline carried in the
+mapping state, and lets routers and nodes check whether a stage still fits
+before starting it, so a slow request degrades to best-so-far results instead
+of timing out at the gateway.
+"""
+
+import contextvars
+import functools
+import logging
+import os
+import time
+from typing import Callable, Optional
+
+from src.graph.types import MappingState
+
+logger = logging.getLogger(__name__)
+
+# Seconds a /map request may spend in the graph (API Gateway HTTP APIs cut
+# integrations off at 30s)
+REQUEST_TIME_BUDGET = float(os.getenv("REQUEST_TIME_BUDGET", "25"))
+
+# Time a stage needs to be worth starting; below it the stage is skipped
+RETRY_MIN_SECONDS = 8.0  # rewrite + fetch + rank + validate round
+WIDEN_MIN_SECONDS = 5.0  # fetch and rank another page, then validate
+VALIDATE_MIN_SECONDS = 3.0  # one validation LLM call
+EXTRACT_MIN_SECONDS = 3.0  # another extraction (or fused entry) LLM call
+FETCH_MIN_SECONDS = 1.0  # one ontology search round
+RANK_MIN_SECONDS = 3.0  # one ranking (or fused rank-and-validate) LLM call
+
+# Deadline of the node currently running (see ``within_deadline``), for code
+# below the nodes that never sees the state, such as the LLM wrappers;
+# shared with the threads and tasks the node fans out to
+_current_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar(
+    "current_deadline", default=None
+)
+
+
+def request_deadline(
+    start_time: float,
+    budget: float = REQUEST_TIME_BUDGET,
+    remaining: Optional[float] = None,
+) -> float:
+    """
+    Compute a request's deadline (epoch seconds) for the ``deadline`` state field.
+
+    Args:
+        start_time: Request start timestamp (``time.time()``)
+        budget: Seconds the request may take
+        remaining: Seconds the runtime still allows (e.g. the Lambda
+            context's remaining time), if known
+
+    Returns:
+        float: Deadline timestamp
+    """
+    deadline = start_time + budget
+    if remaining is not None:
+        # Keep a second to serialize and return the response
+        deadline = min(deadline, time.time() + remaining - 1.0)
+    return deadline
+
+
+def time_left(state: Optional[MappingState] = None) -> float:
+    """
+    Seconds until the state's deadline (infinite without one).
+
+    Without a state, the deadline of the node currently running is used.
+    """
+    deadline = _current_deadline.get() if state is None else state.get("deadline")
+    if deadline is None:
+        return float("inf")
+    return deadline - time.time()
+
+
+def has_time_for(state: MappingState, seconds: float, stage: str) -> bool:
+    """
+    Whether a stage needing ``seconds`` still fits the request's budget.
+
+    Logs the skipped stage when it does not.
+    """
+    left = time_left(state)
+    if left >= seconds:
+        return True
+    logger.warning(
+        f"Latency budget low, skipping stage - stage: {stage}, "
+        f"time_left: {left:.2f}s, needed: {seconds:.2f}s"
+    )
+    return False
+
+
+def within_deadline(func: Callable) -> Callable:
+    """Wrap a sync node so code it calls can read its deadline (``time_left()``)."""
+
+    @functools.wraps(func)
+    def wrapper(state):
+        token = _current_deadline.set(state.get("deadline"))
+        try:
+            return func(state)
+        finally:
+            _current_deadline.reset(token)
+
+    return wrapper
+
+
+def awithin_deadline(afunc: Callable) -> Callable:
+    """Async variant of ``within_deadline``."""
+
+    @functools.wraps(afunc)
+    async def wrapper(state):
+        token = _current_deadline.set(state.get("deadline"))
+        try:
+            return await afunc(state)
+        finally:
+            _current_deadline.reset(token)
+
+    return wrapper
@@ -0,0 +1,271 @@
+"""
+LLM response cache for the UMLS Mapping LangGraph-based Agent.
+This module provides a content-addressed, two-tier (in-memory LRU + optional
+SQLite) cache of chat model responses keyed by task, model id and the rendered
+prompt, and a wrapper that serves the AGENT_LLM_MAP clients from it. Every task
+runs at temperature 0.0, so re-mapping the same survey or hitting the same term
+across questions returns the stored answer instead of paying for another call.
+"""
+
+import glob
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from langchain_core.messages import AIMessage
+
+from src.graph.structured_output import conforms_to_schema, response_text
+from src.prompts.template import PROMPT_DIR
+
+logger = logging.getLogger(__name__)
+
+
+def cache_fingerprint(model_config: Mapping[str, Any], provider: str) -> str:
+    """
+    Fingerprint the prompt templates and model configuration.
+
+    Used as the cache namespace: editing any template in ``src/prompts/`` or
+    changing a task's model or temperature yields a new fingerprint, which
+    discards every previously cached response.
+
+    Args:
+        model_config: Task name to (model id, temperature) mapping in use
+        provider: Active LLM provider ("openai" or "bedrock")
+
+    Returns:
+        str: Short hex digest
+    """
+    digest = hashlib.sha256()
+    digest.update(provider.encode())
+    digest.update(json.dumps(model_config, sort_keys=True).encode())
+    for path in sorted(glob.glob(os.path.join(PROMPT_DIR, "*.md"))):
+        digest.update(os.path.basename(path).encode())
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def _prompt_text(prompt: Any) -> str:
+    """Serialize a prompt (string or message list) for hashing."""
+    if isinstance(prompt, str):
+        return prompt
+    if isinstance(prompt, (list, tuple)):
+        return json.dumps(
+            [[getattr(m, "type", ""), getattr(m, "content", m)] for m in prompt],
+            default=str,
+        )
+    return repr(prompt)
+
+
+class LLMResponseCache:
+    """
+    LRU + TTL cache of LLM response texts with an optional on-disk tier.
+
+    Entries are scoped to a namespace (see ``cache_fingerprint``). Opening a
+    disk cache whose stored namespace differs from the current one discards
+    its entries, so changed prompts or models never serve stale answers.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        max_size: int = 1024,
+        ttl: float = 7 * 86400.0,
+        path: str = "",
+    ):
+        self.namespace = namespace
+        self.max_size = max_size
+        self.ttl = ttl
+        self.path = path
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+
+        if path:
+            try:
+                self._db = self._open_db(path)
+            except sqlite3.Error as e:
+                logger.error(f"LLM cache disk tier disabled - path: {path}, error: {e}")
+                self._db = None
+
+    def _open_db(self, path: str) -> sqlite3.Connection:
+        """Open the SQLite tier and drop its entries if the namespace changed."""
+        db = sqlite3.connect(path, check_same_thread=False)
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        row = db.execute("SELECT value FROM meta WHERE name = 'namespace'").fetchone()
+        if row is None or row[0] != self.namespace:
+            if row is not None:
+                logger.info(
+                    f"LLM cache invalidated - path: {path}, "
+                    f"old_namespace: {row[0]}, new_namespace: {self.namespace}"
+                )
+            db.execute("DELETE FROM llm_cache")
+            db.execute(
+                "INSERT OR REPLACE INTO meta (name, value) VALUES ('namespace', ?)",
+                (self.namespace,),
+            )
+        db.execute("DELETE FROM llm_cache WHERE expires_at < ?", (time.time(),))
+        db.commit()
+        return db
+
+    @staticmethod
+    def make_key(task: str, model_id: str, prompt: Any) -> str:
+        """Build the content address of a call: hash of task, model and prompt."""
+        payload = "\x1f".join([task, model_id, _prompt_text(prompt)])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a cached response text.
+
+        Returns:
+            The cached text, or None on a miss or expired entry
+        """
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at >= now:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and row[1] >= now:
+                    self._remember(key, row[1], row[0])
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return row[0]
+
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: str) -> None:
+        """Store a response text in every enabled tier."""
+        expires_at = time.time() + self.ttl
+
+        with self._lock:
+            self._remember(key, expires_at, value)
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO llm_cache (key, value, expires_at) "
+                        "VALUES (?, ?, ?)",
+                        (key, value, expires_at),
+                    )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    logger.warning(f"LLM cache disk write failed - error: {e}")
+
+    def _remember(self, key: str, expires_at: float, value: str) -> None:
+        """Insert into the memory tier, evicting least recently used entries."""
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop all entries from every tier."""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM llm_cache")
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the current memory tier size."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "size": len(self._memory),
+        }
+
+
+class CachedChatModel:
+    """
+    Chat model wrapper that answers repeated prompts from an LLMResponseCache.
+
+    Only ``invoke``/``ainvoke`` are cached; every other attribute is delegated
+    to the wrapped model. Cached answers come back as ``AIMessage`` objects
+    carrying the original text (see ``response_text``), which is all the nodes
+    read. Empty responses are not cached, nor are responses to a
+    ``structured_output=<schema>`` call that do not conform to the schema, so
+    a malformed answer is not served again to the retry that re-asks for it.
+    Calls made with ``bypass_cache=True`` (retries) skip the lookup and
+    replace the stored answer.
+    """
+
+    def __init__(self, task: str, llm: Any, model_id: str, cache: LLMResponseCache):
+        self.task = task
+        self.llm = llm
+        self.model_id = model_id
+        self.cache = cache
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.llm, name)
+
+    def _lookup(self, prompt: Any, kwargs: Dict[str, Any]) -> Tuple[str, Any]:
+        """Return the call's cache key and cached answer (None on miss or bypass)."""
+        key = self.cache.make_key(self.task, self.model_id, prompt)
+        if kwargs.pop("bypass_cache", False):
+            return key, None
+        cached = self.cache.get(key)
+        if cached is None:
+            return key, None
+        logger.debug(f"LLM cache hit - task: {self.task}, key: {key[:12]}")
+        return key, AIMessage(content=cached)
+
+    def invoke(self, prompt: Any, *args: Any, **kwargs: Any) -> Any:
+        """Return the cached response for ``prompt`` or call the model."""
+        key, cached = self._lookup(prompt, kwargs)
+        if cached is not None:
+            return cached
+
+        response = self.llm.invoke(prompt, *args, **kwargs)
+        self._store(key, response, kwargs.get("structured_output"))
+        return response
+
+    async def ainvoke(self, prompt: Any, *args: Any, **kwargs: Any) -> Any:
+        """Async variant of ``invoke``."""
+        key, cached = self._lookup(prompt, kwargs)
+        if cached is not None:
+            return cached
+
+        response = await self.llm.ainvoke(prompt, *args, **kwargs)
+        self._store(key, response, kwargs.get("structured_output"))
+        return response
+
+    def _store(self, key: str, response: Any, schema: Optional[str]) -> None:
+        """Cache the text (or forced tool call arguments) of a usable response."""
+        content = response_text(response)
+        if not content.strip():
+            return
+        if schema is not None and not conforms_to_schema(content, schema):
+            logger.debug(f"LLM cache skip, malformed output - task: {self.task}")
+            return
+        self.cache.set(key, content)
@@ -0,0 +1,112 @@
+"""
+Lazy LLM client registry for the UMLS Mapping LangGraph-based Agent.
+This module defers constructing provider SDK clients until a task first calls
+its model, and shares one client (and so one connection pool) between all
+tasks that use the same provider, model id and temperature.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Tuple
+
+from src.graph.structured_output import structured_output_kwargs
+
+logger = logging.getLogger(__name__)
+
+# (provider, model id, temperature)
+ClientKey = Tuple[str, str, float]
+
+
+class LLMClientRegistry:
+    """
+    Process-wide cache of chat model clients, created on first use.
+
+    ``factories`` maps a provider name to a function building a client from a
+    model id and temperature.
+    """
+
+    def __init__(self, factories: Dict[str, Callable[[str, float], Any]]):
+        self.factories = factories
+        self._clients: Dict[ClientKey, Any] = {}
+        self._lock = threading.Lock()
+
+    def get(self, provider: str, model_id: str, temperature: float = 0.0) -> Any:
+        """Return the shared client for a model, creating it if needed."""
+        key = (provider, model_id, temperature)
+        client = self._clients.get(key)
+        if client is not None:
+            return client
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                start = time.time()
+                client = self.factories[provider](model_id, temperature)
+                self._clients[key] = client
+                logger.info(
+                    f"LLM client created - provider: {provider}, model: {model_id}, "
+                    f"elapsed: {time.time() - start:.2f}s"
+                )
+        return client
+
+    def lazy(self, provider: str, model_id: str, temperature: float = 0.0) -> "LazyChatModel":
+        """Return a proxy that resolves the shared client on first use."""
+        return LazyChatModel(self, (provider, model_id, temperature))
+
+    def prewarm(self, keys: Iterable[ClientKey]) -> int:
+        """
+        Create the clients for ``keys`` now rather than on first use.
+
+        Returns:
+            int: Number of clients created by this call
+        """
+        before = len(self._clients)
+        for provider, model_id, temperature in set(keys):
+            self.get(provider, model_id, temperature)
+        return len(self._clients) - before
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+
+class LazyChatModel:
+    """
+    Chat model proxy bound to a registry key.
+
+    ``invoke``/``ainvoke`` and every other attribute are delegated to the
+    registry's shared client, which is created on the first access. A
+    ``structured_output=<schema name>`` keyword is translated into the
+    provider's own structured output options (see ``structured_output_kwargs``),
+    so callers above this proxy stay provider-neutral.
+    """
+
+    def __init__(self, registry: LLMClientRegistry, key: ClientKey):
+        self.registry = registry
+        self.key = key
+
+    @property
+    def client(self) -> Any:
+        """The shared client (created on first access)."""
+        return self.registry.get(*self.key)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.client, name)
+
+    def _provider_kwargs(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """Replace a ``structured_output`` keyword with provider options."""
+        # Only meaningful to a CachedChatModel wrapper, if any
+        kwargs.pop("bypass_cache", None)
+        name = kwargs.pop("structured_output", None)
+        if name is not None:
+            kwargs.update(structured_output_kwargs(name, self.key[0]))
+        return kwargs
+
+    def invoke(self, prompt: Any, *args: Any, **kwargs: Any) -> Any:
+        """Invoke the shared client."""
+        return self.client.invoke(prompt, *args, **self._provider_kwargs(kwargs))
+
+    async def ainvoke(self, prompt: Any, *args: Any, **kwargs: Any) -> Any:
+        """Async variant of ``invoke``."""
+        return await self.client.ainvoke(
+            prompt, *args, **self._provider_kwargs(kwargs)
+        )
@@ -0,0 +1,304 @@
+"""
+Multi-provider LLM routing for the UMLS Mapping LangGraph-based Agent.
+This module sends each task's calls to the healthiest of several
+(provider, model) routes, judged by rolling latency and error rate. It fails
+over to the next route when a call errors, and can hedge a slow call with a
+duplicate on the next route, returning whichever answers first.
+"""
+
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Outcomes older than this no longer count towards a route's health, so a
+# route that failed during an incident is retried once it has aged out
+HEALTH_WINDOW_SECONDS = 120.0
+
+# Samples needed before error rate (resp. latency percentiles) are trusted
+MIN_ERROR_SAMPLES = 5
+MIN_LATENCY_SAMPLES = 20
+
+# Error rate above which a route is only used when every route is unhealthy
+MAX_ERROR_RATE = 0.5
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Return the executor running sync hedged attempts."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=32, thread_name_prefix="llm-hedge"
+                )
+    return _executor
+
+
+class RouteHealth:
+    """Rolling window of call outcomes (success, latency) for one route."""
+
+    def __init__(self, name: str, window_seconds: float = HEALTH_WINDOW_SECONDS):
+        self.name = name
+        self.window_seconds = window_seconds
+        self._outcomes: deque = deque(maxlen=500)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+
+    def record(self, ok: bool, seconds: float) -> None:
+        with self._lock:
+            self._outcomes.append((time.monotonic(), ok, seconds))
+            self.calls += 1
+            self.errors += 0 if ok else 1
+
+    def _recent(self) -> List[Tuple[float, bool, float]]:
+        cutoff = time.monotonic() - self.window_seconds
+        with self._lock:
+            while self._outcomes and self._outcomes[0][0] < cutoff:
+                self._outcomes.popleft()
+            return list(self._outcomes)
+
+    def error_rate(self) -> Optional[float]:
+        """Share of recent calls that failed, or None with too few samples."""
+        recent = self._recent()
+        if len(recent) < MIN_ERROR_SAMPLES:
+            return None
+        return sum(1 for _, ok, _ in recent if not ok) / len(recent)
+
+    def latency_percentile(self, p: float) -> Optional[float]:
+        """p-th percentile (0-100) of recent successful latencies, or None."""
+        samples = sorted(s for _, ok, s in self._recent() if ok)
+        if len(samples) < MIN_LATENCY_SAMPLES:
+            return None
+        rank = min(int(round(p / 100.0 * (len(samples) - 1))), len(samples) - 1)
+        return samples[rank]
+
+    def healthy(self) -> bool:
+        rate = self.error_rate()
+        return rate is None or rate <= MAX_ERROR_RATE
+
+    def score(self) -> Optional[float]:
+        """Median latency penalized by error rate (lower is better), or None."""
+        p50 = self.latency_percentile(50)
+        if p50 is None:
+            return None
+        return p50 * (1.0 + 4.0 * (self.error_rate() or 0.0))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "error_rate": self.error_rate(),
+            "p50": self.latency_percentile(50),
+            "p95": self.latency_percentile(95),
+        }
+
+
+# Health per (provider, model id), shared by every task routed to it
+_route_health: Dict[str, RouteHealth] = {}
+_health_lock = threading.Lock()
+
+
+def route_health(name: str) -> RouteHealth:
+    """Return the shared health tracker of a route."""
+    with _health_lock:
+        if name not in _route_health:
+            _route_health[name] = RouteHealth(name)
+        return _route_health[name]
+
+
+def get_route_stats() -> Dict[str, Dict[str, Any]]:
+    """Return health statistics per route."""
+    with _health_lock:
+        routes = dict(_route_health)
+    return {name: health.stats() for name, health in routes.items()}
+
+
+class RoutedChatModel:
+    """
+    Chat model wrapper choosing between routes by health.
+
+    ``routes`` are (name, llm) pairs in order of preference; the first one
+    is used until its health is worse than another's. A failed call is
+    retried on the next route. With ``hedge_percentile`` set, a call still
+    running after that percentile of the chosen route's recent latency gets
+    a duplicate on the next route and the first answer wins. Every other
+    attribute is delegated to the first route.
+    """
+
+    def __init__(
+        self,
+        task: str,
+        routes: Sequence[Tuple[str, Any]],
+        hedge_percentile: Optional[float] = None,
+    ):
+        self.task = task
+        self.routes = [(name, llm, route_health(name)) for name, llm in routes]
+        self.hedge_percentile = hedge_percentile
+        self.hedges = 0
+        self.failovers = 0
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.routes[0][1], name)
+
+    def _ordered_routes(self) -> List[Tuple[str, Any, RouteHealth]]:
+        """Routes by preference: healthy first, then by score, then by config order."""
+
+        def key(indexed):
+            index, (_, _, health) = indexed
+            score = health.score()
+            if score is None:
+                # Unmeasured routes keep their configured order behind the first
+                score = 0.0 if index == 0 else float("inf")
+            return (not health.healthy(), score, index)
+
+        return [route for _, route in sorted(enumerate(self.routes), key=key)]
+
+    def _hedge_delay(self, health: RouteHealth) -> Optional[float]:
+        if self.hedge_percentile is None or len(self.routes) < 2:
+            return None
+        return health.latency_percentile(self.hedge_percentile)
+
+    @staticmethod
+    def _timed_call(route, prompt: Any, args: tuple, kwargs: dict) -> Any:
+        name, llm, health = route
+        start = time.monotonic()
+        try:
+            response = llm.invoke(prompt, *args, **kwargs)
+        except Exception:
+            health.record(False, time.monotonic() - start)
+            raise
+        health.record(True, time.monotonic() - start)
+        return response
+
+    @staticmethod
+    async def _atimed_call(route, prompt: Any, args: tuple, kwargs: dict) -> Any:
+        name, llm, health = route
+        start = time.monotonic()
+        try:
+            response = await llm.ainvoke(prompt, *args, **kwargs)
+        except Exception:
+            health.record(False, time.monotonic() - start)
+            raise
+        health.record(True, time.monotonic() - start)
+        return response
+
+    def _log_failover(self, route, error: BaseException) -> None:
+        self.failovers += 1
+        logger.warning(
+            f"LLM route failed, failing over - task: {self.task}, route: {route[0]}, "
+            f"error: {type(error).__name__}: {error}"
+        )
+
+    def _log_hedge(self, route, after: float) -> None:
+        self.hedges += 1
+        logger.info(
+            f"Hedging LLM call - task: {self.task}, route: {route[0]}, after: {after:.2f}s"
+        )
+
+    def invoke(self, prompt: Any, *args: Any, **kwargs: Any) -> Any:
+        """Call the healthiest route, hedging and failing over as configured."""
+        ordered = self._ordered_routes()
+        hedge_after = self._hedge_delay(ordered[0][2])
+        if hedge_after is None:
+            error: Optional[BaseException] = None
+            for route in ordered:
+                try:
+                    return self._timed_call(route, prompt, args, kwargs)
+                except Exception as e:
+                    self._log_failover(route, e)
+                    error = e
+            raise error  # type: ignore[misc]
+
+        def submit(route) -> Future:
+            # Run in a copy of the caller's context so the attempt sees the
+            # request deadline and records parse statistics
+            ctx = contextvars.copy_context()
+            return executor.submit(
+                ctx.run, self._timed_call, route, prompt, args, kwargs
+            )
+
+        executor = _get_executor()
+        pending: Dict[Future, Any] = {submit(ordered[0]): ordered[0]}
+        done, _ = wait(list(pending), timeout=hedge_after)
+        remaining = ordered[1:]
+        if not done:
+            self._log_hedge(remaining[0], hedge_after)
+            route = remaining.pop(0)
+            pending[submit(route)] = route
+
+        error = None
+        while pending:
+            done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+            for future in done:
+                route = pending.pop(future)
+                exc = future.exception()
+                if exc is None:
+                    return future.result()
+                self._log_failover(route, exc)
+                error = exc
+                if not pending and remaining:
+                    route = remaining.pop(0)
+                    pending[submit(route)] = route
+        raise error  # type: ignore[misc]
+
+    async def ainvoke(self, prompt: Any, *args: Any, **kwargs: Any) -> Any:
+        """Async variant of ``invoke``: attempts and hedges are asyncio tasks."""
+        ordered = self._ordered_routes()
+        hedge_after = self._hedge_delay(ordered[0][2])
+        if hedge_after is None:
+            error: Optional[BaseException] = None
+            for route in ordered:
+                try:
+                    return await self._atimed_call(route, prompt, args, kwargs)
+                except Exception as e:
+                    self._log_failover(route, e)
+                    error = e
+            raise error  # type: ignore[misc]
+
+        def start(route) -> asyncio.Task:
+            task = asyncio.ensure_future(self._atimed_call(route, prompt, args, kwargs))
+            routes_by_task[task] = route
+            return task
+
+        routes_by_task: Dict[asyncio.Task, Any] = {}
+        pending: Set[asyncio.Task] = {start(ordered[0])}
+        remaining = ordered[1:]
+        error = None
+        try:
+            done, _ = await asyncio.wait(pending, timeout=hedge_after)
+            if not done:
+                self._log_hedge(remaining[0], hedge_after)
+                pending.add(start(remaining.pop(0)))
+
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    exc = task.exception()
+                    if exc is None:
+                        return task.result()
+                    self._log_failover(routes_by_task[task], exc)
+                    error = exc
+                if not pending and remaining:
+                    pending.add(start(remaining.pop(0)))
+        finally:
+            # The losing attempt is no longer needed
+            for task in pending:
+                task.cancel()
+        raise error  # type: ignore[misc]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hedge and failover counters of this task."""
+        return {"hedges": self.hedges, "failovers": self.failovers}
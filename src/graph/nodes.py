@@ -8,18 +8,53 @@ import json
 import logging
 import os
 import re
-from typing import List
-
-import requests
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from src.graph.agent_config import AGENT_LLM_MAP
+from src.graph.deadline import (
+    EXTRACT_MIN_SECONDS,
+    FETCH_MIN_SECONDS,
+    RANK_MIN_SECONDS,
+    VALIDATE_MIN_SECONDS,
+    has_time_for,
+)
+from src.graph.llm_cache import CachedChatModel
+from src.graph.steps import Call, MapSteps, Steps, arun_steps, llm_call, run_steps
+from src.graph.structured_output import (
+    parse_structured,
+    record_retry,
+    response_text,
+)
 from src.graph.types import MappingState
+from src.ontology.client import afetch_candidates, fetch_candidates
+from src.ontology.hpo_release import normalize_text
+from src.ontology.prefetch import astart_prefetch, start_prefetch
 from src.prompts.template import apply_prompt_template
 
-# UMLS API Base URL for ontology queries
-API_BASE_URL = (
-    os.getenv("UMLS_API_BASE_URL", "https://ontology.jax.org/api/hp") + "/search"
-)
+# Ontology search results per page
+SEARCH_PAGE_SIZE = 5
+
+# Terms whose best ranked confidence is below this get another page of
+# candidates, up to MAX_CANDIDATE_PAGES pages in total (1 disables widening)
+WIDEN_CONFIDENCE_THRESHOLD = 0.9
+MAX_CANDIDATE_PAGES = int(os.getenv("MAX_CANDIDATE_PAGES", "3"))
+
+# Rank several terms' candidates per LLM call, packing terms into calls whose
+# candidate listings stay under RANK_BATCH_TOKEN_BUDGET (estimated) tokens
+RANK_BATCH = os.getenv("RANK_BATCH", "false").lower() == "true"
+RANK_BATCH_TOKEN_BUDGET = int(os.getenv("RANK_BATCH_TOKEN_BUDGET", "2000"))
+
+# Extraction LLM calls per question when the output is malformed
+EXTRACTION_MAX_ATTEMPTS = 3
+
+# Mappability is decided by MAPPABILITY_SAMPLES concurrent LLM samples; the
+# question is mappable once MAPPABILITY_QUORUM of them say true (1 keeps the
+# "any true" policy, a majority turns it into a vote). Extra samples only add
+# information when the mappability model samples at a non-zero temperature
+# (agent_config.py); at 0.0 they repeat the first answer, and every sample is
+# billed even when the vote settles early
+MAPPABILITY_SAMPLES = int(os.getenv("MAPPABILITY_SAMPLES", "1"))
+MAPPABILITY_QUORUM = int(os.getenv("MAPPABILITY_QUORUM", "1"))
 
 logger = logging.getLogger(__name__)
 
@@ -39,7 +74,28 @@ def _parse_confidence(value) -> float:
     return float(value)
 
 
-def _extract_medical_terms(state: MappingState, prompt_name: str) -> MappingState:
+def _structured(name: str, attempt: int = 0) -> dict:
+    """
+    Invoke kwargs requesting structured output in the named schema.
+
+    Retries (``attempt`` > 0) bypass the LLM response cache, which would
+    otherwise answer the identical prompt the same way again.
+    """
+    if attempt:
+        return {"structured_output": name, "bypass_cache": True}
+    return {"structured_output": name}
+
+
+def _parse_extracted_terms(response) -> Optional[List[str]]:
+    """Parse the extraction LLM output into a term list (None if malformed)."""
+    try:
+        return [str(term) for term in parse_structured(response, "extracted_terms")]
+    except ValueError as e:
+        logger.warning(f"Extraction parse failed - error: {e}")
+        return None
+
+
+def _extract_medical_terms(state: MappingState, prompt_name: str) -> Steps:
     """
     Generic medical term extraction logic for all survey field types.
 
@@ -48,103 +104,356 @@ def _extract_medical_terms(state: MappingState, prompt_name: str) -> MappingStat
         prompt_name: Name of the prompt template to use
 
     Returns:
-        MappingState: Updated state with extracted medical terms
+        Steps returning the updated state with extracted medical terms
     """
     llm = AGENT_LLM_MAP["extract_medical_term_from_survey"]
     prompt = apply_prompt_template(prompt_name, state)
 
-    max_retries = 3
-    retries = 0
-    parsed: List[str] = []
-
-    while retries < max_retries:
-        response = llm.invoke(prompt)
-        raw_content = str(response.content)
-        cleaned = re.sub(r"json\n(.*?)\n", r"\1", raw_content, flags=re.DOTALL).strip()
-
-        try:
-            parsed = json.loads(cleaned)
-        except (json.JSONDecodeError, Exception):
-            parsed = []
-
-        if parsed:
+    # Structured output makes malformed responses rare; only those are
+    # re-asked (an empty list is a valid answer), while time allows
+    parsed = None
+    for attempt in range(EXTRACTION_MAX_ATTEMPTS):
+        if attempt:
+            if not has_time_for(state, EXTRACT_MIN_SECONDS, "extraction_retry"):
+                state = {**state, "partial": True}
+                break
+            record_retry()
+            logger.warning(
+                f"Extraction retry {attempt}/{EXTRACTION_MAX_ATTEMPTS - 1} - "
+                f"prompt: {prompt_name}"
+            )
+        response = yield llm_call(
+            llm, prompt, **_structured("extracted_terms", attempt)
+        )
+        parsed = _parse_extracted_terms(response)
+        if parsed is not None:
             break
 
-        retries += 1
-        logger.warning(
-            f"Extraction retry {retries}/{max_retries} - prompt: {prompt_name}"
-        )
+    return _with_extracted_terms(state, prompt_name, parsed)
+
 
-    if not parsed:
+def _with_extracted_terms(
+    state: MappingState, prompt_name: str, parsed: Optional[List[str]]
+) -> MappingState:
+    """Store the extracted terms ([] if every attempt was malformed)."""
+    if parsed is None:
         logger.error(
-            f"Extraction failed after {max_retries} retries - prompt: {prompt_name}"
+            f"Extraction failed after {EXTRACTION_MAX_ATTEMPTS} attempts - "
+            f"prompt: {prompt_name}"
         )
+        parsed = []
 
     logger.info(f"Extracted {len(parsed)} terms: {parsed}")
 
     return {**state, "extracted_terms": parsed}
 
 
+def speculative_prefetch_node(state: MappingState) -> MappingState:
+    """
+    Start warming the ontology search cache before any LLM call returns.
+
+    Query phrases are derived heuristically from the raw question text and
+    searched in the background, in parallel with the mappability and
+    extraction LLM calls. This node returns immediately.
+
+    Args:
+        state (MappingState): Initial workflow state with text and field type
+
+    Returns:
+        MappingState: Updated state with the phrases submitted for prefetch
+    """
+    return run_steps(_speculative_prefetch(state))
+
+
+def _speculative_prefetch(state: MappingState) -> Steps:
+    """Steps of ``speculative_prefetch_node``."""
+    phrases = yield Call(
+        start_prefetch,
+        astart_prefetch,
+        (
+            state.get("text", ""),
+            state.get("field_type", ""),
+            state.get("ontology") or "HPO",
+        ),
+    )
+    return {**state, "prefetched_terms": phrases}
+
+
+def _parse_mappable(raw_content: str) -> bool:
+    """Parse the mappability LLM output into a boolean."""
+    # Clean and normalize the LLM response
+    cleaned = re.sub(
+        r"```(json)?\n?(.*?)\n?```", r"\2", raw_content.strip(), flags=re.DOTALL
+    ).strip()
+    normalized = cleaned.lower().replace('"', "").replace("'", "").strip()
+
+    # Parse the result to determine mappability
+    try:
+        parsed = json.loads(normalized)
+        return bool(parsed)
+    except Exception:
+        return normalized == "true"
+
+
+def _mappability_samplers(llm, samples: int) -> List:
+    """
+    Return one LLM per mappability sample.
+
+    A cached LLM would answer every sample of the same prompt with the same
+    stored response, so each sample gets its own cache slot.
+    """
+    if not isinstance(llm, CachedChatModel):
+        return [llm] * samples
+    return [llm] + [
+        CachedChatModel(f"{llm.task}#{i}", llm.llm, llm.model_id, llm.cache)
+        for i in range(1, samples)
+    ]
+
+
+def _mappability_decision(votes: List, samples: int, quorum: int):
+    """
+    Decide mappability from the votes received so far.
+
+    Failed samples (None) abstain. Returns True once ``quorum`` samples said
+    true, False once the outstanding samples can no longer reach it, and None
+    while undecided.
+    """
+    trues = sum(1 for vote in votes if vote is True)
+    if trues >= quorum:
+        return True
+    if trues + samples - len(votes) < quorum:
+        return False
+    return None
+
+
+def _with_mappability_vote(
+    state: MappingState, votes: List, quorum: int, calls: int
+) -> MappingState:
+    """Record the mappability vote outcome in the state."""
+    if all(vote is None for vote in votes):
+        raise RuntimeError("All mappability samples failed")
+    is_mappable = bool(_mappability_decision(votes, len(votes), quorum))
+    logger.info(
+        f"Mappability vote - is_mappable: {is_mappable}, votes: {votes}, "
+        f"quorum: {quorum}, calls: {calls}"
+    )
+    return {**state, "is_mappable": is_mappable, "mappability_calls": calls}
+
+
 def is_question_mappable_node(state: MappingState) -> MappingState:
     """
     Determine if a survey question can be mapped to medical ontologies.
 
     This node uses an LLM to assess whether the input question contains
     medical concepts that can be mapped to standardized ontologies like HPO.
+    MAPPABILITY_SAMPLES assessments run concurrently and the question is
+    mappable once MAPPABILITY_QUORUM of them agree; the vote stops as soon
+    as the outcome is settled.
 
     Args:
         state (MappingState): Current workflow state containing the survey question
 
     Returns:
-        MappingState: Updated state with mappability assessment
+        MappingState: Updated state with mappability assessment and call count
     """
-    # Use a separate retry counter to avoid conflicts with other retry mechanisms
-    retry_count = state.get("mappability_retry_count", 0)
     logger.debug("Entered is_question_mappable_node")
+    return run_steps(_is_question_mappable(state))
+
+
+def _is_question_mappable(state: MappingState) -> Steps:
+    """Steps of ``is_question_mappable_node``."""
+    samples = max(MAPPABILITY_SAMPLES, 1)
+    quorum = min(max(MAPPABILITY_QUORUM, 1), samples)
 
     # Get LLM agent and prompt for mappability assessment
     llm = AGENT_LLM_MAP["is_question_mappable_to_hpo"]
     prompt = apply_prompt_template("is_mappable", state)
-    response = llm.invoke(prompt)
-    raw_content = str(response.content).strip()
 
-    # Clean and normalize the LLM response
-    cleaned = re.sub(
-        r"```(json)?\n?(.*?)\n?```", r"\2", raw_content, flags=re.DOTALL
-    ).strip()
-    normalized = cleaned.lower().replace('"', "").replace("'", "").strip()
+    def settled(received: List) -> bool:
+        return _mappability_decision(received, samples, quorum) is not None
 
-    # Parse the result to determine mappability
-    try:
-        parsed = json.loads(normalized)
-        is_mappable = bool(parsed)
-    except Exception:
-        is_mappable = normalized == "true"
+    votes = yield MapSteps(
+        lambda sampler: _mappability_sample(sampler, prompt),
+        _mappability_samplers(llm, samples),
+        done=settled,
+        max_concurrency=samples,
+    )
+    return _with_mappability_vote(state, votes, quorum, samples)
 
-    # Retry if assessment is false and we haven't exceeded retry limit
-    if not is_mappable and retry_count < 5:
-        return is_question_mappable_node(
-            {**state, "mappability_retry_count": retry_count + 1}
-        )
 
-    # Return final state with mappability result and retry count
-    return {**state, "is_mappable": is_mappable, "mappability_retry_count": retry_count}
+def _mappability_sample(sampler, prompt: str) -> Steps:
+    """One mappability sample: True/False, or None if the call or parse failed."""
+    try:
+        response = yield llm_call(sampler, prompt)
+        return _parse_mappable(str(response.content))
+    except Exception as e:
+        logger.warning(f"Mappability sample failed - error: {e}")
+        return None
 
 
-# state: text, is_mappable, mappability_retry_count
+# state: text, is_mappable, mappability_calls
 def extract_medical_terms_radio_node(state: MappingState) -> MappingState:
     """Extract medical terms from radio button survey questions."""
-    return _extract_medical_terms(state, "extract_medical_term_radio_from_survey")
+    return run_steps(
+        _extract_medical_terms(state, "extract_medical_term_radio_from_survey")
+    )
 
 
 def extract_medical_terms_checkbox_node(state: MappingState) -> MappingState:
     """Extract medical terms from checkbox survey questions."""
-    return _extract_medical_terms(state, "extract_medical_term_checkbox_from_survey")
+    return run_steps(
+        _extract_medical_terms(state, "extract_medical_term_checkbox_from_survey")
+    )
 
 
 def extract_medical_terms_short_node(state: MappingState) -> MappingState:
     """Extract medical terms from short text survey questions."""
-    return _extract_medical_terms(state, "extract_medical_term_short_from_survey")
+    return run_steps(
+        _extract_medical_terms(state, "extract_medical_term_short_from_survey")
+    )
+
+
+def _extraction_prompt_name(field_type: str) -> str:
+    """Extraction prompt of a field type (radio for anything unrecognized)."""
+    field_type = (field_type or "").lower()
+    if field_type in ("checkbox", "short"):
+        return f"extract_medical_term_{field_type}_from_survey"
+    return "extract_medical_term_radio_from_survey"
+
+
+def _mappable_and_extract_prompt(state: MappingState) -> str:
+    """Render the fused prompt from the mappability and extraction prompts."""
+    return apply_prompt_template(
+        "is_mappable_and_extract",
+        {
+            "mappability_task": apply_prompt_template("is_mappable", state),
+            "extraction_task": apply_prompt_template(
+                _extraction_prompt_name(state.get("field_type", "")), state
+            ),
+        },
+    )
+
+
+def _parse_mappable_terms(response):
+    """Parse the fused output into (is_mappable, terms), or None if malformed."""
+    try:
+        parsed = parse_structured(response, "mappable_terms")
+        is_mappable = parsed["is_mappable"]
+        terms = parsed.get("terms") or []
+        if not isinstance(is_mappable, bool) or not isinstance(terms, list):
+            raise ValueError("is_mappable must be a boolean and terms a list")
+    except (KeyError, ValueError) as e:
+        logger.warning(f"Mappability-and-extraction parse failed - error: {e}")
+        return None
+    return is_mappable, [str(term) for term in terms] if is_mappable else []
+
+
+def _with_mappable_terms(
+    state: MappingState, is_mappable: bool, terms: List[str]
+) -> MappingState:
+    """Store the fused mappability decision and extracted terms."""
+    logger.info(
+        f"Mappability and extraction - is_mappable: {is_mappable}, terms: {terms}"
+    )
+    return {**state, "is_mappable": is_mappable, "extracted_terms": terms}
+
+
+def _without_mappable_terms(state: MappingState) -> MappingState:
+    """Give up on a malformed fused answer when no time is left to retry."""
+    logger.error("Mappability and extraction failed before the deadline")
+    return {**state, "is_mappable": False, "extracted_terms": [], "partial": True}
+
+
+def is_mappable_and_extract_node(state: MappingState) -> MappingState:
+    """
+    Decide mappability and extract medical terms with one LLM call.
+
+    Alternative entry to is_question_mappable → extract_medical_terms_* (see
+    FUSED_MAPPABILITY_EXTRACTION in builder.py): the field type's extraction
+    prompt and the mappability prompt are asked together for one structured
+    answer. Malformed output is re-asked like extraction; if every attempt
+    fails, the separate mappability vote and extraction calls are used. Near
+    the deadline, re-asks and the fallback are skipped and nothing is
+    extracted (a partial result).
+
+    Args:
+        state (MappingState): Current workflow state containing the survey question
+
+    Returns:
+        MappingState: Updated state with mappability and extracted terms
+    """
+    return run_steps(_is_mappable_and_extract(state))
+
+
+def _is_mappable_and_extract(state: MappingState) -> Steps:
+    """Steps of ``is_mappable_and_extract_node``."""
+    llm = AGENT_LLM_MAP["is_mappable_and_extract"]
+    prompt = _mappable_and_extract_prompt(state)
+
+    for attempt in range(EXTRACTION_MAX_ATTEMPTS):
+        if attempt:
+            if not has_time_for(state, EXTRACT_MIN_SECONDS, "fused_entry_retry"):
+                return _without_mappable_terms(state)
+            record_retry()
+        response = yield llm_call(
+            llm, prompt, **_structured("mappable_terms", attempt)
+        )
+        parsed = _parse_mappable_terms(response)
+        if parsed is not None:
+            return _with_mappable_terms(state, *parsed)
+
+    # The fallback makes a mappability call, then an extraction call
+    if not has_time_for(state, 2 * EXTRACT_MIN_SECONDS, "fused_entry_fallback"):
+        return _without_mappable_terms(state)
+    logger.warning("Mappability-and-extraction fallback to separate calls")
+    state = yield from _is_question_mappable(state)
+    if not state["is_mappable"]:
+        return state
+    return (
+        yield from _extract_medical_terms(
+            state, _extraction_prompt_name(state.get("field_type", ""))
+        )
+    )
+
+
+def _search_terms(state: MappingState) -> List[str]:
+    """Normalize the extracted terms of ``state`` to a list of search terms."""
+    raw = state.get("extracted_terms", "")
+    if isinstance(raw, list):
+        return [str(t).strip() for t in raw if t and str(t).strip()]
+    return [str(raw).strip()] if raw and str(raw).strip() else []
+
+
+def _with_fetched_candidates(
+    state: MappingState, all_results: List[dict]
+) -> MappingState:
+    """Store first-page search results and their page counters in the state."""
+    # One page fetched per term; a short page means there are no more
+    candidate_pages = {
+        entry["original"]: (
+            1 if len(entry["candidates"]) >= SEARCH_PAGE_SIZE else MAX_CANDIDATE_PAGES
+        )
+        for entry in all_results
+    }
+
+    # A retry whose search brings back only codes seen in earlier rounds
+    # cannot improve on them: stop retrying after this round
+    codes = {c.get("code") for entry in all_results for c in entry["candidates"]}
+    seen = set(state.get("seen_candidate_codes", []))
+    converged = bool(state.get("retry_count")) and codes <= seen
+    if converged:
+        logger.info(
+            f"Retry converged, no new candidates - retry_count: {state['retry_count']}"
+        )
+
+    logger.debug(f"Final HPO mappings for {len(all_results)} terms: {all_results}")
+    return {
+        **state,
+        "umls_mappings": all_results,
+        "candidate_pages": candidate_pages,
+        "seen_candidate_codes": sorted(seen | codes),
+        "converged": converged,
+    }
 
 
 def fetch_umls_terms_node(state: MappingState) -> MappingState:
@@ -160,82 +469,233 @@ def fetch_umls_terms_node(state: MappingState) -> MappingState:
     Returns:
         MappingState: Updated state with UMLS mapping candidates
     """
-    raw = state.get("extracted_terms", "")
-    
-    # Normalize to a list of terms
-    if isinstance(raw, list):
-        terms = [str(t).strip() for t in raw if t and str(t).strip()]
-    else:
-        terms = [str(raw).strip()] if raw and str(raw).strip() else []
+    return run_steps(_fetch_umls_terms(state))
+
 
-    all_results = []
-    
+def _fetch_umls_terms(state: MappingState) -> Steps:
+    """Steps of ``fetch_umls_terms_node``."""
+    terms = _search_terms(state)
     if not terms:
         logger.warning("No terms provided for UMLS fetch")
         return {**state, "umls_mappings": []}
+    if not has_time_for(state, FETCH_MIN_SECONDS, "fetch_umls_terms"):
+        return _without_candidates(state, terms)
+
+    # Search all terms concurrently; output order follows the extracted terms
+    all_results = yield _search(state, terms)
+    return _with_fetched_candidates(state, all_results)
+
+
+def _search(state: MappingState, terms: List[str], page: int = 0) -> Call:
+    """Step searching one page of candidates for every term."""
+    return Call(
+        fetch_candidates,
+        afetch_candidates,
+        (terms,),
+        {
+            "limit": SEARCH_PAGE_SIZE,
+            "ontology": state.get("ontology") or "HPO",
+            "page": page,
+        },
+    )
+
+
+def _without_candidates(state: MappingState, terms: List[str]) -> MappingState:
+    """Leave every term without candidates when no time is left to search."""
+    all_results = [{"original": term, "candidates": []} for term in terms]
+    return {**_with_fetched_candidates(state, all_results), "partial": True}
+
+
+def _rank_memo_key(entry: dict) -> str:
+    """Retry memo key of a term and its candidate set."""
+    codes = sorted(str(c.get("code")) for c in entry.get("candidates", []))
+    return f"{entry.get('original', '')}|{','.join(codes)}"
+
+
+def _validation_memo_key(item: dict) -> str:
+    """Retry memo key of a ranked term: its top candidate (all the prompt shows)."""
+    ranked = item.get("ranked_candidates")
+    return str(ranked[0].get("code")) if ranked else ""
+
+
+def _memo_pending(
+    state: MappingState, table: str, items: List[dict], key: Callable[[dict], str]
+) -> List[dict]:
+    """
+    Return the items without a result in a retry memo table.
 
-    # Process each extracted term
-    for term in terms:
-        if not term:
+    The memo (``retry_memo``) lives in the state for the whole request, so a
+    retry round only pays for search results it has not seen before.
+    """
+    memo = state.get("retry_memo", {}).get(table, {})
+    pending = [item for item in items if key(item) not in memo]
+    if len(pending) < len(items):
+        logger.info(
+            f"Retry memo hits - table: {table}, hits: {len(items) - len(pending)}"
+        )
+    return pending
+
+
+def _memo_results(
+    state: MappingState,
+    table: str,
+    items: List[dict],
+    key: Callable[[dict], str],
+    pending: List[dict],
+    computed: List[Any],
+) -> Tuple[MappingState, List[Any]]:
+    """
+    Store the pending items' results in a retry memo table.
+
+    Returns:
+        Tuple of (state with the updated memo, result of every item in order)
+    """
+    retry_memo = state.get("retry_memo", {})
+    memo = {**retry_memo.get(table, {})}
+    memo.update((key(item), result) for item, result in zip(pending, computed))
+    state = {**state, "retry_memo": {**retry_memo, table: memo}}
+    return state, [memo[key(item)] for item in items]
+
+
+def _find_exact_match(term: str, candidates: List[dict]) -> dict:
+    """
+    Find the single candidate whose label or EXACT synonym equals the term.
+
+    Matching ignores case and punctuation. A label match wins over synonym
+    matches; several distinct synonym matches are treated as ambiguous.
+    Related, broad and narrow synonyms are not equivalent to the term, so
+    those matches are left to the LLM stages.
+
+    Args:
+        term: Extracted medical term
+        candidates: Candidates returned by the ontology search
+
+    Returns:
+        dict: {"candidate", "match_type"} for an unambiguous match, otherwise {}
+    """
+    normalized = normalize_text(term)
+    if not normalized:
+        return {}
+
+    for c in candidates:
+        if normalize_text(c.get("term") or "") == normalized:
+            return {"candidate": c, "match_type": "exact_label"}
+
+    synonym_matches = [
+        c
+        for c in candidates
+        if any(
+            normalize_text(s) == normalized for s in c.get("exact_synonyms") or []
+        )
+    ]
+    if len({c.get("code") for c in synonym_matches}) == 1:
+        return {"candidate": synonym_matches[0], "match_type": "exact_synonym"}
+    return {}
+
+
+# state: text, is_mappable, mappability_calls, extracted_terms, umls_mappings
+def match_exact_terms_node(state: MappingState) -> MappingState:
+    """
+    Accept exact label/synonym matches without calling the LLM.
+
+    Terms whose normalized text equals a candidate's preferred label or
+    EXACT synonym are mapped directly with full confidence and a recorded match
+    type. Only the remaining, ambiguous terms are left in ``umls_mappings``
+    for the rank and validate nodes. When every term matched exactly, the
+    final ``validated_mappings`` are produced here.
+
+    Args:
+        state (MappingState): Current workflow state with UMLS mapping candidates
+
+    Returns:
+        MappingState: Updated state with exact mappings and the ambiguous remainder
+    """
+    exact_mappings = []
+    remaining = []
+
+    for entry in state.get("umls_mappings", []):
+        original_term = entry.get("original", "")
+        match = _find_exact_match(original_term, entry.get("candidates", []))
+        if not match:
+            remaining.append(entry)
             continue
 
-        params = {"q": term, "page": 0, "limit": 5}
+        candidate = match["candidate"]
+        logger.info(
+            f"Exact match - term: {original_term}, code: {candidate.get('code')}, "
+            f"match_type: {match['match_type']}"
+        )
+        exact_mappings.append(
+            {
+                "original": original_term,
+                "best_match_code": candidate.get("code"),
+                "best_match_term": candidate.get("term"),
+                "confidence": 1.0,
+                "match_type": match["match_type"],
+            }
+        )
+
+    logger.info(
+        f"Exact match summary - exact: {len(exact_mappings)}, ambiguous: {len(remaining)}"
+    )
 
-        try:
-            resp = requests.get(API_BASE_URL, params=params, timeout=10)
-            logger.info(f"UMLS API query - term: {term}, status: {resp.status_code}")
-
-            if resp.status_code != 200:
-                logger.error(
-                    f"UMLS API error - term: {term}, status: {resp.status_code}, "
-                    f"response: {resp.text[:200]}"
-                )
-                all_results.append({"original": term, "candidates": []})
-            else:
-                try:
-                    data = resp.json()
-                    results = data.get("terms", [])
-                except Exception as e:
-                    logger.error(
-                        f"UMLS API JSON parse error - term: {term}, error: {e}, "
-                        f"response_preview: {resp.text[:200]}"
-                    )
-                    results = []
-
-                candidates = [
-                    {
-                        "code": r.get("id"),
-                        "term": r.get("name"),
-                        "description": r.get("definition"),
-                        "synonyms": r.get("synonyms", []),
-                        "xrefs": r.get("xrefs", []),
-                    }
-                    for r in results
-                ]
-
-                logger.info(
-                    f"UMLS candidates found - term: {term}, count: {len(candidates)}, "
-                    f"top_2: {[c.get('code') for c in candidates[:2]]}"
-                )
-                all_results.append({"original": term, "candidates": candidates})
-
-        except requests.exceptions.Timeout:
-            logger.error(f"UMLS API timeout - term: {term}, timeout: 10s")
-            all_results.append({"original": term, "candidates": []})
-        except requests.exceptions.RequestException as e:
-            logger.error(
-                f"UMLS API request failed - term: {term}, error: {type(e).__name__}: {e}"
-            )
-            all_results.append({"original": term, "candidates": []})
-        except Exception as e:
-            logger.error(f"Unexpected error fetching UMLS terms - term: {term}, error: {e}")
-            all_results.append({"original": term, "candidates": []})
+    if remaining:
+        return {**state, "umls_mappings": remaining, "exact_mappings": exact_mappings}
 
-    logger.debug(f"Final HPO mappings for {len(all_results)} terms: {all_results}")
-    return {**state, "umls_mappings": all_results}
+    # Nothing left for the LLM stages: finalize here, as validate_mapping would
+    return {
+        **state,
+        "umls_mappings": [],
+        "exact_mappings": [],
+        "validated_mappings": _in_term_order(
+            state, state.get("preserved_mappings", []) + exact_mappings
+        ),
+        "preserved_mappings": [],
+    }
+
+
+def _rewrite_term(
+    llm, state: MappingState, term: str, previous_terms: List[str]
+) -> Steps:
+    """
+    Ask the rewrite LLM for an alternative phrasing of one term.
+
+    Args:
+        llm: Chat model used for rewriting
+        state: Current workflow state (rendered into the prompt)
+        term: Low-confidence term to rewrite
+        previous_terms: Terms already tried, which the LLM should avoid
+
+    Returns:
+        Steps returning the rewritten term, or None if the output could not be parsed
+    """
+    response = yield llm_call(
+        llm,
+        _rewrite_prompt(state, term, previous_terms),
+        **_structured("rewritten_terms"),
+    )
+    return _parse_rewrite(term, response)
+
+
+def _rewrite_prompt(state: MappingState, term: str, previous_terms: List[str]) -> str:
+    """Render the rewrite prompt for one term."""
+    state_for_prompt = {**state, "text": term, "previous_terms": previous_terms}
+    return apply_prompt_template("retry_with_llm_rewrite", state_for_prompt)
 
 
-# state: text, is_mappable, mappability_retry_count, extracted_terms, umls_mappings
+def _parse_rewrite(term: str, response):
+    """Parse the rewrite LLM output into a single term (None if malformed)."""
+    try:
+        parsed = parse_structured(response, "rewritten_terms")
+    except ValueError as e:
+        logger.error(f"Error parsing rewritten term for '{term}': {e}")
+        return None
+
+    # Extract the rewritten term (should be a single term)
+    return parsed[0] if parsed else None
+
+
+# state: text, is_mappable, mappability_calls, extracted_terms, umls_mappings
 def retry_with_llm_rewrite_node(state: MappingState) -> MappingState:
     """
     Retry term extraction with LLM rewrite for low-confidence mappings.
@@ -250,17 +710,49 @@ def retry_with_llm_rewrite_node(state: MappingState) -> MappingState:
     Returns:
         MappingState: Updated state with rewritten terms for low-confidence mappings
     """
-    validated_mappings = state.get("validated_mappings", [])
+    return run_steps(_retry_with_llm_rewrite(state))
+
+
+def _retry_with_llm_rewrite(state: MappingState) -> Steps:
+    """Steps of ``retry_with_llm_rewrite_node``."""
+    high_confidence_mappings, low_confidence_terms = _split_by_confidence(
+        state.get("validated_mappings", [])
+    )
+    if not low_confidence_terms:
+        logger.warning("Retry triggered but no low-confidence terms found")
+        return {**state, "preserved_mappings": high_confidence_mappings}
+
+    # Prepare the list of previously seen terms to avoid repetition
+    previous_terms = set(state.get("history_rewritten_terms", []))
+    previous_terms.update(low_confidence_terms)
+
+    # Rewrite only the low-confidence terms; the LLM calls run concurrently
+    llm = AGENT_LLM_MAP["retry_with_llm_rewrite"]
+    prompt_terms = list(previous_terms)
+    rewrites = yield MapSteps(
+        lambda term: _rewrite_term(llm, state, term, prompt_terms),
+        low_confidence_terms,
+    )
+    return _with_rewritten_terms(
+        state, high_confidence_mappings, low_confidence_terms, previous_terms, rewrites
+    )
+
+
+def _split_by_confidence(validated_mappings: List[dict]):
+    """
+    Separate mappings to preserve from terms that need rewriting.
+
+    Returns:
+        Tuple of (high-confidence mappings, low-confidence original terms)
+    """
     confidence_threshold = 0.9
-    
-    # Separate high-confidence and low-confidence mappings
     high_confidence_mappings = []
     low_confidence_terms = []
-    
+
     for mapping in validated_mappings:
         confidence = mapping.get("confidence", 0.0)
         original_term = mapping.get("original", "")
-        
+
         if confidence >= confidence_threshold:
             # Preserve this mapping
             high_confidence_mappings.append(mapping)
@@ -274,58 +766,39 @@ def retry_with_llm_rewrite_node(state: MappingState) -> MappingState:
             logger.info(
                 f"Flagged for retry - term: {original_term}, confidence: {confidence:.2f}"
             )
-    
-    if not low_confidence_terms:
-        logger.warning("Retry triggered but no low-confidence terms found")
-        return {**state, "preserved_mappings": high_confidence_mappings}
-    
-    # Prepare the list of previously seen terms to avoid repetition
-    previous_terms = set(state.get("history_rewritten_terms", []))
-    previous_terms.update(low_confidence_terms)
-    
-    # Rewrite only the low-confidence terms
+    return high_confidence_mappings, low_confidence_terms
+
+
+def _with_rewritten_terms(
+    state: MappingState,
+    high_confidence_mappings: List[dict],
+    low_confidence_terms: List[str],
+    previous_terms: set,
+    rewrites: List,
+) -> MappingState:
+    """
+    Reset the state for another search round with the rewritten terms.
+
+    Rewrites are de-duplicated against the history in term order; a term
+    without a new rewrite is searched again as-is.
+    """
     revised_terms = []
-    for term in low_confidence_terms:
-        state_for_prompt = {
-            **state,
-            "text": term,
-            "previous_terms": list(previous_terms)
-        }
-        
-        llm = AGENT_LLM_MAP["retry_with_llm_rewrite"]
-        prompt = apply_prompt_template("retry_with_llm_rewrite", state_for_prompt)
-        
-        response = llm.invoke(prompt)
-        raw_content = str(response.content)
-        
-        cleaned = re.sub(
-            r"```json\s*\n*(.*?)```", r"\1", raw_content, flags=re.DOTALL
-        ).strip()
-        
-        try:
-            parsed = json.loads(cleaned)
-            # Extract the rewritten term (should be a single term)
-            if isinstance(parsed, list) and parsed:
-                rewritten_term = parsed[0]
-            elif isinstance(parsed, str):
-                rewritten_term = parsed
-            else:
-                rewritten_term = None
-                
-            if rewritten_term and rewritten_term not in previous_terms:
-                revised_terms.append(rewritten_term)
-                previous_terms.add(rewritten_term)
-                logger.info(f"Rewrote '{term}' → '{rewritten_term}'")
-            else:
-                logger.warning(f"Failed to rewrite term: {term}, using original")
-                revised_terms.append(term)
-        except (json.JSONDecodeError, Exception) as e:
-            logger.error(f"Error parsing rewritten term for '{term}': {e}")
+    for term, rewritten_term in zip(low_confidence_terms, rewrites):
+        if rewritten_term and rewritten_term not in previous_terms:
+            revised_terms.append(rewritten_term)
+            previous_terms.add(rewritten_term)
+            logger.info(f"Rewrote '{term}' → '{rewritten_term}'")
+        else:
+            logger.warning(f"Failed to rewrite term: {term}, using original")
             revised_terms.append(term)
-    
+
     # Update the history of rewritten terms
     updated_history = list(previous_terms)
-    
+
+    # Each rewrite takes its term's place in the question's term order
+    revisions = dict(zip(low_confidence_terms, revised_terms))
+    term_order = [revisions.get(term, term) for term in _term_order(state)]
+
     logger.info(
         f"Retry summary - preserved: {len(high_confidence_mappings)}, "
         f"rewriting: {len(revised_terms)}"
@@ -334,98 +807,530 @@ def retry_with_llm_rewrite_node(state: MappingState) -> MappingState:
     return {
         **state,
         "extracted_terms": revised_terms,
+        "term_order": term_order,
         "history_rewritten_terms": updated_history,
         "retry_count": state.get("retry_count", 0) + 1,
         "preserved_mappings": high_confidence_mappings,
         "ranked_mappings": [],
         "validated_mappings": [],
         "umls_mappings": [],
+        "candidate_pages": {},
     }
 
 
-# state: text, is_mappable, mappability_retry_count, extracted_terms, umls_mappings, history_rewritten_terms,retry_count
-def rank_mappings_node(state: MappingState) -> MappingState:
+def _score_candidates(candidates: List[dict], output: List[dict]) -> List[dict]:
     """
-    Rank UMLS mapping candidates by confidence using LLM evaluation.
-
-    This node takes multiple candidate ontology terms for each extracted medical
-    term and uses an LLM to rank them by confidence and relevance to the original
-    survey question context.
+    Attach the LLM's confidence scores to a term's candidates.
 
     Args:
-        state (MappingState): Current workflow state with UMLS mapping candidates
+        candidates: Candidate ontology terms that were ranked
+        output: Parsed ranking objects with "matched_code" and "confidence"
 
     Returns:
-        MappingState: Updated state with ranked mappings by confidence
+        List[dict]: Candidates with confidence scores, highest first
     """
-    logger.debug("Entered rank_mappings_node")
-    umls_mappings = state.get("umls_mappings", [])
-    llm = AGENT_LLM_MAP["rank_mappings"]
-    ranked_mappings = []
+    # Build confidence lookup from LLM output
+    confidence_lookup = {
+        item["matched_code"]: _parse_confidence(item["confidence"]) for item in output
+    }
 
-    # Process each term's candidates
-    for entry in umls_mappings:
-        original_term = entry.get("original", "")
-        candidates = entry.get("candidates", [])
+    # Update candidate list with confidence scores
+    updated_candidates = []
+    for c in candidates:
+        code = c["code"]
+        updated_candidates.append(
+            {
+                "code": code,
+                "term": c["term"],
+                "description": c.get("description", ""),
+                "confidence": confidence_lookup.get(code, 0.0),
+            }
+        )
 
-        if not candidates:
-            ranked_mappings.append({"original": original_term, "ranked_candidates": []})
-            continue
+    # Sort candidates by confidence (highest first)
+    updated_candidates.sort(key=lambda x: x["confidence"], reverse=True)
+    return updated_candidates
 
-        # Prepare prompt for this term's candidates
-        prompt_state = {"original": original_term, "candidates": candidates}
-        prompt = apply_prompt_template("rank_mappings", prompt_state)
-        response = llm.invoke(prompt)
-        raw_output = str(response.content).strip()
-        logger.debug(f"Raw LLM output for '{original_term}': {raw_output[:100]}...")
 
-        try:
-            cleaned = re.sub(
-                r"```json\n?(.*?)\n?```", r"\1", raw_output, flags=re.DOTALL
-            ).strip()
-            output = json.loads(cleaned)
-        except json.JSONDecodeError as e:
-            logger.error(
-                f"Ranking JSON decode failed - term: {original_term}, "
-                f"error: {e}, output_preview: {raw_output[:200]}"
-            )
-            output = []
-        except Exception as e:
-            logger.error(f"Ranking parse error - term: {original_term}, error: {e}")
-            output = []
-
-        # Build confidence lookup from LLM output
-        confidence_lookup = {
-            item["matched_code"]: float(item["confidence"].replace("%", "").strip())
-            / 100
-            for item in output
-        }
+def _rank_candidates(llm, original_term: str, candidates: List[dict]) -> Steps:
+    """
+    Score one term's candidates with the ranking LLM.
 
-        # Update candidate list with confidence scores
-        updated_candidates = []
-        for c in candidates:
-            code = c["code"]
-            updated_candidates.append(
-                {
-                    "code": code,
-                    "term": c["term"],
-                    "description": c.get("description", ""),
-                    "confidence": confidence_lookup.get(code, 0.0),
-                }
-            )
+    Args:
+        llm: Chat model used for ranking
+        original_term: Extracted medical term
+        candidates: Non-empty list of candidate ontology terms
 
-        # Sort candidates by confidence (highest first)
-        updated_candidates.sort(key=lambda x: x["confidence"], reverse=True)
+    Returns:
+        Steps returning the candidates with confidence scores, highest first
+    """
+    # Prepare prompt for this term's candidates
+    prompt_state = {"original": original_term, "candidates": candidates}
+    prompt = apply_prompt_template("rank_mappings", prompt_state)
+    response = yield llm_call(llm, prompt, **_structured("ranking"))
+    return _parse_ranking(original_term, candidates, response)
 
-        ranked_mappings.append(
-            {"original": original_term, "ranked_candidates": updated_candidates}
-        )
 
-    logger.info(f"Final ranked mappings count: {len(ranked_mappings)}")
-    return {**state, "ranked_mappings": ranked_mappings}
+def _parse_ranking(original_term: str, candidates: List[dict], response):
+    """Parse a per-term ranking; malformed output scores every candidate 0.0."""
+    raw_output = response_text(response).strip()
+    logger.debug(f"Raw LLM output for '{original_term}': {raw_output[:100]}...")
 
+    try:
+        output = parse_structured(raw_output, "ranking")
+        return _score_candidates(candidates, output)
+    except ValueError as e:
+        logger.error(
+            f"Ranking parse failed - term: {original_term}, "
+            f"error: {e}, output_preview: {raw_output[:200]}"
+        )
+    except Exception as e:
+        logger.error(f"Ranking parse error - term: {original_term}, error: {e}")
+    return _score_candidates(candidates, [])
 
-# state: text,is_mappable,mappability_retry_count,extracted_terms,umls_mappings,history_rewritten_terms,retry_count,ranked_mappings
+
+def _estimate_tokens(entry: dict) -> int:
+    """Rough prompt token count of one term and its candidate list."""
+    chars = len(entry["original"]) + sum(
+        len(c["code"]) + len(c["term"]) + 6 for c in entry["candidates"]
+    )
+    return chars // 4 + 8
+
+
+def _chunk_by_token_budget(entries: List[dict], budget: int) -> List[List[dict]]:
+    """Group entries in order so each group's candidate listing fits ``budget``."""
+    chunks: List[List[dict]] = []
+    current: List[dict] = []
+    used = 0
+    for entry in entries:
+        cost = _estimate_tokens(entry)
+        if current and used + cost > budget:
+            chunks.append(current)
+            current, used = [], 0
+        current.append(entry)
+        used += cost
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _rank_batch(llm, entries: List[dict], text: str) -> Steps:
+    """
+    Rank several terms' candidates with a single LLM call.
+
+    Args:
+        llm: Chat model used for ranking
+        entries: {"original", "candidates"} entries with non-empty candidates
+        text: Original survey question
+
+    Returns:
+        Steps returning the scored candidates per term; terms whose ranking is
+        missing or malformed are left out (empty dict if nothing parsed)
+    """
+    prompt = apply_prompt_template(
+        "rank_mappings_batch", {"text": text, "entries": entries}
+    )
+    response = yield llm_call(llm, prompt, **_structured("batch_ranking"))
+    return _parse_batch_ranking(entries, response)
+
+
+def _parse_batch_ranking(entries: List[dict], response) -> Dict[str, List[dict]]:
+    """Parse a batched ranking into scored candidates per successfully parsed term."""
+    raw_output = response_text(response).strip()
+    logger.debug(f"Raw batched ranking output: {raw_output[:100]}...")
+
+    try:
+        output = parse_structured(raw_output, "batch_ranking")
+    except ValueError as e:
+        logger.error(
+            f"Batched ranking parse failed - terms: {len(entries)}, "
+            f"error: {e}, output_preview: {raw_output[:200]}"
+        )
+        return {}
+
+    by_key = {normalize_text(str(k)): v for k, v in output.items()}
+    ranked: Dict[str, List[dict]] = {}
+    for entry in entries:
+        term = entry["original"]
+        items = output.get(term, by_key.get(normalize_text(term)))
+        if not isinstance(items, list):
+            continue
+        try:
+            ranked[term] = _score_candidates(entry["candidates"], items)
+        except Exception as e:
+            logger.error(f"Batched ranking parse error - term: {term}, error: {e}")
+    return ranked
+
+
+def _batch_chunks(entries: List[dict], pending: List[int]) -> List[List[dict]]:
+    """Split the entries to rank into multi-term chunks within the token budget."""
+    indexed = [{**entries[i], "index": i} for i in pending]
+    return [
+        chunk
+        for chunk in _chunk_by_token_budget(indexed, RANK_BATCH_TOKEN_BUDGET)
+        if len(chunk) > 1
+    ]
+
+
+def _collect_batches(
+    chunks: List[List[dict]],
+    batches: List[Dict[str, List[dict]]],
+    ranked: Dict[int, List[dict]],
+    pending: List[int],
+) -> List[int]:
+    """Store batched rankings in ``ranked``; return entries needing per-term calls."""
+    for chunk, batch in zip(chunks, batches):
+        for item in chunk:
+            if item["original"] in batch:
+                ranked[item["index"]] = batch[item["original"]]
+    fallback = [i for i in pending if i not in ranked]
+    logger.info(
+        f"Batched ranking - terms: {len(pending)}, per_term_fallbacks: {len(fallback)}"
+    )
+    return fallback
+
+
+def _rank_batching(state: MappingState) -> bool:
+    """
+    Whether a state's ranking calls batch terms (RANK_BATCH).
+
+    A per-term fan-out state holds a single term, so there is nothing to batch.
+    """
+    return RANK_BATCH and "term_index" not in state
+
+
+def _rank_entries(
+    llm, entries: List[dict], text: str = "", batch: bool = RANK_BATCH
+) -> Steps:
+    """
+    Rank the candidates of every entry, batching terms when ``batch`` is on.
+
+    Batched mode packs terms into as few calls as RANK_BATCH_TOKEN_BUDGET
+    allows; any term whose batched ranking cannot be parsed is re-ranked with
+    its own per-term call. Independent calls run concurrently.
+
+    Args:
+        llm: Chat model used for ranking
+        entries: {"original", "candidates"} entries
+        text: Original survey question
+        batch: Pack several terms per call (see ``_rank_batching``)
+
+    Returns:
+        Steps returning the scored candidates per entry, in input order
+    """
+    ranked: Dict[int, List[dict]] = {}
+    pending = [i for i, e in enumerate(entries) if e.get("candidates")]
+
+    if batch and len(pending) > 1:
+        chunks = _batch_chunks(entries, pending)
+        batches = yield MapSteps(lambda c: _rank_batch(llm, c, text), chunks)
+        pending = _collect_batches(chunks, batches, ranked, pending)
+
+    per_term = yield MapSteps(
+        lambda i: _rank_candidates(
+            llm, entries[i]["original"], entries[i]["candidates"]
+        ),
+        pending,
+    )
+    ranked.update(zip(pending, per_term))
+    return [ranked.get(i, []) for i in range(len(entries))]
+
+
+def needs_candidate_widening(entry: dict, pages: dict) -> bool:
+    """
+    Whether a ranked term should get another page of search candidates.
+
+    Args:
+        entry: A ranked_mappings entry
+        pages: Pages already fetched per term (see ``candidate_pages``)
+
+    Returns:
+        bool: True if the top confidence is low and unseen pages remain
+    """
+    ranked = entry.get("ranked_candidates", [])
+    if not ranked or ranked[0].get("confidence", 0.0) >= WIDEN_CONFIDENCE_THRESHOLD:
+        return False
+    return pages.get(entry.get("original", ""), 1) < MAX_CANDIDATE_PAGES
+
+
+# state: text, is_mappable, mappability_calls, extracted_terms, umls_mappings, history_rewritten_terms,retry_count
+def rank_mappings_node(state: MappingState) -> MappingState:
+    """
+    Rank UMLS mapping candidates by confidence using LLM evaluation.
+
+    This node takes multiple candidate ontology terms for each extracted medical
+    term and uses an LLM to rank them by confidence and relevance to the original
+    survey question context.
+
+    Args:
+        state (MappingState): Current workflow state with UMLS mapping candidates
+
+    Returns:
+        MappingState: Updated state with ranked mappings by confidence
+    """
+    logger.debug("Entered rank_mappings_node")
+    return run_steps(_rank_mappings(state))
+
+
+def _rank_mappings(state: MappingState) -> Steps:
+    """Steps of ``rank_mappings_node``."""
+    umls_mappings = state.get("umls_mappings", [])
+    if not has_time_for(state, RANK_MIN_SECONDS, "rank_mappings"):
+        ranked = _with_ranked_mappings(state, _search_ranked(umls_mappings))
+        return {**ranked, "partial": True}
+    llm = AGENT_LLM_MAP["rank_mappings"]
+
+    # Rank each term's candidates (terms without candidates rank empty),
+    # reusing rankings of the same term and candidates from earlier rounds
+    pending = _memo_pending(state, "rank", umls_mappings, _rank_memo_key)
+    computed = yield from _rank_entries(
+        llm, pending, state.get("text", ""), _rank_batching(state)
+    )
+    state, ranked_lists = _memo_results(
+        state, "rank", umls_mappings, _rank_memo_key, pending, computed
+    )
+    return _with_ranked_mappings(state, ranked_lists)
+
+
+def _search_ranked(umls_mappings: List[dict]) -> List[List[dict]]:
+    """Each term's candidates in search order, unscored (confidence 0.0)."""
+    return [_score_candidates(e.get("candidates", []), []) for e in umls_mappings]
+
+
+def _with_ranked_mappings(
+    state: MappingState, ranked_lists: List[List[dict]]
+) -> MappingState:
+    """Store each term's ranked candidates in the state."""
+    umls_mappings = state.get("umls_mappings", [])
+    ranked_mappings = [
+        {"original": entry.get("original", ""), "ranked_candidates": ranked}
+        for entry, ranked in zip(umls_mappings, ranked_lists)
+    ]
+
+    logger.info(f"Final ranked mappings count: {len(ranked_mappings)}")
+    return {**state, "ranked_mappings": ranked_mappings}
+
+
+def widen_candidates_node(state: MappingState) -> MappingState:
+    """
+    Fetch and rank the next page of candidates for low-confidence terms.
+
+    Only terms whose best ranked candidate is below WIDEN_CONFIDENCE_THRESHOLD
+    and whose search still has unseen pages are widened. The new candidates
+    alone are ranked and merged into the existing ranking, so the costly
+    rewrite retry is only reached once widening is exhausted. Rankings of a
+    term's page are reused from earlier retry rounds (``retry_memo``).
+
+    Args:
+        state (MappingState): Current workflow state with ranked mappings
+
+    Returns:
+        MappingState: Updated state with widened rankings and page counters
+    """
+    logger.debug("Entered widen_candidates_node")
+    return run_steps(_widen_candidates(state))
+
+
+def _widen_candidates(state: MappingState) -> Steps:
+    """Steps of ``widen_candidates_node``."""
+    pages = dict(state.get("candidate_pages", {}))
+    by_page = _terms_by_next_page(state.get("ranked_mappings", []), pages)
+    if not by_page:
+        return {**state}
+
+    # Terms can be on different pages; fetch each page's terms in one batch
+    fetched: Dict[str, List[dict]] = {}
+    for page, terms in by_page.items():
+        results = yield _search(state, terms, page)
+        _record_page(results, page, fetched, pages)
+
+    new_entries = _new_candidate_entries(state.get("ranked_mappings", []), fetched)
+    key = _widen_memo_key(by_page)
+    pending = _memo_pending(state, "widen", new_entries, key)
+    llm = AGENT_LLM_MAP["rank_mappings"]
+    computed = yield from _rank_entries(
+        llm, pending, state.get("text", ""), _rank_batching(state)
+    )
+    state, new_rankings = _memo_results(
+        state, "widen", new_entries, key, pending, computed
+    )
+    return _with_widened_rankings(state, new_rankings, pages)
+
+
+def _widen_memo_key(by_page: Dict[int, List[str]]) -> Callable[[dict], str]:
+    """Retry memo key of a widened entry: its term, page and new candidates."""
+    page_of = {term: page for page, terms in by_page.items() for term in terms}
+
+    def key(entry: dict) -> str:
+        return f"{_rank_memo_key(entry)}|{page_of.get(entry.get('original', ''))}"
+
+    return key
+
+
+def _terms_by_next_page(ranked_mappings: List[dict], pages: dict) -> Dict[int, List[str]]:
+    """Group the terms that need widening by the next result page to fetch."""
+    by_page: Dict[int, List[str]] = {}
+    for entry in ranked_mappings:
+        if needs_candidate_widening(entry, pages):
+            term = entry["original"]
+            by_page.setdefault(pages.get(term, 1), []).append(term)
+    return by_page
+
+
+def _record_page(
+    results: List[dict], page: int, fetched: Dict[str, List[dict]], pages: dict
+) -> None:
+    """Store a fetched page per term and advance (or exhaust) its page counter."""
+    for entry in results:
+        fetched[entry["original"]] = entry["candidates"]
+        exhausted = len(entry["candidates"]) < SEARCH_PAGE_SIZE
+        pages[entry["original"]] = MAX_CANDIDATE_PAGES if exhausted else page + 1
+
+
+def _new_candidate_entries(
+    ranked_mappings: List[dict], fetched: Dict[str, List[dict]]
+) -> List[dict]:
+    """Return per-term entries holding only candidates not ranked yet."""
+    new_entries = []
+    for entry in ranked_mappings:
+        original_term = entry.get("original", "")
+        seen = {c["code"] for c in entry.get("ranked_candidates", [])}
+        new_candidates = [
+            c for c in fetched.get(original_term, []) if c.get("code") not in seen
+        ]
+        if new_candidates:
+            logger.info(
+                f"Widening candidates - term: {original_term}, "
+                f"new: {[c['code'] for c in new_candidates]}"
+            )
+        new_entries.append({"original": original_term, "candidates": new_candidates})
+    return new_entries
+
+
+def _with_widened_rankings(
+    state: MappingState, new_rankings: List[List[dict]], pages: dict
+) -> MappingState:
+    """Merge newly ranked candidates into each term's ranking."""
+    widened = []
+    for entry, new_ranked in zip(state.get("ranked_mappings", []), new_rankings):
+        if not new_ranked:
+            widened.append(entry)
+            continue
+        merged = entry.get("ranked_candidates", []) + new_ranked
+        merged.sort(key=lambda x: x["confidence"], reverse=True)
+        widened.append(
+            {"original": entry.get("original", ""), "ranked_candidates": merged}
+        )
+
+    return {**state, "ranked_mappings": widened, "candidate_pages": pages}
+
+
+def _validate_top_candidate(llm, item: dict, text: str) -> Steps:
+    """
+    Validate one term's top-ranked candidate with the validation LLM.
+
+    Args:
+        llm: Chat model used for validation
+        item: A ranked_mappings entry
+        text: Original survey question
+
+    Returns:
+        Steps returning the validated mapping for the term
+    """
+    if not item.get("ranked_candidates"):
+        return _unranked_mapping(item.get("original", ""))
+
+    response = yield llm_call(
+        llm, _validation_prompt(item, text), **_structured("validation")
+    )
+    return _parse_validation(item, response)
+
+
+def _validation_prompt(item: dict, text: str) -> str:
+    """Render the validation prompt for a term's top-ranked candidate."""
+    # Use the top-ranked candidate for validation
+    candidate = item["ranked_candidates"][0]
+    prompt_state = {
+        "text": text,
+        "code": candidate.get("code"),
+        "term": candidate.get("term"),
+    }
+    return apply_prompt_template("validate_mapping", prompt_state)
+
+
+def _ranked_mapping(item: dict) -> dict:
+    """Mapping of a ranked term's top candidate at its ranking confidence."""
+    candidates = item.get("ranked_candidates", [])
+    if not candidates:
+        return _unranked_mapping(item.get("original", ""))
+    return {
+        "original": item.get("original", ""),
+        "best_match_code": candidates[0]["code"],
+        "best_match_term": candidates[0]["term"],
+        "confidence": candidates[0].get("confidence", 1.0),
+    }
+
+
+def _unranked_mapping(original_term: str) -> dict:
+    """Validated mapping for a term without any candidates."""
+    return {
+        "original": original_term,
+        "best_match_code": None,
+        "best_match_term": None,
+        "confidence": 0.0,
+    }
+
+
+def _parse_validation(item: dict, response) -> dict:
+    """
+    Parse the validation LLM output for one ranked term.
+
+    Falls back to the top-ranked candidate and its ranking confidence when the
+    output is empty or malformed.
+    """
+    original_term = item.get("original", "")
+    candidates = item.get("ranked_candidates", [])
+    raw_output = response_text(response).strip()
+    logger.debug(f"Raw LLM output for '{original_term}': {raw_output[:100]}...")
+
+    fallback = _ranked_mapping(item)
+
+    try:
+        parsed = parse_structured(raw_output, "validation")
+        # Fallback if parsed result is empty or malformed
+        if not parsed or not parsed.get("best_match_code"):
+            logger.warning(
+                f"Validation result empty/malformed - term: {original_term}, "
+                f"using top-ranked fallback (code: {candidates[0].get('code')})"
+            )
+            return fallback
+
+        confidence = _parse_confidence(parsed["confidence"])
+        logger.debug(
+            f"Validation successful - term: {original_term}, "
+            f"code: {parsed['best_match_code']}, confidence: {confidence:.2f}"
+        )
+        return {
+            "original": original_term,
+            "best_match_code": parsed["best_match_code"],
+            "best_match_term": parsed["best_match_term"],
+            "confidence": confidence,
+        }
+    except ValueError as e:
+        logger.warning(
+            f"Validation parse error - term: {original_term}, "
+            f"error: {e}, output_preview: {raw_output[:200]}, using fallback"
+        )
+        return fallback
+    except Exception as e:
+        logger.warning(
+            f"Validation parse error - term: {original_term}, "
+            f"error: {type(e).__name__}: {e}, using fallback"
+        )
+        return fallback
+
+
+# state: text,is_mappable,mappability_calls,extracted_terms,umls_mappings,history_rewritten_terms,retry_count,ranked_mappings
 def validate_mapping_node(state: MappingState) -> MappingState:
     """
     Validate and select the best mapping for each medical term.
@@ -441,118 +1346,399 @@ def validate_mapping_node(state: MappingState) -> MappingState:
         MappingState: Updated state with validated final mappings
     """
     logger.debug("Entered validate_mapping_node")
+    return run_steps(_validate_mapping(state))
+
 
+def _validate_mapping(state: MappingState) -> Steps:
+    """Steps of ``validate_mapping_node``."""
     ranked_mappings = state.get("ranked_mappings", [])
     if not ranked_mappings:
         logger.warning("No ranked mappings to validate")
         return {**state}
 
+    if not has_time_for(state, VALIDATE_MIN_SECONDS, "validate_mapping"):
+        return _with_ranked_results(state, ranked_mappings)
+
     llm = AGENT_LLM_MAP["validate_mapping"]
-    validated_results = []
-
-    # Validate each term's best candidate
-    for item in ranked_mappings:
-        original_term = item.get("original", "")
-        candidates = item.get("ranked_candidates", [])
-
-        if not candidates:
-            validated_results.append(
-                {
-                    "original": original_term,
-                    "best_match_code": None,
-                    "best_match_term": None,
-                    "confidence": 0.0,
-                }
-            )
-            continue
+    text = state.get("text", "")
 
-        # Use the top-ranked candidate for validation
-        candidate = candidates[0]
-        code = candidate.get("code")
-        term = candidate.get("term")
+    # Validate each term's best candidate, concurrently; a candidate already
+    # validated in an earlier round keeps its verdict
+    pending = _memo_pending(state, "validation", ranked_mappings, _validation_memo_key)
+    computed = yield MapSteps(
+        lambda item: _validate_top_candidate(llm, item, text), pending
+    )
+    return _with_memo_validations(state, ranked_mappings, pending, computed)
+
+
+def _with_ranked_results(
+    state: MappingState, ranked_mappings: List[dict]
+) -> MappingState:
+    """Use each term's top-ranked candidate unvalidated, marking the result partial."""
+    validated_results = [_ranked_mapping(item) for item in ranked_mappings]
+    return {**_with_validated_results(state, validated_results), "partial": True}
+
+
+def _with_memo_validations(
+    state: MappingState,
+    ranked_mappings: List[dict],
+    pending: List[dict],
+    computed: List[dict],
+) -> MappingState:
+    """Merge memoized and new validations (under each term's own name)."""
+    state, results = _memo_results(
+        state, "validation", ranked_mappings, _validation_memo_key, pending, computed
+    )
+    validated_results = [
+        {**result, "original": item.get("original", "")}
+        for item, result in zip(ranked_mappings, results)
+    ]
+    return _with_validated_results(state, validated_results)
 
-        prompt_state = {"text": state.get("text", ""), "code": code, "term": term}
 
-        prompt = apply_prompt_template("validate_mapping", prompt_state)
-        response = llm.invoke(prompt)
-        raw_output = str(response.content).strip()
-        logger.debug(f"Raw LLM output for '{original_term}': {raw_output[:100]}...")
-        cleaned_output = re.sub(
-            r"```json\n?(.*?)\n?```", r"\1", raw_output, flags=re.DOTALL
-        ).strip()
+def _term_order(state: MappingState) -> List[str]:
+    """The question's terms in extraction order, as currently searched."""
+    return state.get("term_order") or _search_terms(state)
 
-        try:
-            parsed = json.loads(cleaned_output)
-            # Fallback if parsed result is empty or malformed
-            if not parsed or not parsed.get("best_match_code"):
-                logger.warning(
-                    f"Validation result empty/malformed - term: {original_term}, "
-                    f"using top-ranked fallback (code: {candidates[0].get('code')})"
-                )
-                fallback_candidate = candidates[0]
-                validated_results.append(
-                    {
-                        "original": original_term,
-                        "best_match_code": fallback_candidate["code"],
-                        "best_match_term": fallback_candidate["term"],
-                        "confidence": fallback_candidate.get("confidence", 1.0),
-                    }
-                )
-            else:
-                confidence = _parse_confidence(parsed["confidence"])
-                logger.debug(
-                    f"Validation successful - term: {original_term}, "
-                    f"code: {parsed['best_match_code']}, confidence: {confidence:.2f}"
-                )
-                validated_results.append(
-                    {
-                        "original": original_term,
-                        "best_match_code": parsed["best_match_code"],
-                        "best_match_term": parsed["best_match_term"],
-                        "confidence": confidence,
-                    }
-                )
-        except json.JSONDecodeError as e:
-            logger.warning(
-                f"Validation JSON decode error - term: {original_term}, "
-                f"error: {e}, output_preview: {cleaned_output[:200]}, using fallback"
-            )
-            fallback_candidate = candidates[0]
-            validated_results.append(
-                {
-                    "original": original_term,
-                    "best_match_code": fallback_candidate["code"],
-                    "best_match_term": fallback_candidate["term"],
-                    "confidence": fallback_candidate.get("confidence", 1.0),
-                }
-            )
-        except Exception as e:
-            logger.warning(
-                f"Validation parse error - term: {original_term}, "
-                f"error: {type(e).__name__}: {e}, using fallback"
-            )
-            fallback_candidate = candidates[0]
-            validated_results.append(
-                {
-                    "original": original_term,
-                    "best_match_code": fallback_candidate["code"],
-                    "best_match_term": fallback_candidate["term"],
-                    "confidence": fallback_candidate.get("confidence", 1.0),
-                }
-            )
 
-    # Merge with preserved mappings from retry (if any)
+def _in_term_order(state: MappingState, mappings: List[dict]) -> List[dict]:
+    """Sort mappings by their term's position in the extraction order."""
+    position = {term: i for i, term in enumerate(_term_order(state))}
+    return sorted(
+        mappings, key=lambda m: position.get(m.get("original"), len(position))
+    )
+
+
+def _with_validated_results(
+    state: MappingState, validated_results: List[dict]
+) -> MappingState:
+    """Merge new validations with preserved and exact mappings into the state."""
+    # Merge with preserved mappings from retry and exact matches (if any)
     preserved_mappings = state.get("preserved_mappings", [])
-    if preserved_mappings:
+    exact_mappings = state.get("exact_mappings", [])
+    if preserved_mappings or exact_mappings:
         logger.info(
-            f"Merging {len(preserved_mappings)} preserved mappings with "
-            f"{len(validated_results)} new mappings"
+            f"Merging {len(preserved_mappings)} preserved and {len(exact_mappings)} "
+            f"exact mappings with {len(validated_results)} new mappings"
         )
-        all_validated = preserved_mappings + validated_results
-    else:
-        all_validated = validated_results
+    all_validated = _in_term_order(
+        state, preserved_mappings + exact_mappings + validated_results
+    )
+
+    return {
+        **state,
+        "validated_mappings": all_validated,
+        "preserved_mappings": [],
+        "exact_mappings": [],
+    }
+
+
+# state: text,is_mappable,mappability_calls,extracted_terms,umls_mappings,history_rewritten_terms,retry_count,ranked_mappings,validated_mappings
+
+
+def _parse_rank_and_validate(entry: dict, response):
+    """
+    Parse the fused rank-and-validate output for one term.
+
+    Returns:
+        The validated mapping, or None if the output is malformed or names a
+        code that is not among the term's candidates
+    """
+    original_term = entry.get("original", "")
+    raw_output = response_text(response).strip()
+    logger.debug(f"Raw LLM output for '{original_term}': {raw_output[:100]}...")
+
+    try:
+        parsed = parse_structured(raw_output, "validation")
+        by_code = {c["code"]: c for c in entry.get("candidates", [])}
+        candidate = by_code.get(parsed.get("best_match_code"))
+        if candidate is None:
+            raise ValueError(f"unknown code {parsed.get('best_match_code')!r}")
+        confidence = _parse_confidence(parsed["confidence"])
+    except Exception as e:
+        logger.warning(
+            f"Rank-and-validate parse error - term: {original_term}, "
+            f"error: {type(e).__name__}: {e}, output_preview: {raw_output[:200]}"
+        )
+        return None
+
+    logger.debug(
+        f"Rank-and-validate successful - term: {original_term}, "
+        f"code: {candidate['code']}, confidence: {confidence:.2f}"
+    )
+    return {
+        "original": original_term,
+        "best_match_code": candidate["code"],
+        "best_match_term": candidate["term"],
+        "confidence": confidence,
+    }
+
+
+def _rank_and_validate_prompt(entry: dict, text: str) -> str:
+    """Render the fused rank-and-validate prompt for one term."""
+    prompt_state = {
+        "text": text,
+        "original": entry.get("original", ""),
+        "candidates": entry.get("candidates", []),
+    }
+    return apply_prompt_template("rank_and_validate", prompt_state)
+
+
+def _rank_and_validate_term(llm, entry: dict, text: str) -> Steps:
+    """
+    Select and score one term's best candidate with a single LLM call.
+
+    Falls back to the separate rank and validate calls when the fused output
+    cannot be parsed.
+
+    Args:
+        llm: Chat model used for the fused stage
+        entry: A umls_mappings entry ({"original", "candidates"})
+        text: Original survey question
+
+    Returns:
+        Steps returning the validated mapping for the term
+    """
+    original_term = entry.get("original", "")
+    candidates = entry.get("candidates", [])
+    if not candidates:
+        return _unranked_mapping(original_term)
+
+    response = yield llm_call(
+        llm, _rank_and_validate_prompt(entry, text), **_structured("validation")
+    )
+    result = _parse_rank_and_validate(entry, response)
+    if result is not None:
+        return result
+
+    logger.info(f"Rank-and-validate fallback to two-stage - term: {original_term}")
+    ranked = yield from _rank_candidates(
+        AGENT_LLM_MAP["rank_mappings"], original_term, candidates
+    )
+    return (
+        yield from _validate_top_candidate(
+            AGENT_LLM_MAP["validate_mapping"],
+            {"original": original_term, "ranked_candidates": ranked},
+            text,
+        )
+    )
+
+
+def rank_and_validate_node(state: MappingState) -> MappingState:
+    """
+    Rank and validate each term's candidates in one LLM call per term.
+
+    Alternative to the rank_mappings → validate_mapping pair (see
+    FUSED_RANK_VALIDATE in builder.py): the LLM sees the full survey question
+    and all candidates and returns the best match with its confidence, in the
+    same ``validated_mappings`` schema.
+
+    Args:
+        state (MappingState): Current workflow state with UMLS mapping candidates
+
+    Returns:
+        MappingState: Updated state with validated final mappings
+    """
+    logger.debug("Entered rank_and_validate_node")
+    return run_steps(_rank_and_validate(state))
+
+
+def _rank_and_validate(state: MappingState) -> Steps:
+    """Steps of ``rank_and_validate_node``."""
+    umls_mappings = state.get("umls_mappings", [])
+    if not umls_mappings:
+        logger.warning("No UMLS mappings to rank and validate")
+        return {**state}
+    if not has_time_for(state, RANK_MIN_SECONDS, "rank_and_validate"):
+        ranked = _with_ranked_mappings(state, _search_ranked(umls_mappings))
+        return _with_ranked_results(state, ranked["ranked_mappings"])
+
+    llm = AGENT_LLM_MAP["rank_and_validate"]
+    text = state.get("text", "")
+    pending = _memo_pending(state, "rank_and_validate", umls_mappings, _rank_memo_key)
+    computed = yield MapSteps(
+        lambda entry: _rank_and_validate_term(llm, entry, text), pending
+    )
+    state, validated_results = _memo_results(
+        state, "rank_and_validate", umls_mappings, _rank_memo_key, pending, computed
+    )
+    return _with_validated_results(state, validated_results)
+
+
+# === Per-term fan-out (see PER_TERM_FANOUT in builder.py) ===
+
+# Question fields the per-term pipeline reads
+_TERM_STATE_KEYS = ("text", "field_type", "ontology", "deadline")
+
+
+def per_term_states(state: MappingState) -> List[MappingState]:
+    """
+    Split a state into one single-term state per extracted term.
+
+    Each term state carries the question fields and one term (with its
+    position in ``term_index``), so it runs fetch → rank → validate → retry
+    on its own. Every term starts with all the question's terms in its
+    rewrite history, so no term is rewritten into another one.
+    """
+    shared = {key: state[key] for key in _TERM_STATE_KEYS if key in state}
+    terms = _search_terms(state)
+    return [
+        {
+            **shared,
+            "extracted_terms": [term],
+            "history_rewritten_terms": list(terms),
+            "term_index": index,
+        }
+        for index, term in enumerate(terms)
+    ]
+
+
+def term_result(state: MappingState) -> Dict[int, dict]:
+    """Return a finished term state's outcome as a ``term_results`` update."""
+    return {
+        state["term_index"]: {
+            "validated_mappings": state.get("validated_mappings", []),
+            "retry_count": state.get("retry_count", 0),
+            "history_rewritten_terms": state.get("history_rewritten_terms", []),
+            "parse_stats": state.get("parse_stats", {}),
+            "partial": state.get("partial", False),
+        }
+    }
+
+
+def merge_term_results_node(state: MappingState) -> MappingState:
+    """
+    Combine the per-term pipeline outcomes into the request state.
+
+    Validated mappings follow the extracted term order, ``retry_count`` is
+    the most retries any term needed, the result is partial if any term's
+    is, and the terms' parse statistics are added to the request's. Terms
+    rewritten concurrently may converge on the same phrase and mapping; only
+    the first such mapping is kept.
+
+    Args:
+        state (MappingState): State with one ``term_results`` entry per term
+
+    Returns:
+        MappingState: Updated state with the merged validated mappings
+    """
+    results = [result for _, result in sorted(state.get("term_results", {}).items())]
+
+    parse_stats = {
+        node: dict(counts) for node, counts in state.get("parse_stats", {}).items()
+    }
+    for result in results:
+        for node, counts in result["parse_stats"].items():
+            merged = parse_stats.setdefault(node, {})
+            for field, count in counts.items():
+                merged[field] = merged.get(field, 0) + count
+
+    validated_mappings = []
+    seen = set()
+    for mapping in (m for r in results for m in r["validated_mappings"]):
+        key = (mapping.get("original"), mapping.get("best_match_code"))
+        if key in seen:
+            logger.info(f"Dropping duplicate mapping - term: {key[0]}, code: {key[1]}")
+            continue
+        seen.add(key)
+        validated_mappings.append(mapping)
+
+    logger.info(f"Merged per-term results - terms: {len(results)}")
+    return {
+        **state,
+        "validated_mappings": validated_mappings,
+        "retry_count": max((r["retry_count"] for r in results), default=0),
+        "history_rewritten_terms": list(
+            dict.fromkeys(t for r in results for t in r["history_rewritten_terms"])
+        ),
+        "parse_stats": parse_stats,
+        "partial": state.get("partial", False) or any(r["partial"] for r in results),
+    }
+
+
+# === Async node implementations ===
+# Each awaits the same steps as the sync node of the same name (see steps.py),
+# using ``ainvoke`` and the async fetch layer instead of blocking a thread.
+# builder.py registers both variants so the compiled graph supports
+# ``invoke`` and ``ainvoke``.
+
+
+async def aspeculative_prefetch_node(state: MappingState) -> MappingState:
+    """Async variant of ``speculative_prefetch_node``."""
+    return await arun_steps(_speculative_prefetch(state))
+
+
+async def ais_question_mappable_node(state: MappingState) -> MappingState:
+    """Async variant of ``is_question_mappable_node``."""
+    logger.debug("Entered ais_question_mappable_node")
+    return await arun_steps(_is_question_mappable(state))
+
+
+async def ais_mappable_and_extract_node(state: MappingState) -> MappingState:
+    """Async variant of ``is_mappable_and_extract_node``."""
+    return await arun_steps(_is_mappable_and_extract(state))
+
+
+async def aextract_medical_terms_radio_node(state: MappingState) -> MappingState:
+    """Async variant of ``extract_medical_terms_radio_node``."""
+    return await arun_steps(
+        _extract_medical_terms(state, "extract_medical_term_radio_from_survey")
+    )
+
+
+async def aextract_medical_terms_checkbox_node(state: MappingState) -> MappingState:
+    """Async variant of ``extract_medical_terms_checkbox_node``."""
+    return await arun_steps(
+        _extract_medical_terms(state, "extract_medical_term_checkbox_from_survey")
+    )
+
+
+async def aextract_medical_terms_short_node(state: MappingState) -> MappingState:
+    """Async variant of ``extract_medical_terms_short_node``."""
+    return await arun_steps(
+        _extract_medical_terms(state, "extract_medical_term_short_from_survey")
+    )
+
+
+async def afetch_umls_terms_node(state: MappingState) -> MappingState:
+    """Async variant of ``fetch_umls_terms_node``."""
+    return await arun_steps(_fetch_umls_terms(state))
+
+
+async def amatch_exact_terms_node(state: MappingState) -> MappingState:
+    """Async variant of ``match_exact_terms_node`` (no I/O, runs inline)."""
+    return match_exact_terms_node(state)
+
+
+async def arank_mappings_node(state: MappingState) -> MappingState:
+    """Async variant of ``rank_mappings_node``."""
+    logger.debug("Entered arank_mappings_node")
+    return await arun_steps(_rank_mappings(state))
+
+
+async def awiden_candidates_node(state: MappingState) -> MappingState:
+    """Async variant of ``widen_candidates_node``."""
+    logger.debug("Entered awiden_candidates_node")
+    return await arun_steps(_widen_candidates(state))
+
+
+async def avalidate_mapping_node(state: MappingState) -> MappingState:
+    """Async variant of ``validate_mapping_node``."""
+    logger.debug("Entered avalidate_mapping_node")
+    return await arun_steps(_validate_mapping(state))
+
+
+async def aretry_with_llm_rewrite_node(state: MappingState) -> MappingState:
+    """Async variant of ``retry_with_llm_rewrite_node``."""
+    return await arun_steps(_retry_with_llm_rewrite(state))
+
 
-    return {**state, "validated_mappings": all_validated, "preserved_mappings": []}
+async def arank_and_validate_node(state: MappingState) -> MappingState:
+    """Async variant of ``rank_and_validate_node``."""
+    logger.debug("Entered arank_and_validate_node")
+    return await arun_steps(_rank_and_validate(state))
 
 
-# state: text,is_mappable,mappability_retry_count,extracted_terms,umls_mappings,history_rewritten_terms,retry_count,ranked_mappings,validated_mappings
+async def amerge_term_results_node(state: MappingState) -> MappingState:
+    """Async variant of ``merge_term_results_node`` (no I/O, runs inline)."""
+    return merge_term_results_node(state)
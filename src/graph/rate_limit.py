@@ -0,0 +1,314 @@
+"""
+Provider quota rate limiting for the UMLS Mapping LangGraph-based Agent.
+This module keeps LLM traffic within per-model requests-per-minute and
+tokens-per-minute budgets using token buckets shared by every thread and
+event loop in the process. Callers wait in a priority queue (first come,
+first served within a priority). Calls that are throttled anyway are retried
+with exponential backoff and full jitter.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.graph.deadline import time_left
+
+logger = logging.getLogger(__name__)
+
+# Longest single sleep while waiting in the queue, so waiters re-check often
+# enough to notice the queue head changing
+_MAX_POLL_SECONDS = 0.05
+
+
+class RateLimitDeadlineError(TimeoutError):
+    """Raised when a call is still queued for budget at the request deadline."""
+
+
+class TokenBucket:
+    """Bucket holding up to ``capacity`` units, refilled at ``capacity`` per minute."""
+
+    def __init__(self, capacity: float):
+        self.capacity = float(capacity)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        """Add the units accrued since the last refill."""
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until ``amount`` units are available (0 if they are now)."""
+        missing = min(amount, self.capacity) - self.level
+        return max(missing / self.rate, 0.0) if self.rate else float("inf")
+
+
+class ModelRateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute limiter for one model.
+
+    Token usage is charged up front from an estimate and corrected with the
+    actual usage once the response arrives (see ``settle``). Only the head of
+    the queue may take budget, so a large request is not starved by a stream
+    of smaller ones.
+    """
+
+    def __init__(self, name: str, rpm: int, tpm: int):
+        self.name = name
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self._queue: List[Tuple[int, int]] = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self.acquired = 0
+        self.throttled = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.max_queue_depth = 0
+
+    def _enqueue(self, priority: int) -> Tuple[int, int]:
+        ticket = (priority, next(self._seq))
+        with self._lock:
+            heapq.heappush(self._queue, ticket)
+            self.max_queue_depth = max(self.max_queue_depth, len(self._queue))
+        return ticket
+
+    def _try_take(self, ticket: Tuple[int, int], tokens: int) -> float:
+        """Take budget if ``ticket`` heads the queue; else return a wait time."""
+        with self._lock:
+            if self._queue[0] != ticket:
+                return _MAX_POLL_SECONDS
+            now = time.monotonic()
+            self.requests.refill(now)
+            self.tokens.refill(now)
+            wait = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+            if wait > 0:
+                return min(wait, _MAX_POLL_SECONDS)
+            self.requests.level -= 1
+            self.tokens.level -= min(tokens, self.tokens.capacity)
+            heapq.heappop(self._queue)
+            self._changed.notify_all()
+            return 0.0
+
+    def _leave(self, ticket: Tuple[int, int]) -> None:
+        """Drop an abandoned ticket (e.g. a cancelled task) from the queue."""
+        with self._lock:
+            if ticket in self._queue:
+                self._queue.remove(ticket)
+                heapq.heapify(self._queue)
+                self._changed.notify_all()
+
+    def _queue_wait(self, wait: float) -> float:
+        """Cap a queue wait at the request deadline, raising once it has passed."""
+        left = time_left()
+        if left <= 0:
+            raise RateLimitDeadlineError(
+                f"request deadline passed while queued for model {self.name}"
+            )
+        return min(wait, left)
+
+    def _record_wait(self, waited: float) -> None:
+        with self._lock:
+            self.acquired += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+        if waited > 1.0:
+            logger.info(
+                f"LLM rate limit wait - model: {self.name}, waited: {waited:.2f}s, "
+                f"queue_depth: {len(self._queue)}"
+            )
+
+    def acquire(self, tokens: int, priority: int = 0) -> float:
+        """
+        Block until one request and ``tokens`` tokens fit the budgets.
+
+        Args:
+            tokens: Estimated tokens of the call (prompt and completion)
+            priority: Queue priority, lower is served first
+
+        Returns:
+            float: Seconds spent waiting
+
+        Raises:
+            RateLimitDeadlineError: If the running request's deadline (see
+                ``deadline.time_left``) passes while waiting
+        """
+        start = time.monotonic()
+        ticket = self._enqueue(priority)
+        try:
+            while True:
+                wait = self._try_take(ticket, tokens)
+                if wait == 0:
+                    break
+                wait = self._queue_wait(wait)
+                with self._changed:
+                    self._changed.wait(wait)
+        except BaseException:
+            self._leave(ticket)
+            raise
+        waited = time.monotonic() - start
+        self._record_wait(waited)
+        return waited
+
+    async def aacquire(self, tokens: int, priority: int = 0) -> float:
+        """Async variant of ``acquire``."""
+        start = time.monotonic()
+        ticket = self._enqueue(priority)
+        try:
+            while True:
+                wait = self._try_take(ticket, tokens)
+                if wait == 0:
+                    break
+                await asyncio.sleep(self._queue_wait(wait))
+        except BaseException:
+            self._leave(ticket)
+            raise
+        waited = time.monotonic() - start
+        self._record_wait(waited)
+        return waited
+
+    def settle(self, estimated: int, actual: Optional[int]) -> None:
+        """Correct the token budget with a call's actual token usage."""
+        if actual is None:
+            return
+        with self._lock:
+            self.tokens.level -= actual - min(estimated, self.tokens.capacity)
+
+    def record_throttle(self) -> None:
+        """Count a call the provider throttled despite the limiter."""
+        with self._lock:
+            self.throttled += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue depth, wait time and throttling counters."""
+        with self._lock:
+            return {
+                "queue_depth": len(self._queue),
+                "max_queue_depth": self.max_queue_depth,
+                "acquired": self.acquired,
+                "mean_wait": round(self.total_wait / self.acquired, 3)
+                if self.acquired
+                else 0.0,
+                "max_wait": round(self.max_wait, 3),
+                "throttled": self.throttled,
+            }
+
+
+def is_throttling_error(exc: BaseException) -> bool:
+    """Whether an exception is a provider rate limit / throttling error."""
+    if getattr(exc, "status_code", None) == 429:
+        return True
+    response = getattr(exc, "response", None)
+    if isinstance(response, dict):
+        code = response.get("Error", {}).get("Code", "")
+        if code in ("ThrottlingException", "TooManyRequestsException"):
+            return True
+    name = type(exc).__name__
+    return "RateLimit" in name or "Throttl" in name
+
+
+def estimate_tokens(prompt: Any, completion_tokens: int) -> int:
+    """Rough token count of a call: prompt characters / 4 plus the completion."""
+    text = prompt if isinstance(prompt, str) else str(prompt)
+    return len(text) // 4 + completion_tokens
+
+
+def usage_tokens(response: Any) -> Optional[int]:
+    """Total tokens reported by a chat model response, if any."""
+    usage = getattr(response, "usage_metadata", None)
+    if usage and usage.get("total_tokens"):
+        return int(usage["total_tokens"])
+    return None
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Exponential backoff with full jitter for retry ``attempt`` (0-based)."""
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+class RateLimitedChatModel:
+    """
+    Chat model wrapper that queues calls on a ModelRateLimiter.
+
+    Throttling errors are retried up to ``max_retries`` times with
+    exponential backoff and full jitter; other errors propagate. Every other
+    attribute is delegated to the wrapped model.
+    """
+
+    def __init__(
+        self,
+        task: str,
+        llm: Any,
+        limiter: ModelRateLimiter,
+        priority: int = 0,
+        completion_tokens: int = 512,
+        max_retries: int = 5,
+        backoff_base: float = 1.0,
+        backoff_cap: float = 30.0,
+    ):
+        self.task = task
+        self.llm = llm
+        self.limiter = limiter
+        self.priority = priority
+        self.completion_tokens = completion_tokens
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.llm, name)
+
+    def _on_throttle(self, attempt: int, exc: BaseException) -> float:
+        """
+        Record a throttled call and return the backoff before retrying.
+
+        The backoff never outlasts the running request's deadline; when the
+        deadline has passed, the throttling error is raised instead.
+        """
+        self.limiter.record_throttle()
+        left = time_left()
+        if left <= 0:
+            raise exc
+        delay = min(backoff_delay(attempt, self.backoff_base, self.backoff_cap), left)
+        logger.warning(
+            f"LLM call throttled - task: {self.task}, model: {self.limiter.name}, "
+            f"attempt: {attempt + 1}, backoff: {delay:.2f}s, error: {exc}"
+        )
+        return delay
+
+    def invoke(self, prompt: Any, *args: Any, **kwargs: Any) -> Any:
+        """Wait for quota, then call the model, backing off when throttled."""
+        tokens = estimate_tokens(prompt, self.completion_tokens)
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire(tokens, self.priority)
+            try:
+                response = self.llm.invoke(prompt, *args, **kwargs)
+            except Exception as e:
+                if not is_throttling_error(e) or attempt == self.max_retries:
+                    raise
+                time.sleep(self._on_throttle(attempt, e))
+                continue
+            self.limiter.settle(tokens, usage_tokens(response))
+            return response
+
+    async def ainvoke(self, prompt: Any, *args: Any, **kwargs: Any) -> Any:
+        """Async variant of ``invoke``."""
+        tokens = estimate_tokens(prompt, self.completion_tokens)
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.aacquire(tokens, self.priority)
+            try:
+                response = await self.llm.ainvoke(prompt, *args, **kwargs)
+            except Exception as e:
+                if not is_throttling_error(e) or attempt == self.max_retries:
+                    raise
+                await asyncio.sleep(self._on_throttle(attempt, e))
+                continue
+            self.limiter.settle(tokens, usage_tokens(response))
+            return response
@@ -0,0 +1,124 @@
+"""
+Sync/async step drivers for the UMLS Mapping LangGraph-based Agent.
+Each graph node's logic is written once, as a generator that yields the I/O it
+needs (LLM calls, ontology searches, concurrent fan-outs) and receives the
+results. ``run_steps`` performs those steps with blocking calls and
+``arun_steps`` awaits their async variants, so the sync and async nodes share
+every ranking, validation, retry, widening and mappability decision and
+differ only in how I/O is done.
+"""
+
+from typing import Any, Callable, Dict, Generator, NamedTuple, Optional, Sequence
+
+from src.graph.concurrency import (
+    amap_concurrently,
+    amap_until,
+    map_concurrently,
+    map_until,
+)
+
+
+class Call(NamedTuple):
+    """One I/O step: a blocking function, its async variant and their arguments."""
+
+    func: Callable
+    afunc: Callable
+    args: tuple = ()
+    kwargs: Dict[str, Any] = {}
+
+
+class MapSteps(NamedTuple):
+    """
+    Run ``steps(item)`` for every item concurrently (see ``map_concurrently``).
+
+    With ``done`` set, the fan-out stops once ``done`` accepts the results
+    received so far (see ``map_until``). The step result is the list of
+    results, in input order (or completion order with ``done``).
+    """
+
+    steps: Callable[[Any], "Steps"]
+    items: Sequence
+    done: Optional[Callable[[list], bool]] = None
+    max_concurrency: Optional[int] = None
+
+
+# A node's logic: yields Call/MapSteps, receives their results, returns its value
+Steps = Generator[Any, Any, Any]
+
+
+def llm_call(llm, prompt, **kwargs) -> Call:
+    """Step invoking ``llm`` (``invoke`` or ``ainvoke``) on ``prompt``."""
+    return Call(llm.invoke, llm.ainvoke, (prompt,), kwargs)
+
+
+def _map_kwargs(step: MapSteps) -> Dict[str, Any]:
+    """Concurrency cap of a fan-out step (the mapping helpers' default if unset)."""
+    if step.max_concurrency is None:
+        return {}
+    return {"max_concurrency": step.max_concurrency}
+
+
+def _perform(step) -> Any:
+    """Perform one step with blocking calls."""
+    if isinstance(step, MapSteps):
+
+        def fn(item):
+            return run_steps(step.steps(item))
+
+        if step.done is None:
+            return map_concurrently(fn, step.items, **_map_kwargs(step))
+        return map_until(fn, step.items, step.done, **_map_kwargs(step))
+    return step.func(*step.args, **step.kwargs)
+
+
+async def _aperform(step) -> Any:
+    """Perform one step by awaiting the async variants."""
+    if isinstance(step, MapSteps):
+
+        async def afn(item):
+            return await arun_steps(step.steps(item))
+
+        if step.done is None:
+            return await amap_concurrently(afn, step.items, **_map_kwargs(step))
+        return await amap_until(afn, step.items, step.done, **_map_kwargs(step))
+    return await step.afunc(*step.args, **step.kwargs)
+
+
+def run_steps(steps: Steps) -> Any:
+    """
+    Drive ``steps`` to completion with blocking I/O.
+
+    A step's exception is raised inside the generator at its ``yield``, so
+    the node logic handles I/O failures as if it had made the call itself.
+
+    Returns:
+        The generator's return value
+    """
+    value: Any = None
+    error: Optional[Exception] = None
+    while True:
+        try:
+            step = steps.throw(error) if error is not None else steps.send(value)
+        except StopIteration as stop:
+            return stop.value
+        value, error = None, None
+        try:
+            value = _perform(step)
+        except Exception as e:
+            error = e
+
+
+async def arun_steps(steps: Steps) -> Any:
+    """Async variant of ``run_steps``."""
+    value: Any = None
+    error: Optional[Exception] = None
+    while True:
+        try:
+            step = steps.throw(error) if error is not None else steps.send(value)
+        except StopIteration as stop:
+            return stop.value
+        value, error = None, None
+        try:
+            value = await _aperform(step)
+        except Exception as e:
+            error = e
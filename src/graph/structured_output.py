@@ -0,0 +1,322 @@
+"""
+Structured LLM output for the UMLS Mapping LangGraph-based Agent.
+This module defines the JSON schemas of the extraction, ranking, validation,
+rewrite and fused mappability-plus-extraction outputs, the provider-native request options that make the model
+answer in them (OpenAI JSON schema response format, Bedrock/Anthropic forced
+tool call), the single parser every node uses to read them, and per-node
+parse statistics.
+"""
+
+import contextvars
+import functools
+import json
+import logging
+import os
+import re
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# Ask the provider for schema-conforming output; when off, the prompts' own
+# JSON instructions are relied on (the parser accepts both shapes)
+STRUCTURED_OUTPUT = os.getenv("STRUCTURED_OUTPUT", "true").lower() == "true"
+
+_TERMS = {
+    "type": "object",
+    "properties": {"terms": {"type": "array", "items": {"type": "string"}}},
+    "required": ["terms"],
+    "additionalProperties": False,
+}
+
+_RANKED_CANDIDATES = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {
+            "matched_code": {"type": "string"},
+            "matched_term": {"type": "string"},
+            "confidence": {"type": "string"},
+        },
+        "required": ["matched_code", "matched_term", "confidence"],
+        "additionalProperties": False,
+    },
+}
+
+_VALIDATION = {
+    "type": "object",
+    "properties": {
+        "best_match_code": {"type": "string"},
+        "best_match_term": {"type": "string"},
+        "confidence": {"type": "string"},
+    },
+    "required": ["best_match_code", "best_match_term", "confidence"],
+    "additionalProperties": False,
+}
+
+# Output schemas by name. Providers require an object at the top level, so
+# list outputs are wrapped in a single-property object that the parser unwraps.
+OUTPUT_SCHEMAS: Dict[str, Dict[str, Any]] = {
+    "extracted_terms": _TERMS,
+    "rewritten_terms": _TERMS,
+    "ranking": {
+        "type": "object",
+        "properties": {"rankings": _RANKED_CANDIDATES},
+        "required": ["rankings"],
+        "additionalProperties": False,
+    },
+    "batch_ranking": {
+        "type": "object",
+        "properties": {
+            "rankings": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "term": {"type": "string"},
+                        "ranked_candidates": _RANKED_CANDIDATES,
+                    },
+                    "required": ["term", "ranked_candidates"],
+                    "additionalProperties": False,
+                },
+            }
+        },
+        "required": ["rankings"],
+        "additionalProperties": False,
+    },
+    "validation": _VALIDATION,
+    "mappable_terms": {
+        "type": "object",
+        "properties": {
+            "is_mappable": {"type": "boolean"},
+            "terms": {"type": "array", "items": {"type": "string"}},
+        },
+        "required": ["is_mappable", "terms"],
+        "additionalProperties": False,
+    },
+}
+
+# Object key wrapping each list output
+_WRAPPER_KEYS = {
+    "extracted_terms": "terms",
+    "rewritten_terms": "terms",
+    "ranking": "rankings",
+    "batch_ranking": "rankings",
+}
+
+# Parse counters of the node currently running (see ``track_parse_stats``);
+# shared with the threads and tasks the node fans out to
+_parse_counts: contextvars.ContextVar[Optional[Dict[str, int]]] = (
+    contextvars.ContextVar("parse_counts", default=None)
+)
+_counts_lock = threading.Lock()
+
+
+def structured_output_kwargs(name: str, provider: str) -> Dict[str, Any]:
+    """
+    Build the provider's invoke kwargs requesting output in the named schema.
+
+    Nodes pass ``structured_output=<name>``; the provider client proxy
+    (``LazyChatModel``) translates it with this function.
+
+    Args:
+        name: Key of OUTPUT_SCHEMAS
+        provider: Active LLM provider ("openai" or "bedrock")
+
+    Returns:
+        Dict[str, Any]: Keyword arguments for ``llm.invoke``/``ainvoke``
+        ({} when STRUCTURED_OUTPUT is disabled)
+    """
+    if not STRUCTURED_OUTPUT:
+        return {}
+    schema = OUTPUT_SCHEMAS[name]
+    if provider == "bedrock":
+        return {
+            "tools": [
+                {
+                    "name": name,
+                    "description": f"Return the {name.replace('_', ' ')} result",
+                    "input_schema": schema,
+                }
+            ],
+            "tool_choice": {"type": "tool", "name": name},
+        }
+    return {
+        "response_format": {
+            "type": "json_schema",
+            "json_schema": {"name": name, "schema": schema, "strict": True},
+        }
+    }
+
+
+def response_text(response: Any) -> str:
+    """
+    Return the text of a chat model response.
+
+    Forced tool calls carry their output in ``tool_calls`` rather than in
+    ``content``; their arguments are returned as JSON text so cached and
+    live responses read the same.
+    """
+    tool_calls = getattr(response, "tool_calls", None)
+    if tool_calls:
+        return json.dumps(tool_calls[0].get("args", {}))
+    content = getattr(response, "content", response)
+    if isinstance(content, list):
+        return "".join(
+            block.get("text", "") if isinstance(block, dict) else str(block)
+            for block in content
+        )
+    return str(content)
+
+
+def decode_structured(raw: str, name: str) -> Any:
+    """
+    Decode output text in the named schema without recording statistics.
+
+    Raises:
+        ValueError: If the output is not valid JSON of the expected shape
+    """
+    return _parse(raw, name)
+
+
+def conforms_to_schema(raw: str, name: str) -> bool:
+    """
+    Whether output text decodes in the named schema, with its required keys.
+
+    Used to keep malformed answers out of the LLM response cache.
+    """
+    try:
+        parsed = _parse(raw, name)
+    except ValueError:
+        return False
+    if isinstance(parsed, dict) and name not in _WRAPPER_KEYS:
+        return all(key in parsed for key in OUTPUT_SCHEMAS[name]["required"])
+    return True
+
+
+def parse_structured(response: Any, name: str) -> Any:
+    """
+    Parse a response in the named output schema.
+
+    Schema-conforming objects are unwrapped to the value the nodes use
+    (a list for list outputs, a term-keyed dict for batched rankings). Bare
+    JSON in the prompts' own formats, optionally fenced in Markdown, is also
+    accepted, so responses from before structured output keep working.
+
+    Args:
+        response: Chat model response (or its text)
+        name: Key of OUTPUT_SCHEMAS
+
+    Returns:
+        The parsed output
+
+    Raises:
+        ValueError: If the output is not valid JSON of the expected shape
+    """
+    _count("calls")
+    try:
+        return _parse(response_text(response), name)
+    except ValueError:
+        _count("parse_failures")
+        raise
+
+
+def _parse(raw: str, name: str) -> Any:
+    """Decode and unwrap one output (see ``parse_structured``)."""
+    cleaned = re.sub(
+        r"```(?:json)?\s*\n?(.*?)\n?```", r"\1", raw.strip(), flags=re.DOTALL
+    )
+    # Some models prefix bare JSON with its language tag
+    cleaned = re.sub(r"^json\s*\n", "", cleaned.strip())
+    parsed = json.loads(cleaned)  # JSONDecodeError is a ValueError
+
+    key = _WRAPPER_KEYS.get(name)
+    if key and isinstance(parsed, dict) and set(parsed) == {key}:
+        parsed = parsed[key]
+    if key == "terms" and isinstance(parsed, str):
+        parsed = [parsed]
+
+    if name == "batch_ranking":
+        if isinstance(parsed, list):
+            try:
+                parsed = {e["term"]: e["ranked_candidates"] for e in parsed}
+            except (KeyError, TypeError) as e:
+                raise ValueError(f"malformed batched ranking entry: {e}") from e
+        expected: type = dict
+    else:
+        expected = list if key else dict
+    if not isinstance(parsed, expected):
+        raise ValueError(
+            f"expected a JSON {expected.__name__}, got {type(parsed).__name__}"
+        )
+    return parsed
+
+
+def _count(field: str) -> None:
+    """Increment a parse counter of the running node, if it is tracked."""
+    counts = _parse_counts.get()
+    if counts is not None:
+        with _counts_lock:
+            counts[field] += 1
+
+
+def record_retry() -> None:
+    """Count an LLM call re-issued by the running node."""
+    _count("retries")
+
+
+@contextmanager
+def track_parse_stats() -> Iterator[Dict[str, int]]:
+    """
+    Collect parse statistics of the code run inside the block.
+
+    Calls made on threads by ``map_concurrently`` and on tasks by
+    ``amap_concurrently`` are included, as both run in a copy of the
+    caller's context.
+    """
+    counts = {"calls": 0, "parse_failures": 0, "retries": 0}
+    token = _parse_counts.set(counts)
+    try:
+        yield counts
+    finally:
+        _parse_counts.reset(token)
+
+
+def _with_parse_stats(state: Any, node: str, counts: Dict[str, int]) -> Any:
+    """Add a node run's parse counters to the ``parse_stats`` of its state."""
+    if not counts["calls"] or not isinstance(state, dict):
+        return state
+    parse_stats = dict(state.get("parse_stats", {}))
+    previous = parse_stats.get(node, {})
+    parse_stats[node] = {k: previous.get(k, 0) + v for k, v in counts.items()}
+    if counts["parse_failures"] or counts["retries"]:
+        logger.info(
+            f"Structured output parse stats - node: {node}, "
+            f"parse_failures: {counts['parse_failures']}, retries: {counts['retries']}"
+        )
+    return {**state, "parse_stats": parse_stats}
+
+
+def recording_parse_stats(func: Callable, node: str) -> Callable:
+    """Wrap a sync node so its parse counters are recorded in ``parse_stats``."""
+
+    @functools.wraps(func)
+    def wrapper(state):
+        with track_parse_stats() as counts:
+            result = func(state)
+        return _with_parse_stats(result, node, counts)
+
+    return wrapper
+
+
+def arecording_parse_stats(afunc: Callable, node: str) -> Callable:
+    """Async variant of ``recording_parse_stats``."""
+
+    @functools.wraps(afunc)
+    async def wrapper(state):
+        with track_parse_stats() as counts:
+            result = await afunc(state)
+        return _with_parse_stats(result, node, counts)
+
+    return wrapper
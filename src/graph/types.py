@@ -4,7 +4,18 @@ This module defines the TypedDict classes that represent the state and data flow
 throughout the medical term mapping workflow.
 """
 
-from typing import Any, Dict, List, TypedDict
+from typing import Annotated, Any, Dict, List, TypedDict
+
+
+def merge_term_results(
+    left: Dict[int, Dict[str, Any]], right: Dict[int, Dict[str, Any]]
+) -> Dict[int, Dict[str, Any]]:
+    """
+    Reducer of ``term_results``: combine per-term outcomes keyed by term index.
+
+    Merging is idempotent, so nodes returning the whole state leave it as is.
+    """
+    return {**(left or {}), **(right or {})}
 
 
 class MappingState(TypedDict, total=False):
@@ -17,18 +28,26 @@ class MappingState(TypedDict, total=False):
     text: str  # Original complete survey question text
     field_type: str  # Type of survey field (radio, checkbox, short, etc.)
     is_mappable: bool  # Whether the question can be mapped to medical ontologies
+    deadline: float  # Epoch seconds by which the request must answer (latency budget)
+    partial: bool  # Some mappings skipped stages to meet the deadline
 
     # === Extracted Medical Terms (Term Extraction Node) ===
     extracted_terms: List[str]  # List of medical terms extracted from the survey text
+    prefetched_terms: List[str]  # Phrases speculatively searched before extraction
 
     # === Search UMLS Ontology (Search Node) ===
     search_term: str  # Individual term being searched
     ontology: str  # Target ontology (e.g., "HPO" for Human Phenotype Ontology)
     umls_results: List[Dict[str, Any]]  # Raw results from UMLS API
     umls_mappings: List[Dict[str, Any]]  # Processed mappings with candidates
+    candidate_pages: Dict[str, int]  # Search result pages fetched per term
     retry_count: int  # Number of retry attempts for term rewriting
-    mappability_retry_count: int  # Number of retry attempts for mappability assessment
+    mappability_calls: int  # LLM samples issued for the mappability vote
     history_rewritten_terms: List[str]  # History of terms that have been rewritten
+    term_order: List[str]  # All of the question's terms in extraction order, rewrites in place
+    seen_candidate_codes: List[str]  # Candidate codes fetched in any retry round
+    converged: bool  # Last retry round found no new candidates (stop retrying)
+    retry_memo: Dict[str, Dict[str, Any]]  # Rank/validate results reused across retry rounds
 
     # === Candidate Alternatives (Ranking Node) ===
     original: str  # Original term being processed
@@ -43,6 +62,13 @@ class MappingState(TypedDict, total=False):
     confidence: float  # Confidence score for the best match (0.0 to 1.0)
     validated_mappings: List[Dict[str, Any]]  # Final validated mapping results
     preserved_mappings: List[Dict[str, Any]]  # High-confidence mappings preserved during retry
+    exact_mappings: List[Dict[str, Any]]  # Exact label/synonym matches that skip the LLM
+
+    # === Per-Term Fan-Out (one pipeline run per extracted term) ===
+    term_index: int  # Position of a term state's term among the extracted terms
+    term_results: Annotated[
+        Dict[int, Dict[str, Any]], merge_term_results
+    ]  # Outcome of each term's pipeline, keyed by term index
 
     # === Refinement Related Fields (Ancestor-based refinement) ===
     original_mapping: Dict[str, Any]  # Original mapping before refinement
@@ -53,4 +79,5 @@ class MappingState(TypedDict, total=False):
 
     # === Other Optional Records ===
     llm_response: Any  # Raw LLM response for debugging
+    parse_stats: Dict[str, Dict[str, int]]  # Structured output calls, parse failures and retries per node
     mapped_results: List[dict]  # Final mapped results for output
@@ -11,6 +11,7 @@ and invokes the LangGraph-based ontology mapping workflow.
 
 import json
 import logging
+import os
 import time
 from typing import Any, cast
 
@@ -18,6 +19,15 @@ from typing import Any, cast
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Create the graph's LLM clients during the Lambda init phase instead of on
+# the first /map request (costs init time on health-check-only containers)
+LLM_PREWARM = os.getenv("LLM_PREWARM", "false").lower() == "true"
+
+if LLM_PREWARM:
+    from src.graph.agent_config import prewarm_llm_clients
+
+    logger.info(f"LLM clients prewarmed - created: {prewarm_llm_clients()}")
+
 
 def lambda_handler(event: dict, context: Any) -> dict:
     """
@@ -65,7 +75,7 @@ def lambda_handler(event: dict, context: Any) -> dict:
         if path == "/health" and http_method == "GET":
             return _handle_health(headers, request_id)
         elif path == "/map" and http_method == "POST":
-            return _handle_map(event, headers, request_id, start_time)
+            return _handle_map(event, headers, request_id, start_time, context)
         else:
             logger.warning(
                 f"Unknown route - method: {http_method}, path: {path}, "
@@ -108,7 +118,9 @@ def _handle_health(headers: dict, request_id: str) -> dict:
     }
 
 
-def _handle_map(event: dict, headers: dict, request_id: str, start_time: float) -> dict:
+def _handle_map(
+    event: dict, headers: dict, request_id: str, start_time: float, context: Any = None
+) -> dict:
     """
     Handle the /map endpoint for ontology mapping.
 
@@ -120,12 +132,26 @@ def _handle_map(event: dict, headers: dict, request_id: str, start_time: float)
         headers (dict): Response headers to include.
         request_id (str): Lambda request ID for logging.
         start_time (float): Request start timestamp.
+        context (Any): Lambda context object, used to cap the latency budget
+            at the invocation's remaining time.
 
     Returns:
         dict: API Gateway response with mapping results or error.
     """
     # Import here to avoid cold start overhead on health checks
+    from src.graph.agent_config import (
+        get_cascade_stats,
+        get_failover_stats,
+        get_llm_cache,
+        get_rate_limit_stats,
+    )
     from src.graph.builder import build_umls_mapper_graph
+    from src.graph.deadline import request_deadline
+    from src.ontology.client import (
+        get_search_backend,
+        get_search_cache,
+        search_flights,
+    )
 
     # Parse request body
     try:
@@ -193,12 +219,19 @@ def _handle_map(event: dict, headers: dict, request_id: str, start_time: float)
     # Import MappingState for type casting
     from src.graph.types import MappingState
 
+    # Nodes degrade to best-so-far results as the latency budget runs out
+    remaining = (
+        context.get_remaining_time_in_millis() / 1000.0
+        if hasattr(context, "get_remaining_time_in_millis")
+        else None
+    )
     initial_state = cast(
         MappingState,
         {
             "text": text,
             "field_type": field_type,
             "ontology": ontology,
+            "deadline": request_deadline(start_time, remaining=remaining),
         },
     )
 
@@ -213,13 +246,44 @@ def _handle_map(event: dict, headers: dict, request_id: str, start_time: float)
         is_mappable = result_state.get("is_mappable", False)
         validated_count = len(result_state.get("validated_mappings", []))
         retry_count = result_state.get("retry_count", 0)
+        partial = result_state.get("partial", False)
         
         logger.info(
             f"Graph completed - request_id: {request_id}, "
             f"is_mappable: {is_mappable}, validated_mappings: {validated_count}, "
-            f"retry_count: {retry_count}, graph_time: {graph_invoke_time:.2f}s, "
+            f"retry_count: {retry_count}, partial: {partial}, "
+            f"graph_time: {graph_invoke_time:.2f}s, "
             f"total_time: {total_time:.2f}s"
         )
+        logger.info(
+            f"Search cache stats - request_id: {request_id}, "
+            f"cache: {get_search_cache().stats()}, flights: {search_flights.stats()}"
+        )
+        llm_cache = get_llm_cache()
+        if llm_cache is not None:
+            logger.info(
+                f"LLM cache stats - request_id: {request_id}, {llm_cache.stats()}"
+            )
+        rate_limit_stats = get_rate_limit_stats()
+        if rate_limit_stats:
+            logger.info(
+                f"LLM rate limit stats - request_id: {request_id}, {rate_limit_stats}"
+            )
+        failover_stats = get_failover_stats()
+        if failover_stats:
+            logger.info(
+                f"LLM failover stats - request_id: {request_id}, {failover_stats}"
+            )
+        cascade_stats = get_cascade_stats()
+        if cascade_stats:
+            logger.info(
+                f"Model cascade stats - request_id: {request_id}, {cascade_stats}"
+            )
+        backend = get_search_backend()
+        if hasattr(backend, "stats"):
+            logger.info(
+                f"Ontology backend stats - request_id: {request_id}, {backend.stats()}"
+            )
     except Exception as e:
         elapsed = time.time() - start_time
         logger.exception(
@@ -264,6 +328,7 @@ def _handle_map(event: dict, headers: dict, request_id: str, start_time: float)
     response_body = {
         "input": initial_state,
         "validated_mappings": normalized,
+        "partial": result_state.get("partial", False),
         "raw_state": result_state,
     }
 
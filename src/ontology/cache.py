@@ -0,0 +1,180 @@
+"""
+Ontology search result cache for the UMLS Mapping LangGraph-based Agent.
+This module provides a two-tier (in-memory LRU + optional SQLite) cache of
+search results, keyed by normalized term, ontology, limit and page, so repeated
+searches across requests, retry loops and warm Lambda invocations are free.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.ontology.hpo_release import normalize_text
+
+logger = logging.getLogger(__name__)
+
+CacheKey = Tuple[str, str, int, int]
+
+
+class SearchCache:
+    """
+    LRU + TTL cache of ontology search results with an optional on-disk tier.
+
+    Entries are scoped to a namespace describing the backend (base URL or
+    release version). Opening a disk cache whose stored namespace differs from
+    the current one discards its entries, so a changed ontology source never
+    serves stale candidates.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        max_size: int = 2048,
+        ttl: float = 86400.0,
+        path: str = "",
+    ):
+        self.namespace = namespace
+        self.max_size = max_size
+        self.ttl = ttl
+        self.path = path
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._memory: "OrderedDict[CacheKey, Tuple[float, List[Dict[str, Any]]]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+
+        if path:
+            try:
+                self._db = self._open_db(path)
+            except sqlite3.Error as e:
+                logger.error(f"Search cache disk tier disabled - path: {path}, error: {e}")
+                self._db = None
+
+    def _open_db(self, path: str) -> sqlite3.Connection:
+        """Open the SQLite tier and drop its entries if the namespace changed."""
+        db = sqlite3.connect(path, check_same_thread=False)
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS search_cache "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        row = db.execute("SELECT value FROM meta WHERE name = 'namespace'").fetchone()
+        if row is None or row[0] != self.namespace:
+            if row is not None:
+                logger.info(
+                    f"Search cache invalidated - path: {path}, "
+                    f"old_namespace: {row[0]}, new_namespace: {self.namespace}"
+                )
+            db.execute("DELETE FROM search_cache")
+            db.execute(
+                "INSERT OR REPLACE INTO meta (name, value) VALUES ('namespace', ?)",
+                (self.namespace,),
+            )
+        db.execute("DELETE FROM search_cache WHERE expires_at < ?", (time.time(),))
+        db.commit()
+        return db
+
+    @staticmethod
+    def make_key(term: str, ontology: str, limit: int, page: int = 0) -> CacheKey:
+        """Build the cache key for a search; terms are case/punctuation-normalized."""
+        return (normalize_text(term), (ontology or "").upper(), limit, page)
+
+    def get(
+        self, term: str, ontology: str, limit: int, page: int = 0
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Look up cached candidates.
+
+        Returns:
+            The cached candidate list, or None on a miss or expired entry
+        """
+        key = self.make_key(term, ontology, limit, page)
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at >= now:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return [dict(c) for c in value]
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM search_cache WHERE key = ?",
+                    (json.dumps(key),),
+                ).fetchone()
+                if row is not None and row[1] >= now:
+                    value = json.loads(row[0])
+                    self._remember(key, row[1], value)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return [dict(c) for c in value]
+
+            self.misses += 1
+            return None
+
+    def set(
+        self,
+        term: str,
+        ontology: str,
+        limit: int,
+        candidates: List[Dict[str, Any]],
+        page: int = 0,
+    ) -> None:
+        """Store candidates for a search in every enabled tier."""
+        key = self.make_key(term, ontology, limit, page)
+        expires_at = time.time() + self.ttl
+
+        with self._lock:
+            self._remember(key, expires_at, candidates)
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO search_cache (key, value, expires_at) "
+                        "VALUES (?, ?, ?)",
+                        (json.dumps(key), json.dumps(candidates), expires_at),
+                    )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    logger.warning(f"Search cache disk write failed - error: {e}")
+
+    def _remember(
+        self, key: CacheKey, expires_at: float, value: List[Dict[str, Any]]
+    ) -> None:
+        """Insert into the memory tier, evicting least recently used entries."""
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop all entries from every tier."""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM search_cache")
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the current memory tier size."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "size": len(self._memory),
+        }
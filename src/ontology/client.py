@@ -0,0 +1,560 @@
+"""
+Ontology search client for the UMLS Mapping LangGraph-based Agent.
+This module wraps the ontology.jax.org search API behind a pooled HTTP session
+(and a pooled async client for the async graph path), selects the configured
+search backend (remote API or local HPO index), and provides a cached,
+concurrent fetch layer used by the UMLS fetch node.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Protocol, Set
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.ontology.cache import SearchCache
+from src.ontology.singleflight import SingleFlight
+
+# UMLS API Base URL for ontology queries
+API_BASE_URL = os.getenv("UMLS_API_BASE_URL", "https://ontology.jax.org/api/hp")
+
+# Search backend: "api" (ontology.jax.org, default), "local" (in-process
+# lexical index) or "ngram" (in-process character n-gram similarity)
+ONTOLOGY_BACKEND = os.getenv("ONTOLOGY_BACKEND", "api").lower()
+
+# HPO release file (hp.json or hp.obo) used by the in-process backends
+HPO_RELEASE_PATH = os.getenv("HPO_RELEASE_PATH", "")
+
+# Extra n-gram similarity candidates appended to each term's search results
+# (0 disables; requires HPO_RELEASE_PATH)
+NGRAM_CANDIDATES = int(os.getenv("NGRAM_CANDIDATES", "0"))
+
+# Upstream ontology release identifier; changing it invalidates cached searches
+ONTOLOGY_RELEASE_VERSION = os.getenv("ONTOLOGY_RELEASE_VERSION", "")
+
+# Search result cache: in-memory LRU size, entry TTL (seconds), and optional
+# SQLite file for an on-disk tier (empty = memory only)
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "2048"))
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "86400"))
+SEARCH_CACHE_PATH = os.getenv("SEARCH_CACHE_PATH", "")
+
+# Wrap the remote API with adaptive timeouts, hedging and a circuit breaker
+# (falls back to the local index when HPO_RELEASE_PATH is set)
+ONTOLOGY_RESILIENCE = os.getenv("ONTOLOGY_RESILIENCE", "true").lower() == "true"
+
+# Per-request timeout (seconds) for a single search call
+REQUEST_TIMEOUT = 10
+
+# Maximum number of term searches in flight at once (process-wide)
+FETCH_CONCURRENCY = int(os.getenv("ONTOLOGY_FETCH_CONCURRENCY", "8"))
+
+logger = logging.getLogger(__name__)
+
+
+class OntologySearchError(Exception):
+    """Raised when the ontology search API returns a non-200 response."""
+
+
+class FallbackCandidates(list):
+    """Candidates served by a fallback backend; never written to the search cache."""
+
+
+class SearchBackend(Protocol):
+    """
+    Anything that can answer ontology search queries in candidate shape.
+
+    Backends may also provide an ``asearch`` coroutine with the same signature;
+    the async fetch path uses it and otherwise runs ``search`` in a thread.
+    """
+
+    # Identifies the data source (URL/release) for search cache invalidation
+    cache_namespace: str
+
+    def search(
+        self, term: str, limit: int = 5, page: int = 0
+    ) -> List[Dict[str, Any]]: ...
+
+
+def to_candidate(result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert a raw ontology search hit into the candidate shape used by the graph.
+
+    Args:
+        result: A single entry of the search API's "terms" list
+
+    Returns:
+        Dict with code, term, description, synonyms, exact_synonyms and xrefs keys
+    """
+    return {
+        "code": result.get("id"),
+        "term": result.get("name"),
+        "description": result.get("definition"),
+        "synonyms": result.get("synonyms", []),
+        # Search hits carry no synonym scope, so none are known to be EXACT:
+        # with this backend the exact-match fast path matches labels only
+        "exact_synonyms": result.get("exact_synonyms", []),
+        "xrefs": result.get("xrefs", []),
+    }
+
+
+async def _aclose_stale(client: httpx.AsyncClient) -> None:
+    """Close an earlier event loop's async client, releasing its connections."""
+    try:
+        await client.aclose()
+    except Exception as e:
+        # Connections bound to a closed loop cannot shut down cleanly
+        logger.debug(f"Stale async client close failed - error: {e}")
+
+
+class OntologyAPIClient:
+    """
+    Search client for the ontology.jax.org API.
+
+    A single keep-alive session is shared by all callers so that concurrent
+    searches reuse pooled connections instead of opening one per term.
+    """
+
+    def __init__(
+        self,
+        base_url: str = API_BASE_URL,
+        timeout: float = REQUEST_TIMEOUT,
+        pool_size: int = FETCH_CONCURRENCY,
+    ):
+        self.base_url = base_url
+        self.search_url = base_url + "/search"
+        self.cache_namespace = f"api:{base_url}:{ONTOLOGY_RELEASE_VERSION}"
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.pool_size = pool_size
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._async_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._closing: Set[asyncio.Task] = set()
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        """
+        Return the pooled async client of the running event loop.
+
+        A client left by an earlier loop is closed in the background.
+        """
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            if self._async_client is not None:
+                task = loop.create_task(_aclose_stale(self._async_client))
+                self._closing.add(task)
+                task.add_done_callback(self._closing.discard)
+            self._async_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.pool_size,
+                    max_keepalive_connections=self.pool_size,
+                ),
+                timeout=self.timeout,
+            )
+            self._async_loop = loop
+        return self._async_client
+
+    def search(
+        self,
+        term: str,
+        limit: int = 5,
+        page: int = 0,
+        timeout: Optional[float] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Search the ontology for candidate terms.
+
+        Args:
+            term: Free-text query
+            limit: Maximum number of hits to return
+            page: Result page to fetch
+            timeout: Request timeout in seconds (defaults to the client timeout)
+
+        Returns:
+            List of candidate dicts (see ``to_candidate``)
+
+        Raises:
+            OntologySearchError: If the API responds with a non-200 status
+            requests.exceptions.RequestException: On transport errors/timeouts
+        """
+        params = {"q": term, "page": page, "limit": limit}
+        resp = self.session.get(
+            self.search_url, params=params, timeout=timeout or self.timeout
+        )
+        logger.info(f"UMLS API query - term: {term}, status: {resp.status_code}")
+
+        return self._parse_response(term, resp)
+
+    async def asearch(
+        self,
+        term: str,
+        limit: int = 5,
+        page: int = 0,
+        timeout: Optional[float] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Async variant of ``search`` over a pooled ``httpx.AsyncClient``.
+
+        Raises:
+            OntologySearchError: If the API responds with a non-200 status
+            httpx.HTTPError: On transport errors/timeouts
+        """
+        params = {"q": term, "page": page, "limit": limit}
+        resp = await self._get_async_client().get(
+            self.search_url, params=params, timeout=timeout or self.timeout
+        )
+        logger.info(f"UMLS API query - term: {term}, status: {resp.status_code}")
+        return self._parse_response(term, resp)
+
+    def _parse_response(self, term: str, resp: Any) -> List[Dict[str, Any]]:
+        """Turn a requests/httpx search response into candidates."""
+        if resp.status_code != 200:
+            raise OntologySearchError(
+                f"status: {resp.status_code}, response: {resp.text[:200]}"
+            )
+
+        try:
+            results = resp.json().get("terms", [])
+        except Exception as e:
+            logger.error(
+                f"UMLS API JSON parse error - term: {term}, error: {e}, "
+                f"response_preview: {resp.text[:200]}"
+            )
+            results = []
+
+        return [to_candidate(r) for r in results]
+
+
+_backend: Optional[SearchBackend] = None
+_ngram_retriever: Optional[Any] = None
+_hierarchy: Optional[Any] = None
+_cache: Optional[SearchCache] = None
+_executor: Optional[ThreadPoolExecutor] = None
+_lock = threading.RLock()
+
+# Coalesces identical searches that are in flight at the same time
+search_flights = SingleFlight()
+
+
+def _build_search_backend() -> SearchBackend:
+    """
+    Build the search backend selected by ONTOLOGY_BACKEND.
+
+    Returns:
+        SearchBackend: The remote API client or a local HPO index
+
+    Raises:
+        ValueError: If the backend is unsupported or the local release is missing
+    """
+    if ONTOLOGY_BACKEND == "api":
+        if not ONTOLOGY_RESILIENCE:
+            return OntologyAPIClient()
+        from src.ontology.resilience import ResilientSearchClient
+
+        fallback = None
+        if HPO_RELEASE_PATH:
+            from src.ontology.local_index import LocalHPOIndex
+
+            fallback = LocalHPOIndex.from_release(HPO_RELEASE_PATH)
+        return ResilientSearchClient(OntologyAPIClient(), fallback=fallback)
+    elif ONTOLOGY_BACKEND in ("local", "ngram"):
+        if not HPO_RELEASE_PATH:
+            raise ValueError(
+                f"ONTOLOGY_BACKEND={ONTOLOGY_BACKEND} requires HPO_RELEASE_PATH."
+            )
+        if ONTOLOGY_BACKEND == "ngram":
+            return get_ngram_retriever()
+        from src.ontology.local_index import LocalHPOIndex
+
+        return LocalHPOIndex.from_release(HPO_RELEASE_PATH)
+    else:
+        raise ValueError(
+            f"Unsupported ONTOLOGY_BACKEND: {ONTOLOGY_BACKEND}. "
+            "Use 'api', 'local' or 'ngram'."
+        )
+
+
+def get_search_backend() -> SearchBackend:
+    """Return the process-wide search backend, creating it on first use."""
+    global _backend
+    if _backend is None:
+        with _lock:
+            if _backend is None:
+                _backend = _build_search_backend()
+    return _backend
+
+
+def get_ngram_retriever():
+    """Return the process-wide n-gram retriever, building it on first use."""
+    global _ngram_retriever
+    if _ngram_retriever is None:
+        with _lock:
+            if _ngram_retriever is None:
+                from src.ontology.ngram_retriever import NgramRetriever
+
+                _ngram_retriever = NgramRetriever.from_release(HPO_RELEASE_PATH)
+    return _ngram_retriever
+
+
+def get_ontology_hierarchy():
+    """
+    Return the process-wide is_a hierarchy of the HPO release, building it on first use.
+
+    Raises:
+        ValueError: If HPO_RELEASE_PATH is not configured
+    """
+    global _hierarchy
+    if _hierarchy is None:
+        if not HPO_RELEASE_PATH:
+            raise ValueError("The ontology hierarchy requires HPO_RELEASE_PATH.")
+        with _lock:
+            if _hierarchy is None:
+                from src.ontology.hierarchy import OntologyHierarchy
+
+                _hierarchy = OntologyHierarchy.from_release(HPO_RELEASE_PATH)
+    return _hierarchy
+
+
+def get_search_cache() -> SearchCache:
+    """Return the process-wide search result cache for the active backend."""
+    global _cache
+    if _cache is None:
+        backend = get_search_backend()
+        with _lock:
+            if _cache is None:
+                _cache = SearchCache(
+                    namespace=backend.cache_namespace,
+                    max_size=SEARCH_CACHE_SIZE,
+                    ttl=SEARCH_CACHE_TTL,
+                    path=SEARCH_CACHE_PATH,
+                )
+    return _cache
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Return the process-wide executor that bounds concurrent term searches."""
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=FETCH_CONCURRENCY, thread_name_prefix="ontology-fetch"
+                )
+    return _executor
+
+
+def _search_and_cache(
+    term: str, limit: int, ontology: str, page: int = 0
+) -> List[Dict[str, Any]]:
+    """Query the backend and store a successful result in the search cache."""
+    candidates = get_search_backend().search(term, limit=limit, page=page)
+    if not isinstance(candidates, FallbackCandidates):
+        get_search_cache().set(term, ontology, limit, candidates, page=page)
+    return candidates
+
+
+def _fetch_one(term: str, limit: int, ontology: str, page: int = 0) -> Dict[str, Any]:
+    """Search a single term, turning any failure into an empty candidate list."""
+    try:
+        cache = get_search_cache()
+        candidates = cache.get(term, ontology, limit, page)
+        if candidates is None:
+            key = SearchCache.make_key(term, ontology, limit, page)
+            candidates = search_flights.do(
+                key, lambda: _search_and_cache(term, limit, ontology, page)
+            )
+        else:
+            logger.debug(f"Search cache hit - term: {term}")
+    except OntologySearchError as e:
+        logger.error(f"UMLS API error - term: {term}, {e}")
+        return {"original": term, "candidates": []}
+    except requests.exceptions.Timeout:
+        logger.error(f"UMLS API timeout - term: {term}, timeout: {REQUEST_TIMEOUT}s")
+        return {"original": term, "candidates": []}
+    except requests.exceptions.RequestException as e:
+        logger.error(
+            f"UMLS API request failed - term: {term}, error: {type(e).__name__}: {e}"
+        )
+        return {"original": term, "candidates": []}
+    except Exception as e:
+        logger.error(f"Unexpected error fetching UMLS terms - term: {term}, error: {e}")
+        return {"original": term, "candidates": []}
+
+    return _found(term, page, candidates)
+
+
+def _found(term: str, page: int, candidates: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Log and wrap a successful search result."""
+    logger.info(
+        f"UMLS candidates found - term: {term}, page: {page}, count: {len(candidates)}, "
+        f"top_2: {[c.get('code') for c in candidates[:2]]}"
+    )
+    return {"original": term, "candidates": candidates}
+
+
+async def _backend_asearch(
+    term: str, limit: int, page: int
+) -> List[Dict[str, Any]]:
+    """Search the backend without blocking the event loop."""
+    backend = get_search_backend()
+    if hasattr(backend, "asearch"):
+        return await backend.asearch(term, limit=limit, page=page)
+    # In-process indexes are CPU-bound; keep them off the event loop
+    return await asyncio.to_thread(backend.search, term, limit=limit, page=page)
+
+
+async def _asearch_and_cache(
+    term: str, limit: int, ontology: str, page: int = 0
+) -> List[Dict[str, Any]]:
+    """Async variant of ``_search_and_cache``."""
+    candidates = await _backend_asearch(term, limit, page)
+    if not isinstance(candidates, FallbackCandidates):
+        get_search_cache().set(term, ontology, limit, candidates, page=page)
+    return candidates
+
+
+async def _afetch_one(
+    term: str, limit: int, ontology: str, page: int = 0
+) -> Dict[str, Any]:
+    """Async variant of ``_fetch_one``; failures give an empty candidate list."""
+    try:
+        cache = get_search_cache()
+        candidates = cache.get(term, ontology, limit, page)
+        if candidates is None:
+            key = SearchCache.make_key(term, ontology, limit, page)
+            candidates = await search_flights.ado(
+                key, lambda: _asearch_and_cache(term, limit, ontology, page)
+            )
+        else:
+            logger.debug(f"Search cache hit - term: {term}")
+    except OntologySearchError as e:
+        logger.error(f"UMLS API error - term: {term}, {e}")
+        return {"original": term, "candidates": []}
+    except (httpx.TimeoutException, requests.exceptions.Timeout):
+        logger.error(f"UMLS API timeout - term: {term}, timeout: {REQUEST_TIMEOUT}s")
+        return {"original": term, "candidates": []}
+    except (httpx.HTTPError, requests.exceptions.RequestException) as e:
+        logger.error(
+            f"UMLS API request failed - term: {term}, error: {type(e).__name__}: {e}"
+        )
+        return {"original": term, "candidates": []}
+    except Exception as e:
+        logger.error(f"Unexpected error fetching UMLS terms - term: {term}, error: {e}")
+        return {"original": term, "candidates": []}
+
+    return _found(term, page, candidates)
+
+
+def warm_search_cache(term: str, limit: int = 5, ontology: str = "HPO") -> None:
+    """
+    Make sure a search result for ``term`` is cached, without returning it.
+
+    Goes through the same cache and single-flight path as real fetches, so a
+    real search for the same term issued meanwhile waits for this one.
+    """
+    _fetch_one(term, limit, ontology)
+
+
+async def awarm_search_cache(term: str, limit: int = 5, ontology: str = "HPO") -> None:
+    """Async variant of ``warm_search_cache``, on the async single-flight path."""
+    await _afetch_one(term, limit, ontology)
+
+
+def _add_ngram_candidates(results: List[Dict[str, Any]], k: int) -> None:
+    """
+    Append up to ``k`` n-gram similarity candidates to each entry, in place.
+
+    All terms are scored in one vectorized call. Codes already present in an
+    entry's candidates are skipped, so primary search results keep their order.
+    """
+    try:
+        batch = get_ngram_retriever().search_batch(
+            [entry["original"] for entry in results], limit=k
+        )
+    except Exception as e:
+        logger.warning(f"N-gram candidate retrieval failed - error: {e}")
+        return
+
+    for entry, extra in zip(results, batch):
+        seen = {c.get("code") for c in entry["candidates"]}
+        added = [c for c in extra if c["code"] not in seen]
+        if added:
+            entry["candidates"] = entry["candidates"] + added
+            logger.debug(
+                f"N-gram candidates added - term: {entry['original']}, "
+                f"codes: {[c['code'] for c in added]}"
+            )
+
+
+def fetch_candidates(
+    terms: List[str], limit: int = 5, ontology: str = "HPO", page: int = 0
+) -> List[Dict[str, Any]]:
+    """
+    Search all terms concurrently and collect their candidates.
+
+    Searches run on a shared, bounded thread pool over one keep-alive session.
+    Each one checks the search cache first, and identical searches already in
+    flight (from this or a concurrent request) are awaited, not repeated. Results
+    are returned in the same order as ``terms``; a term whose search fails gets
+    an empty candidate list and is not cached. When NGRAM_CANDIDATES is set,
+    n-gram similarity candidates for all terms are appended to the first page.
+
+    Args:
+        terms: Normalized, non-empty query terms
+        limit: Maximum number of candidates per term
+        ontology: Target ontology, part of the cache key
+        page: Result page to fetch (pages are ``limit`` results each)
+
+    Returns:
+        List of {"original": term, "candidates": [...]} entries
+    """
+    if len(terms) == 1:
+        results = [_fetch_one(terms[0], limit, ontology, page)]
+    else:
+        executor = _get_executor()
+        futures = [
+            executor.submit(_fetch_one, term, limit, ontology, page) for term in terms
+        ]
+        results = [f.result() for f in futures]
+
+    if NGRAM_CANDIDATES > 0 and ONTOLOGY_BACKEND != "ngram" and page == 0:
+        _add_ngram_candidates(results, NGRAM_CANDIDATES)
+    return results
+
+
+async def afetch_candidates(
+    terms: List[str], limit: int = 5, ontology: str = "HPO", page: int = 0
+) -> List[Dict[str, Any]]:
+    """
+    Async variant of ``fetch_candidates``.
+
+    Searches run as tasks on the running event loop (at most
+    FETCH_CONCURRENCY at once per call) through the same cache and
+    single-flight layer; results follow the order of ``terms``.
+
+    Args:
+        terms: Normalized, non-empty query terms
+        limit: Maximum number of candidates per term
+        ontology: Target ontology, part of the cache key
+        page: Result page to fetch (pages are ``limit`` results each)
+
+    Returns:
+        List of {"original": term, "candidates": [...]} entries
+    """
+    slots = asyncio.Semaphore(FETCH_CONCURRENCY)
+
+    async def fetch(term: str) -> Dict[str, Any]:
+        async with slots:
+            return await _afetch_one(term, limit, ontology, page)
+
+    results = list(await asyncio.gather(*(fetch(term) for term in terms)))
+
+    if NGRAM_CANDIDATES > 0 and ONTOLOGY_BACKEND != "ngram" and page == 0:
+        await asyncio.to_thread(_add_ngram_candidates, results, NGRAM_CANDIDATES)
+    return results
@@ -0,0 +1,144 @@
+"""
+Ontology hierarchy closures for the UMLS Mapping LangGraph-based Agent.
+This module loads the is_a graph of an HPO release once and precomputes the
+ancestor and descendant closure of every term as compact CSR integer arrays,
+so ancestor lookups and ancestor details are in-memory operations instead of
+one HTTP request per ancestor.
+"""
+
+import logging
+from array import array
+from bisect import bisect_left
+from collections import deque
+from typing import Any, Dict, List, Tuple
+
+from src.ontology.hpo_release import HPOTerm, get_hpo_release, to_candidate
+
+logger = logging.getLogger(__name__)
+
+
+def _to_csr(rows: List[List[int]]) -> Tuple[array, array]:
+    """Pack per-node integer lists into (indptr, indices) arrays."""
+    indptr = array("i", [0])
+    indices = array("i")
+    for row in rows:
+        indices.extend(row)
+        indptr.append(len(indices))
+    return indptr, indices
+
+
+class OntologyHierarchy:
+    """
+    Precomputed is_a closure over an ontology release.
+
+    Terms are addressed by integer id (their position in the release). For
+    term ``i``, its ancestors are ``anc_indices[anc_indptr[i]:anc_indptr[i + 1]]``
+    (sorted ids), and likewise for descendants.
+    """
+
+    def __init__(self, terms: List[HPOTerm], release: str = ""):
+        self.release = release
+        self.terms = terms
+        self.index: Dict[str, int] = {t["id"]: i for i, t in enumerate(terms)}
+        n = len(terms)
+
+        parents: List[List[int]] = [
+            sorted({self.index[p] for p in t["parents"] if p in self.index})
+            for t in terms
+        ]
+        children: List[List[int]] = [[] for _ in range(n)]
+        for child, plist in enumerate(parents):
+            for parent in plist:
+                children[parent].append(child)
+        self.parent_indptr, self.parent_indices = _to_csr(parents)
+
+        # Kahn's algorithm: visit each term after all of its parents
+        pending = [len(p) for p in parents]
+        queue = deque(i for i in range(n) if pending[i] == 0)
+        ancestors: List[List[int]] = [[] for _ in range(n)]
+        visited = 0
+        while queue:
+            node = queue.popleft()
+            visited += 1
+            closure = set(parents[node])
+            for parent in parents[node]:
+                closure.update(ancestors[parent])
+            ancestors[node] = sorted(closure)
+            for child in children[node]:
+                pending[child] -= 1
+                if pending[child] == 0:
+                    queue.append(child)
+
+        if visited < n:
+            logger.warning(
+                f"Ontology hierarchy has cycles - {n - visited} terms keep partial "
+                "ancestor closures"
+            )
+
+        descendants: List[List[int]] = [[] for _ in range(n)]
+        for node, anc in enumerate(ancestors):
+            for a in anc:
+                descendants[a].append(node)
+
+        self.anc_indptr, self.anc_indices = _to_csr(ancestors)
+        self.desc_indptr, self.desc_indices = _to_csr(descendants)
+
+        logger.info(
+            f"Ontology hierarchy built - release: {release}, terms: {n}, "
+            f"ancestor_links: {len(self.anc_indices)}"
+        )
+
+    @classmethod
+    def from_release(cls, path: str) -> "OntologyHierarchy":
+        """Build the hierarchy from an hp.json or hp.obo release file."""
+        release = get_hpo_release(path)
+        return cls(release["terms"], release=release["version"] or path)
+
+    def _slice(self, indptr: array, indices: array, code: str) -> List[int]:
+        """Return the closure row of ``code`` as integer ids ([] if unknown)."""
+        i = self.index.get(code)
+        if i is None:
+            return []
+        return list(indices[indptr[i] : indptr[i + 1]])
+
+    def parents(self, code: str) -> List[str]:
+        """Direct is_a parents of ``code``."""
+        return [
+            self.terms[i]["id"]
+            for i in self._slice(self.parent_indptr, self.parent_indices, code)
+        ]
+
+    def ancestors(self, code: str) -> List[str]:
+        """All transitive is_a ancestors of ``code`` (excluding itself)."""
+        return [
+            self.terms[i]["id"]
+            for i in self._slice(self.anc_indptr, self.anc_indices, code)
+        ]
+
+    def descendants(self, code: str) -> List[str]:
+        """All transitive is_a descendants of ``code`` (excluding itself)."""
+        return [
+            self.terms[i]["id"]
+            for i in self._slice(self.desc_indptr, self.desc_indices, code)
+        ]
+
+    def is_ancestor(self, ancestor: str, code: str) -> bool:
+        """Whether ``ancestor`` is a strict is_a ancestor of ``code``."""
+        i = self.index.get(code)
+        a = self.index.get(ancestor)
+        if i is None or a is None:
+            return False
+        lo, hi = self.anc_indptr[i], self.anc_indptr[i + 1]
+        pos = bisect_left(self.anc_indices, a, lo, hi)
+        return pos < hi and self.anc_indices[pos] == a
+
+    def details(self, code: str) -> Dict[str, Any]:
+        """Return the candidate-shaped record for ``code``, or {} if unknown."""
+        i = self.index.get(code)
+        if i is None:
+            return {}
+        return to_candidate(self.terms[i])
+
+    def ancestor_details(self, code: str) -> List[Dict[str, Any]]:
+        """Candidate-shaped records for every ancestor of ``code``."""
+        return [self.details(a) for a in self.ancestors(code)]
@@ -0,0 +1,224 @@
+"""
+HPO release file loading for the UMLS Mapping LangGraph-based Agent.
+This module parses Human Phenotype Ontology release files (hp.json or hp.obo)
+into plain term records that the local search index and other in-process
+ontology helpers are built from.
+"""
+
+import functools
+import json
+import re
+from typing import Any, Dict, List, TypedDict
+
+# Prefix used by OBO Graphs JSON for HPO class IRIs
+OBO_PURL_PREFIX = "http://purl.obolibrary.org/obo/"
+
+
+class HPOTerm(TypedDict):
+    """A single, non-obsolete HPO class parsed from a release file."""
+
+    id: str  # HPO code (e.g., "HP:0001250")
+    name: str  # Preferred label
+    definition: str  # Textual definition ("" when absent)
+    synonyms: List[str]  # All synonyms, any scope
+    exact_synonyms: List[str]  # Synonyms with EXACT scope only
+    xrefs: List[str]  # Cross references (e.g., "UMLS:C0036572")
+    parents: List[str]  # Direct is_a parents as HPO codes
+
+
+class HPORelease(TypedDict):
+    """Parsed contents of an HPO release file."""
+
+    version: str  # Release version (e.g., "hp/releases/2025-05-06"), "" if unknown
+    terms: List[HPOTerm]  # All non-obsolete HPO classes
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize text for matching: lowercase, punctuation to spaces, collapsed whitespace.
+
+    Args:
+        text: Raw label, synonym or query
+
+    Returns:
+        Normalized string
+    """
+    return " ".join(re.sub(r"[^0-9a-z]+", " ", str(text).lower()).split())
+
+
+def to_candidate(term: HPOTerm) -> Dict[str, Any]:
+    """
+    Render a release term in the fetch node's candidate shape.
+
+    Shared by every in-process backend (local index, n-gram retriever,
+    hierarchy) so they all hand the graph identical records.
+
+    Args:
+        term: HPOTerm record from a loaded release
+
+    Returns:
+        Candidate dict with code, term, description, synonyms, exact_synonyms
+        and xrefs
+    """
+    return {
+        "code": term["id"],
+        "term": term["name"],
+        "description": term["definition"] or None,
+        "synonyms": list(term["synonyms"]),
+        "exact_synonyms": list(term["exact_synonyms"]),
+        "xrefs": list(term["xrefs"]),
+    }
+
+
+def _iri_to_code(iri: str) -> str:
+    """Convert an OBO PURL (…/obo/HP_0000001) to a CURIE (HP:0000001)."""
+    if iri.startswith(OBO_PURL_PREFIX):
+        iri = iri[len(OBO_PURL_PREFIX):]
+    return iri.replace("_", ":", 1)
+
+
+def _load_json(path: str) -> HPORelease:
+    """Parse an OBO Graphs JSON release (hp.json)."""
+    with open(path, "r") as f:
+        data = json.load(f)
+
+    graph = data["graphs"][0]
+    version = graph.get("meta", {}).get("version", "")
+    terms: Dict[str, HPOTerm] = {}
+
+    for node in graph.get("nodes", []):
+        if node.get("type", "CLASS") != "CLASS":
+            continue
+        code = _iri_to_code(node.get("id", ""))
+        if not code.startswith("HP:"):
+            continue
+        meta = node.get("meta", {})
+        if meta.get("deprecated"):
+            continue
+
+        synonyms = meta.get("synonyms", [])
+        terms[code] = {
+            "id": code,
+            "name": node.get("lbl", ""),
+            "definition": meta.get("definition", {}).get("val", ""),
+            "synonyms": [s["val"] for s in synonyms if s.get("val")],
+            "exact_synonyms": [
+                s["val"]
+                for s in synonyms
+                if s.get("val") and s.get("pred") == "hasExactSynonym"
+            ],
+            "xrefs": [x["val"] for x in meta.get("xrefs", []) if x.get("val")],
+            "parents": [],
+        }
+
+    for edge in graph.get("edges", []):
+        if edge.get("pred") != "is_a":
+            continue
+        child = _iri_to_code(edge.get("sub", ""))
+        parent = _iri_to_code(edge.get("obj", ""))
+        if child in terms and parent in terms:
+            terms[child]["parents"].append(parent)
+
+    return {"version": version, "terms": list(terms.values())}
+
+
+_OBO_QUOTED = re.compile(r'^"((?:[^"\\]|\\.)*)"\s*(.*)$')
+
+
+def _load_obo(path: str) -> HPORelease:
+    """Parse an OBO flat-file release (hp.obo)."""
+    terms: List[HPOTerm] = []
+    current: Dict = {}
+    in_term = False
+    version = ""
+
+    def _flush():
+        if in_term and current.get("id", "").startswith("HP:") and not current.get(
+            "obsolete"
+        ):
+            terms.append(
+                {
+                    "id": current["id"],
+                    "name": current.get("name", ""),
+                    "definition": current.get("definition", ""),
+                    "synonyms": current.get("synonyms", []),
+                    "exact_synonyms": current.get("exact_synonyms", []),
+                    "xrefs": current.get("xrefs", []),
+                    "parents": current.get("parents", []),
+                }
+            )
+
+    with open(path, "r") as f:
+        for raw_line in f:
+            line = raw_line.strip()
+            if line.startswith("["):
+                _flush()
+                current = {}
+                in_term = line == "[Term]"
+                continue
+            if line.startswith("data-version:") and not terms and not in_term:
+                version = line.split(":", 1)[1].strip()
+                continue
+            if not in_term or ":" not in line:
+                continue
+
+            tag, value = line.split(":", 1)
+            value = value.strip()
+
+            if tag == "id":
+                current["id"] = value
+            elif tag == "name":
+                current["name"] = value
+            elif tag == "def":
+                match = _OBO_QUOTED.match(value)
+                current["definition"] = match.group(1) if match else value
+            elif tag == "synonym":
+                match = _OBO_QUOTED.match(value)
+                if not match:
+                    continue
+                current.setdefault("synonyms", []).append(match.group(1))
+                if match.group(2).startswith("EXACT"):
+                    current.setdefault("exact_synonyms", []).append(match.group(1))
+            elif tag == "xref":
+                current.setdefault("xrefs", []).append(value.split(" ", 1)[0])
+            elif tag == "is_a":
+                current.setdefault("parents", []).append(value.split(" ", 1)[0])
+            elif tag == "is_obsolete":
+                current["obsolete"] = value == "true"
+
+    _flush()
+    return {"version": version, "terms": terms}
+
+
+def load_hpo_release(path: str) -> HPORelease:
+    """
+    Load the release version and all non-obsolete HPO classes from a release file.
+
+    Args:
+        path: Path to hp.json (OBO Graphs JSON) or hp.obo
+
+    Returns:
+        HPORelease with the version string and HPOTerm records
+
+    Raises:
+        ValueError: If the file extension is not .json or .obo
+    """
+    if path.endswith(".json"):
+        return _load_json(path)
+    if path.endswith(".obo"):
+        return _load_obo(path)
+    raise ValueError(f"Unsupported HPO release file: {path}. Use hp.json or hp.obo.")
+
+
+@functools.lru_cache(maxsize=None)
+def get_hpo_release(path: str) -> HPORelease:
+    """
+    Load a release file once per process and share it between in-process helpers.
+
+    Args:
+        path: Path to hp.json or hp.obo
+
+    Returns:
+        HPORelease: The parsed release (treat as read-only)
+    """
+    return load_hpo_release(path)
@@ -0,0 +1,170 @@
+"""
+In-process HPO search index for the UMLS Mapping LangGraph-based Agent.
+This module builds an inverted index over HPO labels, synonyms, definitions and
+xrefs from a release file, and answers search queries with the same candidate
+shape as the ontology.jax.org search API, without any network round trip.
+"""
+
+import logging
+import math
+from collections import defaultdict
+from typing import Any, Dict, List
+
+from src.ontology.hpo_release import (
+    HPOTerm,
+    get_hpo_release,
+    normalize_text,
+    to_candidate,
+)
+
+logger = logging.getLogger(__name__)
+
+# Per-field weights: a query token found in the label counts more than one
+# found only in a synonym, which in turn counts more than the definition
+FIELD_WEIGHTS = {"label": 3.0, "synonym": 2.0, "definition": 0.5}
+
+# Flat bonuses for whole-phrase matches, dominating token-level scores
+EXACT_LABEL_BONUS = 100.0
+EXACT_SYNONYM_BONUS = 50.0
+PHRASE_BONUS = 10.0
+
+
+def _stem(token: str) -> str:
+    """Strip a plural 's' so that "seizures" matches "Seizure"."""
+    if len(token) > 3 and token.endswith("s") and not token.endswith(("ss", "is", "us")):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Normalize and split text into stemmed tokens."""
+    return [_stem(t) for t in normalize_text(text).split()]
+
+
+class LocalHPOIndex:
+    """
+    Inverted index over an HPO release.
+
+    ``search`` has the same signature and return shape as
+    ``OntologyAPIClient.search`` so either can back the UMLS fetch node.
+    """
+
+    def __init__(self, terms: List[HPOTerm], release: str = ""):
+        self.release = release
+        self.cache_namespace = f"local:{release}"
+        self.terms = terms
+        self.by_code: Dict[str, int] = {t["id"]: i for i, t in enumerate(terms)}
+        self.postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+        self.exact_labels: Dict[str, List[int]] = defaultdict(list)
+        self.synonyms: Dict[str, List[int]] = defaultdict(list)  # any scope
+        self.xrefs: Dict[str, List[int]] = defaultdict(list)
+        self.phrases: List[List[str]] = []
+
+        for idx, term in enumerate(terms):
+            label = normalize_text(term["name"])
+            synonyms = [normalize_text(s) for s in term["synonyms"]]
+            self.exact_labels[label].append(idx)
+            for syn in synonyms:
+                self.synonyms[syn].append(idx)
+            for xref in term["xrefs"]:
+                self.xrefs[xref.lower()].append(idx)
+            self.phrases.append([label] + synonyms)
+
+            self._add_tokens(idx, term["name"], FIELD_WEIGHTS["label"])
+            for syn in term["synonyms"]:
+                self._add_tokens(idx, syn, FIELD_WEIGHTS["synonym"])
+            self._add_tokens(idx, term["definition"], FIELD_WEIGHTS["definition"])
+
+        n_terms = max(len(terms), 1)
+        self.idf: Dict[str, float] = {
+            token: math.log(1.0 + n_terms / len(posting))
+            for token, posting in self.postings.items()
+        }
+
+        logger.info(
+            f"Local HPO index built - release: {release}, terms: {len(terms)}, "
+            f"tokens: {len(self.postings)}"
+        )
+
+    def _add_tokens(self, idx: int, text: str, weight: float) -> None:
+        """Record ``idx`` under each token of ``text``, keeping the best field weight."""
+        for token in set(tokenize(text)):
+            posting = self.postings[token]
+            if posting.get(idx, 0.0) < weight:
+                posting[idx] = weight
+
+    @classmethod
+    def from_release(cls, path: str) -> "LocalHPOIndex":
+        """Build an index from an hp.json or hp.obo release file."""
+        release = get_hpo_release(path)
+        return cls(release["terms"], release=release["version"] or path)
+
+    def to_candidate(self, idx: int) -> Dict[str, Any]:
+        """Render term ``idx`` in the fetch node's candidate shape."""
+        return to_candidate(self.terms[idx])
+
+    def get(self, code: str) -> Dict[str, Any]:
+        """Return the candidate dict for an HPO code, or {} if unknown."""
+        idx = self.by_code.get(code)
+        return self.to_candidate(idx) if idx is not None else {}
+
+    def _score(self, query: str) -> Dict[int, float]:
+        """Score every term that shares at least one token with ``query``."""
+        normalized = normalize_text(query)
+        scores: Dict[int, float] = defaultdict(float)
+
+        # Direct code or xref lookups (e.g., "HP:0001250", "UMLS:C0036572")
+        code_idx = self.by_code.get(query.strip().upper())
+        if code_idx is not None:
+            scores[code_idx] += EXACT_LABEL_BONUS * 2
+        for idx in self.xrefs.get(query.strip().lower(), []):
+            scores[idx] += EXACT_LABEL_BONUS
+
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return scores
+
+        matched: Dict[int, int] = defaultdict(int)
+        for token in tokens:
+            posting = self.postings.get(token)
+            if not posting:
+                continue
+            idf = self.idf[token]
+            for idx, weight in posting.items():
+                scores[idx] += idf * weight
+                matched[idx] += 1
+
+        # Favor terms that cover the whole query rather than one rare token
+        for idx, count in matched.items():
+            scores[idx] *= (count / len(tokens)) ** 2
+
+        for idx in self.exact_labels.get(normalized, []):
+            scores[idx] += EXACT_LABEL_BONUS
+        for idx in self.synonyms.get(normalized, []):
+            scores[idx] += EXACT_SYNONYM_BONUS
+
+        # Whole-phrase containment among the full-coverage matches
+        for idx, count in matched.items():
+            if count == len(tokens) and any(
+                normalized in phrase for phrase in self.phrases[idx]
+            ):
+                scores[idx] += PHRASE_BONUS
+
+        return scores
+
+    def search(self, term: str, limit: int = 5, page: int = 0) -> List[Dict[str, Any]]:
+        """
+        Search the index for candidate terms.
+
+        Args:
+            term: Free-text query, HPO code or xref
+            limit: Maximum number of hits to return
+            page: Result page to fetch
+
+        Returns:
+            List of candidate dicts, best match first
+        """
+        scores = self._score(term)
+        ranked = sorted(scores.items(), key=lambda kv: (-kv[1], kv[0]))
+        start = page * limit
+        return [self.to_candidate(idx) for idx, _ in ranked[start : start + limit]]
@@ -0,0 +1,208 @@
+"""
+Character n-gram similarity retriever for the UMLS Mapping LangGraph-based Agent.
+This module embeds every HPO label and synonym as a sparse character n-gram
+TF-IDF vector and scores whole batches of query terms against them with
+vectorized NumPy operations, tolerating wording and spelling differences that
+a lexical search misses.
+
+Requires NumPy (``pip install genoma-agent[retrieval]``).
+"""
+
+import logging
+import math
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from src.ontology.hpo_release import (
+    HPOTerm,
+    get_hpo_release,
+    normalize_text,
+    to_candidate,
+)
+
+logger = logging.getLogger(__name__)
+
+# Character n-gram length
+NGRAM_SIZE = 3
+
+# Candidates scoring below this cosine similarity are never returned
+MIN_SIMILARITY = 0.2
+
+
+def char_ngrams(text: str, n: int = NGRAM_SIZE) -> List[str]:
+    """Return the padded character n-grams of normalized ``text``."""
+    padded = f" {normalize_text(text)} "
+    if len(padded.strip()) == 0:
+        return []
+    return [padded[i : i + n] for i in range(max(len(padded) - n + 1, 1))]
+
+
+class NgramRetriever:
+    """
+    TF-IDF retriever over character n-grams of HPO labels and synonyms.
+
+    Each label and synonym is a separate document; a term scores as its best
+    matching document. The document-term matrix is stored column-wise (CSC):
+    for every n-gram, the documents containing it and their weights. Scoring a
+    batch of queries is a sparse-dense product done with ``np.bincount``.
+
+    This is the layout ``scipy.sparse.csc_matrix`` would use, built from plain
+    NumPy arrays so the ``retrieval`` extra does not pull in SciPy. Only the
+    per-call score accumulator is dense: at HPO scale (~19k terms, ~60k labels
+    and synonyms) a batch of 10 query terms needs about 5 MB, released after
+    the call, while the index itself stays sparse.
+    """
+
+    def __init__(self, terms: List[HPOTerm], release: str = ""):
+        self.release = release
+        self.cache_namespace = f"ngram:{release}"
+        self.terms = terms
+
+        texts: List[str] = []
+        doc_term: List[int] = []
+        for idx, term in enumerate(terms):
+            for text in [term["name"], *term["synonyms"]]:
+                texts.append(text)
+                doc_term.append(idx)
+
+        self.vocab: Dict[str, int] = {}
+        rows: List[int] = []
+        cols: List[int] = []
+        counts: List[float] = []
+        for doc, text in enumerate(texts):
+            for gram, count in Counter(char_ngrams(text)).items():
+                col = self.vocab.setdefault(gram, len(self.vocab))
+                rows.append(doc)
+                cols.append(col)
+                counts.append(1.0 + math.log(count))
+
+        n_docs = len(texts)
+        rows_arr = np.asarray(rows, dtype=np.int32)
+        cols_arr = np.asarray(cols, dtype=np.int32)
+        tf = np.asarray(counts, dtype=np.float32)
+
+        df = np.bincount(cols_arr, minlength=len(self.vocab))
+        self.idf = (np.log((1.0 + n_docs) / (1.0 + df)) + 1.0).astype(np.float32)
+
+        # L2-normalize each document row
+        weights = tf * self.idf[cols_arr]
+        norms = np.sqrt(np.bincount(rows_arr, weights=weights**2, minlength=n_docs))
+        weights = weights / norms[rows_arr]
+
+        # Column-major layout: postings for n-gram c are indptr[c]:indptr[c + 1]
+        order = np.argsort(cols_arr, kind="stable")
+        self.doc_ids = rows_arr[order]
+        self.doc_weights = weights[order].astype(np.float32)
+        self.indptr = np.zeros(len(self.vocab) + 1, dtype=np.int64)
+        np.cumsum(df, out=self.indptr[1:])
+
+        self.n_docs = n_docs
+        self.doc_term = np.asarray(doc_term, dtype=np.int32)
+        # Documents are grouped by term, so each term's docs start here
+        self.term_starts = np.flatnonzero(
+            np.r_[True, self.doc_term[1:] != self.doc_term[:-1]]
+        )
+
+        logger.info(
+            f"N-gram retriever built - release: {release}, terms: {len(terms)}, "
+            f"documents: {n_docs}, ngrams: {len(self.vocab)}"
+        )
+
+    @classmethod
+    def from_release(cls, path: str) -> "NgramRetriever":
+        """Build a retriever from an hp.json or hp.obo release file."""
+        release = get_hpo_release(path)
+        return cls(release["terms"], release=release["version"] or path)
+
+    def _query_weights(self, queries: List[str]) -> Tuple[np.ndarray, ...]:
+        """Vectorize queries as (query index, n-gram column, weight) triples."""
+        q_idx: List[int] = []
+        q_col: List[int] = []
+        q_val: List[float] = []
+        for qi, query in enumerate(queries):
+            grams = Counter(g for g in char_ngrams(query) if g in self.vocab)
+            if not grams:
+                continue
+            cols = [self.vocab[g] for g in grams]
+            vals = np.asarray(
+                [(1.0 + math.log(c)) for c in grams.values()], dtype=np.float32
+            ) * self.idf[cols]
+            vals /= np.linalg.norm(vals)
+            q_idx.extend([qi] * len(cols))
+            q_col.extend(cols)
+            q_val.extend(vals.tolist())
+        return (
+            np.asarray(q_idx, dtype=np.int64),
+            np.asarray(q_col, dtype=np.int64),
+            np.asarray(q_val, dtype=np.float32),
+        )
+
+    def score_batch(self, queries: List[str]) -> np.ndarray:
+        """
+        Cosine similarity of every query against every HPO term.
+
+        Args:
+            queries: Free-text query terms
+
+        Returns:
+            np.ndarray: (len(queries), n_terms) matrix of best-document similarities
+        """
+        n_queries = len(queries)
+        if n_queries == 0 or self.n_docs == 0:
+            return np.zeros((n_queries, len(self.terms)), dtype=np.float32)
+
+        q_idx, q_col, q_val = self._query_weights(queries)
+
+        # Expand each query n-gram into its postings list
+        starts = self.indptr[q_col]
+        lengths = self.indptr[q_col + 1] - starts
+        total = int(lengths.sum())
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        positions = offsets + np.arange(total)
+
+        flat = np.repeat(q_idx, lengths) * self.n_docs + self.doc_ids[positions]
+        contrib = np.repeat(q_val, lengths) * self.doc_weights[positions]
+        doc_scores = np.bincount(
+            flat, weights=contrib, minlength=n_queries * self.n_docs
+        ).reshape(n_queries, self.n_docs)
+
+        return np.maximum.reduceat(doc_scores, self.term_starts, axis=1)
+
+    def to_candidate(self, idx: int) -> Dict[str, Any]:
+        """Render term ``idx`` in the fetch node's candidate shape."""
+        return to_candidate(self.terms[idx])
+
+    def search_batch(
+        self, queries: List[str], limit: int = 5, page: int = 0
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Retrieve top candidates for a whole batch of terms in one vectorized call.
+
+        Args:
+            queries: Free-text query terms
+            limit: Maximum number of candidates per query
+            page: Result page to fetch
+
+        Returns:
+            One candidate list per query, most similar first
+        """
+        scores = self.score_batch(queries)
+        depth = min((page + 1) * limit, scores.shape[1])
+        if depth == 0:
+            return [[] for _ in queries]
+
+        top = np.argpartition(-scores, depth - 1, axis=1)[:, :depth]
+        results = []
+        for qi in range(len(queries)):
+            row = top[qi][np.argsort(-scores[qi, top[qi]], kind="stable")]
+            row = row[page * limit :]
+            results.append(
+                [self.to_candidate(int(i)) for i in row if scores[qi, i] >= MIN_SIMILARITY]
+            )
+        return results
+
+    def search(self, term: str, limit: int = 5, page: int = 0) -> List[Dict[str, Any]]:
+        """Search a single term; same signature as the other search backends."""
+        return self.search_batch([term], limit=limit, page=page)[0]
@@ -0,0 +1,193 @@
+"""
+Speculative candidate prefetch for the UMLS Mapping LangGraph-based Agent.
+This module derives likely ontology query phrases directly from the raw survey
+text and warms the search cache in the background while the mappability and
+extraction LLM calls are still running, so the real fetch mostly hits warm
+(or already in-flight) entries.
+"""
+
+import asyncio
+import logging
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Set
+
+from src.ontology.client import awarm_search_cache, warm_search_cache
+
+# Maximum number of speculative searches per question
+PREFETCH_MAX_PHRASES = int(os.getenv("PREFETCH_MAX_PHRASES", "8"))
+
+# Background workers shared by all requests; kept small so speculative
+# traffic never crowds out real searches
+PREFETCH_WORKERS = 4
+
+# Lambda freezes background threads once the response is returned, so threaded
+# prefetch would leave half-finished searches to the next invocation
+_ON_LAMBDA = "AWS_LAMBDA_FUNCTION_NAME" in os.environ
+
+# Words that never start or end a query phrase
+STOPWORDS = set(
+    """
+    a about all an and any apply are as at be been by can check child current
+    currently describe diagnosed diagnosis did do does ever for formally from
+    had has have healthcare how if in include including indicate is it known
+    like no not of or other please provider select such that the their there
+    this to was were what when which who with yes you your
+    """.split()
+)
+
+# Longest n-gram (in words) taken from a run of non-stopwords
+MAX_PHRASE_WORDS = 4
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ThreadPoolExecutor] = None
+_lock = threading.Lock()
+
+# Running async prefetch tasks (the event loop only keeps weak references)
+_tasks: Set[asyncio.Task] = set()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Return the shared background executor for speculative searches."""
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=PREFETCH_WORKERS, thread_name_prefix="ontology-prefetch"
+                )
+    return _executor
+
+
+def _chunks(part: str) -> List[str]:
+    """Split a text part into maximal runs of non-stopwords."""
+    words = re.findall(r"[A-Za-z][A-Za-z0-9'-]*", part)
+    chunks, current = [], []
+    for word in words:
+        if word.lower() in STOPWORDS:
+            if current:
+                chunks.append(current)
+            current = []
+        else:
+            current.append(word)
+    if current:
+        chunks.append(current)
+    return [" ".join(c) for c in chunks]
+
+
+def _ngrams(chunk: str) -> List[str]:
+    """Sliding word n-grams of a chunk, longest first, up to MAX_PHRASE_WORDS."""
+    words = chunk.split()
+    return [
+        " ".join(words[start : start + n])
+        for n in range(min(len(words), MAX_PHRASE_WORDS), 0, -1)
+        for start in range(len(words) - n + 1)
+    ]
+
+
+def derive_query_phrases(
+    text: str, field_type: str = "", max_phrases: int = PREFETCH_MAX_PHRASES
+) -> List[str]:
+    """
+    Guess the terms extraction is likely to produce from raw survey text.
+
+    Survey text is split into " - " separated parts (display name, question
+    body, answer choice, explanation). Checkbox questions are answered by
+    their choice (third part), others mostly by their display name (first
+    part), so those parts go first. Each part contributes the sliding
+    n-grams (up to MAX_PHRASE_WORDS words, longest first) of its runs of
+    non-stopwords.
+
+    Args:
+        text: Raw survey question text
+        field_type: "radio", "checkbox" or "short"
+        max_phrases: Maximum number of phrases to return
+
+    Returns:
+        Distinct query phrases, most likely first
+    """
+    text = re.sub(r"\([^)]*\)", " ", text or "")
+    parts = [p.strip() for p in re.split(r"\s+-\s+|\n", text) if p.strip()]
+    if field_type.lower() == "checkbox" and len(parts) > 2:
+        parts = [parts[2]] + parts[:2] + parts[3:]
+
+    phrases: List[str] = []
+    for part in parts:
+        for chunk in _chunks(part):
+            phrases.extend(_ngrams(chunk))
+
+    seen = set()
+    distinct = []
+    for phrase in phrases:
+        key = phrase.lower()
+        if key not in seen and len(key) > 2:
+            seen.add(key)
+            distinct.append(phrase)
+    return distinct[:max_phrases]
+
+
+def start_prefetch(text: str, field_type: str = "", ontology: str = "HPO") -> List[str]:
+    """
+    Warm the search cache for phrases derived from ``text`` in the background.
+
+    Returns immediately; failures are logged and never affect the request.
+    Searches run on background threads, so they are skipped on Lambda (see
+    ``astart_prefetch`` for the async path).
+
+    Args:
+        text: Raw survey question text
+        field_type: Survey field type
+        ontology: Target ontology, part of the cache key
+
+    Returns:
+        The phrases submitted for prefetching
+    """
+    if _ON_LAMBDA:
+        logger.debug("Speculative prefetch skipped - threads freeze on Lambda")
+        return []
+    phrases = derive_query_phrases(text, field_type)
+    if not phrases:
+        return []
+
+    def _warm(phrase: str):
+        try:
+            warm_search_cache(phrase, ontology=ontology)
+        except Exception as e:
+            logger.warning(f"Speculative prefetch failed - phrase: {phrase}, error: {e}")
+
+    executor = _get_executor()
+    for phrase in phrases:
+        executor.submit(_warm, phrase)
+    logger.info(f"Speculative prefetch started - phrases: {phrases}")
+    return phrases
+
+
+async def astart_prefetch(
+    text: str, field_type: str = "", ontology: str = "HPO"
+) -> List[str]:
+    """
+    Async variant of ``start_prefetch``: searches are tasks on the running loop.
+
+    They go through the async single-flight path, so a real async fetch of
+    the same term joins the prefetch instead of repeating it. Tasks still
+    running when the loop shuts down (e.g. ``asyncio.run``) are cancelled.
+    """
+    phrases = derive_query_phrases(text, field_type)
+    if not phrases:
+        return []
+
+    async def _awarm(phrase: str):
+        try:
+            await awarm_search_cache(phrase, ontology=ontology)
+        except Exception as e:
+            logger.warning(f"Speculative prefetch failed - phrase: {phrase}, error: {e}")
+
+    for phrase in phrases:
+        task = asyncio.create_task(_awarm(phrase))
+        _tasks.add(task)
+        task.add_done_callback(_tasks.discard)
+    logger.info(f"Speculative prefetch started - phrases: {phrases}")
+    return phrases
@@ -0,0 +1,341 @@
+"""
+Resilient ontology search for the UMLS Mapping LangGraph-based Agent.
+This module wraps the remote search backend with latency-adaptive timeouts,
+hedged duplicate requests and a circuit breaker that fails fast (or falls back
+to a local index) while the upstream is degraded, bounding tail latency at the
+/map endpoint.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional, Set
+
+import httpx
+import requests
+
+from src.ontology.client import (
+    FETCH_CONCURRENCY,
+    REQUEST_TIMEOUT,
+    FallbackCandidates,
+    OntologySearchError,
+    SearchBackend,
+)
+
+# Send a duplicate request when the first one is slower than the observed p95
+HEDGE_REQUESTS = os.getenv("ONTOLOGY_HEDGE_REQUESTS", "true").lower() == "true"
+
+# Consecutive failures that open the circuit, and seconds before a trial call
+BREAKER_THRESHOLD = int(os.getenv("ONTOLOGY_BREAKER_THRESHOLD", "5"))
+BREAKER_RESET_SECONDS = float(os.getenv("ONTOLOGY_BREAKER_RESET_SECONDS", "30"))
+
+# Adaptive timeout: p99 latency times this factor, clamped to
+# [MIN_TIMEOUT, REQUEST_TIMEOUT], once enough samples have been observed
+TIMEOUT_MULTIPLIER = 3.0
+MIN_TIMEOUT = 2.0
+MIN_SAMPLES = 20
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(OntologySearchError):
+    """Raised instead of calling the upstream while the circuit is open."""
+
+
+class LatencyTracker:
+    """Rolling window of successful request latencies (seconds)."""
+
+    def __init__(self, window: int = 200):
+        self._samples: deque = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Return the p-th percentile (0-100), or None without samples."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        rank = min(int(round(p / 100.0 * (len(samples) - 1))), len(samples) - 1)
+        return samples[rank]
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    closed → open after ``threshold`` consecutive failures; open → half-open
+    after ``reset_seconds``, letting a single trial call through; the trial's
+    outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, threshold: int, reset_seconds: float):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may go to the upstream now."""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open":
+                if time.monotonic() - self.opened_at < self.reset_seconds:
+                    return False
+                self.state = "half_open"
+                self._trial_in_flight = False
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != "closed":
+                logger.info("Ontology circuit closed - upstream recovered")
+            self.state = "closed"
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == "half_open" or self.failures >= self.threshold:
+                if self.state != "open":
+                    logger.warning(
+                        f"Ontology circuit opened - consecutive_failures: {self.failures}"
+                    )
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+
+class ResilientSearchClient:
+    """
+    Search backend wrapper adding adaptive timeouts, hedging and a circuit breaker.
+
+    Has the same ``search``/``asearch`` signatures as the wrapped backend,
+    which must accept a ``timeout`` keyword (see ``OntologyAPIClient.search``).
+    """
+
+    def __init__(
+        self,
+        backend: Any,
+        fallback: Optional[SearchBackend] = None,
+        hedge: bool = HEDGE_REQUESTS,
+    ):
+        self.backend = backend
+        self.fallback = fallback
+        self.hedge = hedge
+        self.cache_namespace = backend.cache_namespace
+        self.latency = LatencyTracker()
+        self.breaker = CircuitBreaker(BREAKER_THRESHOLD, BREAKER_RESET_SECONDS)
+        self.hedges = 0
+        self.fallbacks = 0
+        # Separate from the fetch pool so hedges never wait behind fetch workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=FETCH_CONCURRENCY * 2, thread_name_prefix="ontology-hedge"
+        )
+
+    def current_timeout(self) -> float:
+        """Timeout for the next call, adapted to observed latency."""
+        if len(self.latency) < MIN_SAMPLES:
+            return REQUEST_TIMEOUT
+        p99 = self.latency.percentile(99) or REQUEST_TIMEOUT
+        return min(REQUEST_TIMEOUT, max(MIN_TIMEOUT, p99 * TIMEOUT_MULTIPLIER))
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None when hedging is off/unprimed."""
+        if not self.hedge or len(self.latency) < MIN_SAMPLES:
+            return None
+        return self.latency.percentile(95)
+
+    def _timed_search(
+        self, term: str, limit: int, page: int, timeout: float
+    ) -> List[Dict[str, Any]]:
+        """Call the backend and record the latency of successful responses."""
+        start = time.monotonic()
+        result = self.backend.search(term, limit=limit, page=page, timeout=timeout)
+        self.latency.record(time.monotonic() - start)
+        return result
+
+    def _fallback_or_raise(
+        self, term: str, limit: int, page: int, error: BaseException
+    ) -> List[Dict[str, Any]]:
+        """Serve from the fallback backend if configured, otherwise re-raise."""
+        if self.fallback is None:
+            raise error
+        self.fallbacks += 1
+        logger.warning(
+            f"Ontology search fallback - term: {term}, reason: {type(error).__name__}"
+        )
+        return FallbackCandidates(self.fallback.search(term, limit=limit, page=page))
+
+    def search(self, term: str, limit: int = 5, page: int = 0) -> List[Dict[str, Any]]:
+        """
+        Search with a bounded deadline, optional hedge and circuit breaking.
+
+        Raises:
+            CircuitOpenError: While the circuit is open and no fallback is set
+            OntologySearchError / requests.exceptions.RequestException: When
+                every attempt failed and no fallback is set
+        """
+        if not self.breaker.allow():
+            return self._fallback_or_raise(
+                term, limit, page, CircuitOpenError("circuit open, upstream skipped")
+            )
+
+        timeout = self.current_timeout()
+        deadline = time.monotonic() + timeout
+        pending: Set[Future] = {
+            self._executor.submit(self._timed_search, term, limit, page, timeout)
+        }
+
+        hedge_after = self.hedge_delay()
+        if hedge_after is not None:
+            done, pending = wait(pending, timeout=hedge_after)
+            if not done:
+                self.hedges += 1
+                logger.info(
+                    f"Hedging ontology search - term: {term}, after: {hedge_after:.2f}s"
+                )
+                remaining = max(deadline - time.monotonic(), MIN_TIMEOUT)
+                pending.add(
+                    self._executor.submit(
+                        self._timed_search, term, limit, page, remaining
+                    )
+                )
+            else:
+                pending = done
+
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(
+                pending,
+                timeout=max(deadline - time.monotonic(), 0.0),
+                return_when=FIRST_COMPLETED,
+            )
+            if not done:
+                break
+            for future in done:
+                exc = future.exception()
+                if exc is None:
+                    self.breaker.record_success()
+                    return future.result()
+                error = exc
+
+        if error is None:
+            error = requests.exceptions.Timeout(f"no response within {timeout:.1f}s")
+        self.breaker.record_failure()
+        return self._fallback_or_raise(term, limit, page, error)
+
+    async def _atimed_search(
+        self, term: str, limit: int, page: int, timeout: float
+    ) -> List[Dict[str, Any]]:
+        """Async variant of ``_timed_search``."""
+        start = time.monotonic()
+        result = await self.backend.asearch(
+            term, limit=limit, page=page, timeout=timeout
+        )
+        self.latency.record(time.monotonic() - start)
+        return result
+
+    async def _afallback_or_raise(
+        self, term: str, limit: int, page: int, error: BaseException
+    ) -> List[Dict[str, Any]]:
+        """Async variant of ``_fallback_or_raise``."""
+        if self.fallback is None:
+            raise error
+        return await asyncio.to_thread(
+            self._fallback_or_raise, term, limit, page, error
+        )
+
+    async def asearch(
+        self, term: str, limit: int = 5, page: int = 0
+    ) -> List[Dict[str, Any]]:
+        """
+        Async variant of ``search``: attempts and hedges are asyncio tasks.
+
+        Raises:
+            CircuitOpenError: While the circuit is open and no fallback is set
+            OntologySearchError / httpx.HTTPError: When every attempt failed
+                and no fallback is set
+        """
+        if not self.breaker.allow():
+            return await self._afallback_or_raise(
+                term, limit, page, CircuitOpenError("circuit open, upstream skipped")
+            )
+
+        loop = asyncio.get_running_loop()
+        timeout = self.current_timeout()
+        deadline = loop.time() + timeout
+        pending: Set[asyncio.Task] = {
+            asyncio.ensure_future(self._atimed_search(term, limit, page, timeout))
+        }
+
+        error: Optional[BaseException] = None
+        try:
+            hedge_after = self.hedge_delay()
+            if hedge_after is not None:
+                done, _ = await asyncio.wait(pending, timeout=hedge_after)
+                if not done:
+                    self.hedges += 1
+                    logger.info(
+                        f"Hedging ontology search - term: {term}, "
+                        f"after: {hedge_after:.2f}s"
+                    )
+                    remaining = max(deadline - loop.time(), MIN_TIMEOUT)
+                    pending.add(
+                        asyncio.ensure_future(
+                            self._atimed_search(term, limit, page, remaining)
+                        )
+                    )
+
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=max(deadline - loop.time(), 0.0),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    break
+                for task in done:
+                    exc = task.exception()
+                    if exc is None:
+                        self.breaker.record_success()
+                        return task.result()
+                    error = exc
+        finally:
+            # The losing attempt is no longer needed
+            for task in pending:
+                task.cancel()
+
+        if error is None:
+            error = httpx.TimeoutException(f"no response within {timeout:.1f}s")
+        self.breaker.record_failure()
+        return await self._afallback_or_raise(term, limit, page, error)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return breaker state, latency percentiles and hedge/fallback counters."""
+        return {
+            "circuit": self.breaker.state,
+            "p50": self.latency.percentile(50),
+            "p95": self.latency.percentile(95),
+            "timeout": self.current_timeout(),
+            "hedges": self.hedges,
+            "fallbacks": self.fallbacks,
+        }
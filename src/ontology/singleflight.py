@@ -0,0 +1,133 @@
+"""
+Single-flight request coalescing for the UMLS Mapping LangGraph-based Agent.
+This module ensures that identical ontology searches issued concurrently (from
+threads or asyncio tasks) reach the upstream backend only once: the first
+caller for a key performs the lookup and later callers wait for its result.
+"""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class _Call:
+    """An in-flight threaded call whose outcome is shared with waiters."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key.
+
+    ``do`` serves threaded callers and ``ado`` serves asyncio callers. Only
+    calls that overlap in time are merged; nothing is cached once the leading
+    call returns. Exceptions raised by the leader propagate to every waiter;
+    a cancelled async leader is not: its waiters retry the call themselves.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._async_calls: Dict[Tuple[int, Hashable], "asyncio.Future[Any]"] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Run ``fn`` once for all threads concurrently asking for ``key``.
+
+        Args:
+            key: Identity of the call (e.g., a normalized search cache key)
+            fn: Zero-argument callable performing the actual lookup
+
+        Returns:
+            The result of the leading call
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.leaders += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    async def ado(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await ``fn()`` once for all tasks on this event loop asking for ``key``.
+
+        Args:
+            key: Identity of the call
+            fn: Zero-argument coroutine function performing the actual lookup
+
+        Returns:
+            The result of the leading call
+        """
+        loop = asyncio.get_running_loop()
+        loop_key = (id(loop), key)
+
+        while True:
+            with self._lock:
+                future = self._async_calls.get(loop_key)
+                leader = future is None
+                if leader:
+                    future = loop.create_future()
+                    self._async_calls[loop_key] = future
+                    self.leaders += 1
+                else:
+                    self.coalesced += 1
+
+            if leader:
+                break
+            try:
+                # Shield so a cancelled waiter does not cancel the shared lookup
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled() or asyncio.current_task().cancelling():
+                    raise
+                # The leader was cancelled, not this waiter: look up again,
+                # leading a new call unless another waiter already does
+
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark retrieved so an unobserved failure does not warn on GC
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._async_calls[loop_key]
+
+    def stats(self) -> Dict[str, int]:
+        """Return the number of leading and coalesced calls so far."""
+        return {"leaders": self.leaders, "coalesced": self.coalesced}
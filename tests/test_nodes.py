@@ -0,0 +1,199 @@
+import asyncio
+import time
+import unittest
+from unittest import mock
+
+from langchain_core.messages import AIMessage
+
+from src.graph import nodes
+
+
+class FakeLLM:
+    """Chat model stub answering every prompt with the next canned response."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.prompts = []
+
+    def invoke(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        return AIMessage(content=self.responses.pop(0))
+
+    async def ainvoke(self, prompt, **kwargs):
+        return self.invoke(prompt, **kwargs)
+
+
+def candidate(code, term):
+    return {"code": code, "term": term, "description": "", "exact_synonyms": []}
+
+
+class MappabilityDecisionTest(unittest.TestCase):
+    def test_true_once_quorum_reached(self):
+        self.assertIs(nodes._mappability_decision([True, False], 3, 1), True)
+        self.assertIs(nodes._mappability_decision([True, True], 3, 2), True)
+
+    def test_false_once_quorum_unreachable(self):
+        self.assertIs(nodes._mappability_decision([False, False], 3, 2), False)
+        self.assertIs(nodes._mappability_decision([False, False, False], 3, 1), False)
+
+    def test_undecided_while_quorum_reachable(self):
+        self.assertIsNone(nodes._mappability_decision([], 3, 2))
+        self.assertIsNone(nodes._mappability_decision([True, False], 3, 2))
+
+    def test_failed_samples_abstain(self):
+        self.assertIsNone(nodes._mappability_decision([None], 3, 2))
+        self.assertIs(nodes._mappability_decision([None, None], 3, 2), False)
+
+
+class MergeTermResultsTest(unittest.TestCase):
+    @staticmethod
+    def result(mappings, retry_count=0, partial=False, parse_stats=None):
+        return {
+            "validated_mappings": mappings,
+            "retry_count": retry_count,
+            "history_rewritten_terms": [m["original"] for m in mappings],
+            "parse_stats": parse_stats or {},
+            "partial": partial,
+        }
+
+    def test_orders_by_term_index_and_drops_duplicates(self):
+        seizure = {"original": "fits", "best_match_code": "HP:0001250"}
+        fever = {"original": "fever", "best_match_code": "HP:0001945"}
+        state = {
+            "term_results": {
+                2: self.result([dict(seizure)], retry_count=2),
+                0: self.result([fever]),
+                1: self.result([seizure], partial=True),
+            }
+        }
+
+        merged = nodes.merge_term_results_node(state)
+
+        self.assertEqual(merged["validated_mappings"], [fever, seizure])
+        self.assertEqual(merged["retry_count"], 2)
+        self.assertTrue(merged["partial"])
+        self.assertEqual(merged["history_rewritten_terms"], ["fever", "fits"])
+
+    def test_adds_parse_stats(self):
+        stats = {"rank_mappings": {"calls": 1, "parse_failures": 1, "retries": 0}}
+        state = {
+            "parse_stats": {"extract_medical_terms_short": {"calls": 1}},
+            "term_results": {
+                0: self.result([], parse_stats=stats),
+                1: self.result([], parse_stats=stats),
+            },
+        }
+
+        merged = nodes.merge_term_results_node(state)
+
+        self.assertEqual(
+            merged["parse_stats"],
+            {
+                "extract_medical_terms_short": {"calls": 1},
+                "rank_mappings": {"calls": 2, "parse_failures": 2, "retries": 0},
+            },
+        )
+        self.assertFalse(merged["partial"])
+
+
+class DeadlineSkippingTest(unittest.TestCase):
+    def setUp(self):
+        self.expired = {"text": "Any seizures?", "deadline": time.time() - 1}
+        llm = mock.Mock(side_effect=AssertionError("no LLM call past the deadline"))
+        patcher = mock.patch.dict(
+            nodes.AGENT_LLM_MAP,
+            {"rank_mappings": llm, "validate_mapping": llm, "rank_and_validate": llm},
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_fetch_skipped(self):
+        with mock.patch.object(nodes, "fetch_candidates") as fetch:
+            state = nodes.fetch_umls_terms_node(
+                {**self.expired, "extracted_terms": ["seizures"]}
+            )
+        fetch.assert_not_called()
+        self.assertTrue(state["partial"])
+        self.assertEqual(
+            state["umls_mappings"], [{"original": "seizures", "candidates": []}]
+        )
+
+    def test_rank_keeps_search_order(self):
+        state = nodes.rank_mappings_node(
+            {
+                **self.expired,
+                "umls_mappings": [
+                    {
+                        "original": "fits",
+                        "candidates": [
+                            candidate("HP:0001250", "Seizure"),
+                            candidate("HP:0002069", "Bilateral tonic-clonic seizure"),
+                        ],
+                    }
+                ],
+            }
+        )
+        self.assertTrue(state["partial"])
+        ranked = state["ranked_mappings"][0]["ranked_candidates"]
+        self.assertEqual([c["code"] for c in ranked], ["HP:0001250", "HP:0002069"])
+
+    def test_validate_uses_top_ranked(self):
+        state = nodes.validate_mapping_node(
+            {
+                **self.expired,
+                "extracted_terms": ["fits"],
+                "ranked_mappings": [
+                    {
+                        "original": "fits",
+                        "ranked_candidates": [
+                            {**candidate("HP:0001250", "Seizure"), "confidence": 0.8}
+                        ],
+                    }
+                ],
+            }
+        )
+        self.assertTrue(state["partial"])
+        self.assertEqual(
+            state["validated_mappings"],
+            [
+                {
+                    "original": "fits",
+                    "best_match_code": "HP:0001250",
+                    "best_match_term": "Seizure",
+                    "confidence": 0.8,
+                }
+            ],
+        )
+
+    def test_rank_and_validate_skipped(self):
+        state = nodes.rank_and_validate_node(
+            {
+                **self.expired,
+                "extracted_terms": ["fits"],
+                "umls_mappings": [
+                    {"original": "fits", "candidates": [candidate("HP:0001250", "Seizure")]}
+                ],
+            }
+        )
+        self.assertTrue(state["partial"])
+        self.assertEqual(state["validated_mappings"][0]["best_match_code"], "HP:0001250")
+
+
+class SyncAsyncNodesTest(unittest.TestCase):
+    def test_extraction_retries_malformed_output(self):
+        state = {"text": "Any seizures or fevers?", "field_type": "short"}
+        for run in (
+            nodes.extract_medical_terms_short_node,
+            lambda s: asyncio.run(nodes.aextract_medical_terms_short_node(s)),
+        ):
+            llm = FakeLLM('{"bad": 1}', '{"terms": ["seizures", "fevers"]}')
+            with mock.patch.dict(
+                nodes.AGENT_LLM_MAP, {"extract_medical_term_from_survey": llm}
+            ):
+                result = run(state)
+            self.assertEqual(result["extracted_terms"], ["seizures", "fevers"])
+            self.assertEqual(len(llm.prompts), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from src.ontology.cache import SearchCache
+
+SEIZURE = [{"code": "HP:0001250", "term": "Seizure"}]
+
+
+class SearchCacheTest(unittest.TestCase):
+    def test_keys_are_normalized(self):
+        cache = SearchCache("ns")
+        cache.set("Seizures!", "hpo", 5, SEIZURE)
+        self.assertEqual(cache.get("  seizures ", "HPO", 5), SEIZURE)
+        self.assertIsNone(cache.get("seizures", "HPO", 5, page=1))
+
+    def test_entries_expire_after_ttl(self):
+        cache = SearchCache("ns", ttl=10)
+        with mock.patch("src.ontology.cache.time.time", return_value=1000.0):
+            cache.set("seizures", "HPO", 5, SEIZURE)
+        with mock.patch("src.ontology.cache.time.time", return_value=1010.0):
+            self.assertEqual(cache.get("seizures", "HPO", 5), SEIZURE)
+        with mock.patch("src.ontology.cache.time.time", return_value=1010.5):
+            self.assertIsNone(cache.get("seizures", "HPO", 5))
+        self.assertEqual(cache.stats()["size"], 0)
+
+    def test_lru_eviction(self):
+        cache = SearchCache("ns", max_size=2)
+        cache.set("a", "HPO", 5, SEIZURE)
+        cache.set("b", "HPO", 5, SEIZURE)
+        cache.get("a", "HPO", 5)
+        cache.set("c", "HPO", 5, SEIZURE)
+        self.assertIsNone(cache.get("b", "HPO", 5))
+        self.assertIsNotNone(cache.get("a", "HPO", 5))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_disk_tier_survives_reopen(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "search.sqlite")
+            SearchCache("release-1", path=path).set("seizures", "HPO", 5, SEIZURE)
+
+            reopened = SearchCache("release-1", path=path)
+            self.assertEqual(reopened.get("seizures", "HPO", 5), SEIZURE)
+            self.assertEqual(reopened.stats()["disk_hits"], 1)
+
+    def test_namespace_change_invalidates_disk_tier(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "search.sqlite")
+            SearchCache("release-1", path=path).set("seizures", "HPO", 5, SEIZURE)
+
+            self.assertIsNone(
+                SearchCache("release-2", path=path).get("seizures", "HPO", 5)
+            )
+            # The old namespace's entries are gone, not just hidden
+            self.assertIsNone(
+                SearchCache("release-1", path=path).get("seizures", "HPO", 5)
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
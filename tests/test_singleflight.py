@@ -0,0 +1,132 @@
+import asyncio
+import threading
+import unittest
+
+from src.ontology.singleflight import SingleFlight
+
+
+class SingleFlightDoTest(unittest.TestCase):
+    def test_coalesces_concurrent_calls(self):
+        flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def lookup():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return ["HP:0001250"]
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(flight.do("k", lookup)))
+        leader.start()
+        started.wait(5)
+        waiters = [
+            threading.Thread(target=lambda: results.append(flight.do("k", lookup)))
+            for _ in range(3)
+        ]
+        for waiter in waiters:
+            waiter.start()
+        while flight.coalesced < 3:
+            threading.Event().wait(0.01)
+        release.set()
+        for thread in [leader, *waiters]:
+            thread.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [["HP:0001250"]] * 4)
+        self.assertEqual(flight.stats(), {"leaders": 1, "coalesced": 3})
+
+    def test_leader_error_reaches_waiters(self):
+        flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+
+        def lookup():
+            started.set()
+            release.wait(5)
+            raise RuntimeError("upstream down")
+
+        errors = []
+
+        def call():
+            try:
+                flight.do("k", lookup)
+            except RuntimeError as e:
+                errors.append(str(e))
+
+        leader = threading.Thread(target=call)
+        leader.start()
+        started.wait(5)
+        waiter = threading.Thread(target=call)
+        waiter.start()
+        while flight.coalesced < 1:
+            threading.Event().wait(0.01)
+        release.set()
+        leader.join(5)
+        waiter.join(5)
+        self.assertEqual(errors, ["upstream down"] * 2)
+
+    def test_sequential_calls_are_not_cached(self):
+        flight = SingleFlight()
+        self.assertEqual(flight.do("k", lambda: 1), 1)
+        self.assertEqual(flight.do("k", lambda: 2), 2)
+        self.assertEqual(flight.stats()["leaders"], 2)
+
+
+class SingleFlightAdoTest(unittest.IsolatedAsyncioTestCase):
+    async def test_coalesces_concurrent_tasks(self):
+        flight = SingleFlight()
+        calls = []
+
+        async def lookup():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "result"
+
+        results = await asyncio.gather(*(flight.ado("k", lookup) for _ in range(4)))
+        self.assertEqual(results, ["result"] * 4)
+        self.assertEqual(len(calls), 1)
+
+    async def test_cancelled_leader_does_not_fail_waiters(self):
+        flight = SingleFlight()
+        calls = []
+
+        async def lookup():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "result"
+
+        leader = asyncio.create_task(flight.ado("k", lookup))
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(flight.ado("k", lookup)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+
+        self.assertEqual(await asyncio.gather(*waiters), ["result"] * 3)
+        with self.assertRaises(asyncio.CancelledError):
+            await leader
+        # One waiter took over the lookup; the others joined it
+        self.assertEqual(len(calls), 2)
+
+    async def test_cancelled_waiter_does_not_cancel_lookup(self):
+        flight = SingleFlight()
+
+        async def lookup():
+            await asyncio.sleep(0.05)
+            return "result"
+
+        leader = asyncio.create_task(flight.ado("k", lookup))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(flight.ado("k", lookup))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+
+        self.assertEqual(await leader, "result")
+        with self.assertRaises(asyncio.CancelledError):
+            await waiter
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import asyncio
+import unittest
+
+from src.graph.steps import Call, MapSteps, arun_steps, run_steps
+
+
+def double(x):
+    return 2 * x
+
+
+async def adouble(x):
+    return 2 * x
+
+
+def fail(x):
+    raise ValueError(x)
+
+
+async def afail(x):
+    raise ValueError(x)
+
+
+def doubled_sum(items):
+    values = yield MapSteps(single, items)
+    return sum(values)
+
+
+def single(x):
+    value = yield Call(double, adouble, (x,))
+    return value
+
+
+def recovering():
+    try:
+        yield Call(fail, afail, ("boom",))
+    except ValueError as e:
+        return f"recovered from {e}"
+
+
+class RunStepsTest(unittest.TestCase):
+    def test_sync_and_async_drivers_agree(self):
+        self.assertEqual(run_steps(doubled_sum([1, 2, 3])), 12)
+        self.assertEqual(asyncio.run(arun_steps(doubled_sum([1, 2, 3]))), 12)
+
+    def test_step_errors_are_raised_at_the_yield(self):
+        self.assertEqual(run_steps(recovering()), "recovered from boom")
+        self.assertEqual(asyncio.run(arun_steps(recovering())), "recovered from boom")
+
+    def test_unhandled_step_errors_propagate(self):
+        with self.assertRaises(ValueError):
+            run_steps(single_failure())
+        with self.assertRaises(ValueError):
+            asyncio.run(arun_steps(single_failure()))
+
+    def test_map_until_stops_early(self):
+        def first_two(items):
+            return (
+                yield MapSteps(
+                    single, items, done=lambda r: len(r) >= 2, max_concurrency=1
+                )
+            )
+
+        self.assertEqual(len(run_steps(first_two([1, 2, 3, 4]))), 2)
+        self.assertEqual(len(asyncio.run(arun_steps(first_two([1, 2, 3, 4])))), 2)
+
+
+def single_failure():
+    yield Call(fail, afail, ("boom",))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+
+from langchain_core.messages import AIMessage
+
+from src.graph.structured_output import parse_structured, track_parse_stats
+
+
+class ParseStructuredTest(unittest.TestCase):
+    def test_unwraps_list_outputs(self):
+        self.assertEqual(
+            parse_structured('{"terms": ["seizures", "fever"]}', "extracted_terms"),
+            ["seizures", "fever"],
+        )
+
+    def test_accepts_bare_and_fenced_json(self):
+        self.assertEqual(parse_structured('["seizures"]', "extracted_terms"), ["seizures"])
+        self.assertEqual(
+            parse_structured('```json\n["seizures"]\n```', "extracted_terms"),
+            ["seizures"],
+        )
+        self.assertEqual(parse_structured('"seizures"', "extracted_terms"), ["seizures"])
+
+    def test_reads_tool_call_arguments(self):
+        response = AIMessage(
+            content="",
+            tool_calls=[
+                {
+                    "name": "validation",
+                    "args": {
+                        "best_match_code": "HP:0001250",
+                        "best_match_term": "Seizure",
+                        "confidence": 0.9,
+                    },
+                    "id": "call_1",
+                }
+            ],
+        )
+        parsed = parse_structured(response, "validation")
+        self.assertEqual(parsed["best_match_code"], "HP:0001250")
+
+    def test_batch_ranking_list_becomes_term_dict(self):
+        raw = (
+            '{"rankings": [{"term": "fits", "ranked_candidates": '
+            '[{"matched_code": "HP:0001250", "confidence": 0.8}]}]}'
+        )
+        parsed = parse_structured(raw, "batch_ranking")
+        self.assertEqual(list(parsed), ["fits"])
+        self.assertEqual(parsed["fits"][0]["matched_code"], "HP:0001250")
+
+    def test_rejects_wrong_shape(self):
+        with self.assertRaises(ValueError):
+            parse_structured('{"bad": 1}', "extracted_terms")
+        with self.assertRaises(ValueError):
+            parse_structured("not json", "validation")
+
+    def test_counts_calls_and_failures(self):
+        with track_parse_stats() as counts:
+            parse_structured('["a"]', "extracted_terms")
+            with self.assertRaises(ValueError):
+                parse_structured("oops", "extracted_terms")
+        self.assertEqual(counts["calls"], 2)
+        self.assertEqual(counts["parse_failures"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()